@@ -0,0 +1,50 @@
+"""
+Compare allocate_batch against calling allocate_inventory for every order
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_allocate_batch
+"""
+import argparse
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def allocate_one_by_one(allocator, orders):
+    """Allocate each order with its own allocate_inventory call"""
+    return [allocator.allocate_inventory(order) for order in orders]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--lines", type=int, default=5)
+    args = parser.parse_args()
+
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse,
+                                           max_quantity=100)
+    orders = make_orders(args.orders, args.items, args.lines)
+
+    single_time, single_shipments = timed(
+        allocate_one_by_one,
+        InventoryAllocator(WarehouseNetwork(warehouse_dicts)),
+        orders)
+    batch_time, batch_shipments = timed(
+        InventoryAllocator(WarehouseNetwork(warehouse_dicts)).allocate_batch,
+        orders)
+    assert single_shipments == batch_shipments
+
+    print("%d orders of %d lines against %d warehouses"
+          % (args.orders, args.lines, args.warehouses))
+    print("one by one: %8.3f s %10.0f orders/s"
+          % (single_time, args.orders / single_time))
+    print("batch:      %8.3f s %10.0f orders/s"
+          % (batch_time, args.orders / batch_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Measure allocation throughput with an AllocationLog at each durability
+level against the in-memory path, and the time to recover the network
+
+Each round allocates the same orders against a fresh network, without a
+log and with a log in a new folder for each durability level, in a random
+order, keeping the fastest of each. The run fails if allocation with batch
+durability is slower than the in-memory path by more than --max-overhead
+percent.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_allocation_log --orders 50000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+from src.allocation_log import AllocationLog
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--sync-orders", type=int, default=2000,
+                        help="orders allocated with sync durability")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-overhead", type=float, default=20.0)
+    args = parser.parse_args()
+
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse)
+    orders = make_orders(args.orders, args.items, args.lines)
+    # Every order waits for an fsync with sync durability, so fewer are run
+    variants = [("in memory", None, orders), ("none", "none", orders),
+                ("batch", "batch", orders),
+                ("sync", "sync", orders[:args.sync_orders])]
+    times = {name: [] for name, _, _ in variants}
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for round_number in range(args.rounds):
+            rng.shuffle(variants)
+            for name, durability, variant_orders in variants:
+                log = None
+                if durability is not None:
+                    log = AllocationLog(
+                        os.path.join(directory, "%s-%d"
+                                     % (durability, round_number)),
+                        warehouse_dicts, durability=durability)
+                allocator = InventoryAllocator(
+                    WarehouseNetwork(warehouse_dicts, log=log))
+                gc.collect()
+                gc.disable()
+                seconds, _ = timed(allocator.allocate_batch, variant_orders)
+                gc.enable()
+                if log is not None:
+                    log.close()
+                times[name].append(seconds)
+        last_log = os.path.join(directory, "batch-%d" % (args.rounds - 1))
+        recovery_time, log = timed(AllocationLog, last_log)
+        log.close()
+
+    variants.sort(key=lambda variant: ["in memory", "none", "batch",
+                                       "sync"].index(variant[0]))
+    print("%d warehouses, orders of %d lines, best of %d"
+          % (args.warehouses, args.lines, args.rounds))
+    best = {name: min(seconds) for name, seconds in times.items()}
+    in_memory = args.orders / best["in memory"]
+    print("%-10s %8s %12s %10s" % ("durability", "orders", "orders/s",
+                                   "overhead"))
+    for name, _, variant_orders in variants:
+        throughput = len(variant_orders) / best[name]
+        print("%-10s %8d %12.0f %+9.1f%%"
+              % (name, len(variant_orders), throughput,
+                 100.0 * (in_memory / throughput - 1)))
+    print("recovering %d orders from the batch log took %.2fs"
+          % (args.orders, recovery_time))
+    overhead = 100.0 * (best["batch"] / best["in memory"] - 1)
+    if overhead > args.max_overhead:
+        sys.exit("batch durability costs %.1f%%, more than %.1f%%"
+                 % (overhead, args.max_overhead))
+
+
+if __name__ == "__main__":
+    main()
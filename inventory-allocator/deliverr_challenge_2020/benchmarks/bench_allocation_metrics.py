@@ -0,0 +1,182 @@
+"""
+Measure the cost of allocation instrumentation, both disabled and recording
+into an InMemorySink, against the src folder from before it was added
+
+The src folder of --baseline, by default the revision before
+src/allocation_metrics.py was added, is exported and imported alongside
+the current one, together with a copy of the current src folder as a
+control. Every version allocates from its own network, and each round
+every version allocates the same slice of orders in a random order, so
+each round gives a paired ratio of times on networks in the same state.
+The median ratio is reported with a bootstrap 95% interval, and the
+control shows how far identical code drifts. The run fails if the whole
+interval of the current allocator without a sink against the baseline is
+above --max-overhead percent.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_allocation_metrics
+"""
+import argparse
+import gc
+import importlib
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import types
+from statistics import median
+from src.allocation_metrics import InMemorySink
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def get_default_baseline() -> str:
+    """Return the revision before allocation metrics were added"""
+    added = subprocess.check_output(
+        ["git", "log", "--diff-filter=A", "--format=%H", "--",
+         "src/allocation_metrics.py"]).decode().split()
+    if not added:
+        sys.exit("src/allocation_metrics.py is not in the git history")
+    return added[-1] + "~1"
+
+
+def export_src(revision: str, directory: str):
+    """Extract the src folder of revision into directory"""
+    prefix = subprocess.check_output(
+        ["git", "rev-parse", "--show-prefix"]).decode().strip()
+    top_level = subprocess.check_output(
+        ["git", "rev-parse", "--show-toplevel"]).decode().strip()
+    archive = subprocess.check_output(
+        ["git", "archive", "--format=tar", "%s:%ssrc" % (revision, prefix)],
+        cwd=top_level)
+    subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+
+
+def load_package(name: str, directory: str):
+    """
+    Return the allocator and network classes of the src folder copy in
+    directory, imported as the package called name
+
+    """
+    package = types.ModuleType(name)
+    package.__path__ = [directory]
+    sys.modules[name] = package
+    return (importlib.import_module(
+                name + ".inventory_allocator").InventoryAllocator,
+            importlib.import_module(
+                name + ".warehouse_network").WarehouseNetwork)
+
+
+def get_median_interval(ratios: list, rng: random.Random,
+                        resamples: int = 2000) -> tuple:
+    """Return the median of ratios and a bootstrap 95% interval of it"""
+    medians = sorted(median(rng.choices(ratios, k=len(ratios)))
+                     for _ in range(resamples))
+    return (median(ratios), medians[int(0.025 * resamples)],
+            medians[int(0.975 * resamples)])
+
+
+def compare(variants: list, orders: list, chunk_size: int,
+            rng: random.Random) -> dict:
+    """
+    Return the seconds each variant's allocator took for each slice of
+    chunk_size orders, running the variants in a random order each round
+
+    """
+    times = {name: [] for name, _ in variants}
+    allocators = [(name, make_allocator()) for name, make_allocator
+                  in variants]
+    # Networks built for the run are left out of every collection
+    gc.collect()
+    gc.freeze()
+    for start in range(0, len(orders), chunk_size):
+        chunk = orders[start:start + chunk_size]
+        rng.shuffle(allocators)
+        for name, allocator in allocators:
+            gc.disable()
+            seconds, _ = timed(allocator.allocate_batch, chunk)
+            gc.enable()
+            times[name].append(seconds)
+        gc.collect()
+    gc.unfreeze()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=2000,
+                        help="orders allocated by each run of a round")
+    parser.add_argument("--baseline",
+                        help="git revision to compare with, by default the "
+                             "one before metrics were added")
+    parser.add_argument("--max-overhead", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # Enough stock that most lines still ship at the end of the run
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse,
+                                           max_quantity=100)
+    orders = make_orders(args.orders, args.items, args.lines)
+    variants = [
+        ("disabled", lambda: InventoryAllocator(
+            WarehouseNetwork(warehouse_dicts))),
+        ("enabled", lambda: InventoryAllocator(
+            WarehouseNetwork(warehouse_dicts), metrics=InMemorySink())),
+    ]
+    baseline = args.baseline or get_default_baseline()
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        baseline_directory = os.path.join(directory, "baseline")
+        os.mkdir(baseline_directory)
+        export_src(baseline, baseline_directory)
+        control_directory = os.path.join(directory, "control")
+        shutil.copytree(
+            os.path.dirname(
+                sys.modules[InventoryAllocator.__module__].__file__),
+            control_directory, ignore=shutil.ignore_patterns("__pycache__"))
+        for name, package_directory in (("baseline", baseline_directory),
+                                        ("control", control_directory)):
+            allocator_class, network_class = load_package(
+                "%s_src" % name, package_directory)
+            variants.append((name, lambda allocator_class=allocator_class,
+                             network_class=network_class:
+                             allocator_class(network_class(warehouse_dicts))))
+        times = compare(variants, orders, args.chunk_size, rng)
+
+    total = {name: sum(seconds) for name, seconds in times.items()}
+    print("%d orders of %d lines, %d warehouses, %d rounds of %d orders"
+          % (args.orders, args.lines, args.warehouses, len(times["disabled"]),
+             args.chunk_size))
+    print("baseline is %s" % baseline)
+    for name in ("baseline", "control", "disabled", "enabled"):
+        print("%-9s %8.3fs %10.0f orders/s"
+              % (name, total[name], args.orders / total[name]))
+
+    def print_overhead(label: str, name: str, reference: str) -> tuple:
+        ratios = [100.0 * (seconds / reference_seconds - 1)
+                  for seconds, reference_seconds
+                  in zip(times[name], times[reference])]
+        overhead = get_median_interval(ratios, rng)
+        print("%-28s %+6.2f%%  (95%% interval %+.2f%% to %+.2f%%)"
+              % ((label,) + overhead))
+        return overhead
+
+    print_overhead("enabled vs disabled", "enabled", "disabled")
+    print_overhead("control vs disabled, noise", "control", "disabled")
+    overhead = print_overhead("disabled vs baseline", "disabled",
+                              "baseline")
+    if overhead[1] > args.max_overhead:
+        sys.exit("disabled instrumentation is slower than %s by more than "
+                 "%.1f%%" % (baseline, args.max_overhead))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Load generator for AllocationService measuring throughput and p50/p99
+latency of allocate calls under bursty load
+
+Clients send bursts of concurrent orders separated by random pauses.
+Each batch setting runs the same load against a fresh network, where a
+batch size of 1 hands every order to the worker thread on its own.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_allocation_service
+"""
+import argparse
+import asyncio
+import random
+import time
+from src.allocation_service import AllocationService
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Return the value at fraction of the way through sorted_values"""
+    return sorted_values[min(len(sorted_values) - 1,
+                             int(fraction * len(sorted_values)))]
+
+
+async def run_load(service, orders, args):
+    """Return allocate latencies in seconds and the total seconds taken"""
+    latencies = []
+    rng = random.Random(0)
+    per_client = len(orders) // args.clients
+
+    async def timed_allocate(order):
+        start = time.perf_counter()
+        await service.allocate(order)
+        latencies.append(time.perf_counter() - start)
+
+    async def client(client_orders):
+        for start in range(0, len(client_orders), args.burst):
+            await asyncio.gather(*[
+                timed_allocate(order)
+                for order in client_orders[start:start + args.burst]])
+            await asyncio.sleep(rng.expovariate(1000.0 / args.pause_ms))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(orders[client_id * per_client:(client_id + 1) * per_client])
+        for client_id in range(args.clients)])
+    return sorted(latencies), time.perf_counter() - start
+
+
+async def main(args):
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse,
+                                           max_quantity=1000)
+    orders = make_orders(args.orders, args.items, args.lines)
+    print("%d orders from %d clients in bursts of %d, mean pause %.1f ms"
+          % (args.orders, args.clients, args.burst, args.pause_ms))
+    print("%10s %10s %12s %10s %10s" % ("batch", "delay ms", "orders/s",
+                                        "p50 ms", "p99 ms"))
+    for batch_size in args.batch_sizes:
+        allocator = InventoryAllocator(WarehouseNetwork(warehouse_dicts))
+        async with AllocationService(allocator, batch_size,
+                                     args.delay_ms) as service:
+            latencies, elapsed = await run_load(service, orders, args)
+        print("%10d %10.1f %12.0f %10.2f %10.2f"
+              % (batch_size, args.delay_ms, len(latencies) / elapsed,
+                 1e3 * percentile(latencies, 0.5),
+                 1e3 * percentile(latencies, 0.99)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-sizes", type=int, nargs="+",
+                        default=[1, 16, 256])
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--pause-ms", type=float, default=5.0)
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""
+Compare memory and throughput of ColumnarInventory against the dict based
+WarehouseNetwork
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_columnar_inventory
+"""
+import argparse
+import gc
+import tracemalloc
+from src.columnar_inventory import ColumnarInventory
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def retained_bytes(build_store, args) -> int:
+    """Return bytes still allocated after building a store from fresh dicts"""
+    gc.collect()
+    tracemalloc.start()
+    store = build_store(make_warehouse_dicts(
+        args.warehouses, args.items, args.items_per_warehouse,
+        max_quantity=100))
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=5)
+    args = parser.parse_args()
+
+    print("%d warehouses x %d SKUs, %d SKUs per warehouse"
+          % (args.warehouses, args.items, args.items_per_warehouse))
+    network_bytes = retained_bytes(WarehouseNetwork, args)
+    columnar_bytes = retained_bytes(ColumnarInventory, args)
+
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse,
+                                           max_quantity=100)
+    orders = make_orders(args.orders, args.items, args.lines)
+    network_build, network = timed(WarehouseNetwork,
+                                   warehouse_dicts)
+    columnar_build, columnar = timed(ColumnarInventory, warehouse_dicts)
+    network_time, network_shipments = timed(
+        InventoryAllocator(network).allocate_batch, orders)
+    columnar_time, columnar_shipments = timed(columnar.allocate_batch, orders)
+    assert network_shipments == columnar_shipments
+
+    print("%-10s %12s %10s %12s" % ("", "memory MB", "build s", "orders/s"))
+    print("%-10s %12.1f %10.3f %12.0f"
+          % ("dict", network_bytes / 2 ** 20, network_build,
+             args.orders / network_time))
+    print("%-10s %12.1f %10.3f %12.0f"
+          % ("columnar", columnar_bytes / 2 ** 20, columnar_build,
+             args.orders / columnar_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measure allocation throughput from 1 to 16 threads sharing a thread safe
+network, with each thread placing orders from its own slice of the catalog
+and, with --shared, from the whole catalog
+
+Threads in CPython share the global interpreter lock, so this shows the
+cost of locking and contention rather than parallel speedup; see
+bench_sharded_allocator for scaling across processes.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_concurrent_allocation
+"""
+import argparse
+import threading
+import time
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import item_name, make_orders, make_warehouse_dicts
+
+
+def run_threads(network, orders_per_thread) -> float:
+    """Return seconds taken for one thread per order list to allocate it"""
+    def place_orders(orders):
+        allocator = InventoryAllocator(network)
+        for order in orders:
+            allocator.allocate_inventory(order)
+
+    threads = [threading.Thread(target=place_orders, args=(orders,))
+               for orders in orders_per_thread]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+",
+                        default=[1, 2, 4, 8, 16])
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=16000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=160000)
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--shared", action="store_true",
+                        help="let every thread order from the whole catalog")
+    args = parser.parse_args()
+
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse,
+                                           max_quantity=1000)
+    print("%d orders of %d lines against %d warehouses, %s SKUs"
+          % (args.orders, args.lines, args.warehouses,
+             "shared" if args.shared else "disjoint"))
+    print("%8s %12s %12s" % ("threads", "orders/s", "vs unlocked"))
+
+    unlocked_network = WarehouseNetwork(warehouse_dicts)
+    orders = make_orders(args.orders, args.items, args.lines)
+    unlocked_rate = args.orders / run_threads(unlocked_network, [orders])
+    print("%8s %12.0f %12s" % ("unlocked", unlocked_rate, "1.00x"))
+
+    for num_threads in args.threads:
+        network = WarehouseNetwork(warehouse_dicts, thread_safe=True)
+        per_thread = args.orders // num_threads
+        if args.shared:
+            orders_per_thread = [
+                make_orders(per_thread, args.items, args.lines, seed=seed)
+                for seed in range(num_threads)]
+        else:
+            # Rename SKUs so each thread only orders from its own slice
+            slice_size = args.items // num_threads
+            orders_per_thread = [
+                [{item_name(thread_id * slice_size
+                            + int(item[4:]) % slice_size): quantity
+                  for item, quantity in order.items()}
+                 for order in make_orders(per_thread, args.items,
+                                          args.lines, seed=thread_id)]
+                for thread_id in range(num_threads)]
+        rate = (per_thread * num_threads
+                / run_threads(network, orders_per_thread))
+        print("%8d %12.0f %11.2fx" % (num_threads, rate,
+                                      rate / unlocked_rate))
+
+
+if __name__ == "__main__":
+    main()
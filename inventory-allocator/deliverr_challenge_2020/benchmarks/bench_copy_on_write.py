@@ -0,0 +1,51 @@
+"""
+Compare allocating from warehouse dicts with and without deep copying them
+first, the copy callers needed before warehouses stopped modifying them
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_copy_on_write
+"""
+import argparse
+from copy import deepcopy
+from src.inventory_allocator import InventoryAllocator
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def allocate_copies(orders, warehouse_dicts):
+    """Allocate each order from a deep copy of warehouse_dicts"""
+    for order in orders:
+        InventoryAllocator().allocate_inventory(order,
+                                                deepcopy(warehouse_dicts))
+
+
+def allocate_in_place(orders, warehouse_dicts):
+    """Allocate each order from warehouse_dicts directly"""
+    for order in orders:
+        InventoryAllocator().allocate_inventory(order, warehouse_dicts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=100)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=5)
+    args = parser.parse_args()
+
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse)
+    orders = make_orders(args.orders, args.items, args.lines)
+    copy_time, _ = timed(allocate_copies, orders, warehouse_dicts)
+    in_place_time, _ = timed(allocate_in_place, orders, warehouse_dicts)
+
+    print("%d orders against %d warehouses of %d SKUs"
+          % (args.orders, args.warehouses, args.items_per_warehouse))
+    print("deepcopy per order: %8.2f ms/order"
+          % (1e3 * copy_time / args.orders))
+    print("copy on write:      %8.2f ms/order"
+          % (1e3 * in_place_time / args.orders))
+
+
+if __name__ == "__main__":
+    main()
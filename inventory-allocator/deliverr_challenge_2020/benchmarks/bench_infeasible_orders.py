@@ -0,0 +1,79 @@
+"""
+Measure how quickly orders that can't be filled are rejected using the
+network's per SKU totals, against scanning every warehouse stocking the SKU
+as allocation did before the totals were kept
+
+Every warehouse stocks a little of each popular SKU, so no single warehouse
+can ship an order line and a scan has to visit all of them.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_infeasible_orders --warehouses 10000
+"""
+import argparse
+import random
+import time
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import item_name
+
+
+def scan_total(network: WarehouseNetwork, item: str) -> int:
+    """Return stock of item summed over every warehouse stocking it"""
+    return sum(warehouse.get_quantity(item)
+               for warehouse in network.get_warehouses(item))
+
+
+def percentiles(latencies):
+    """Return p50 and p99 of latencies in microseconds"""
+    latencies = sorted(latencies)
+    return (1e6 * latencies[len(latencies) // 2],
+            1e6 * latencies[int(len(latencies) * 0.99)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    network = WarehouseNetwork([
+        {"name": "wh-%d" % warehouse_id,
+         "inventory": {item_name(item_id): rng.randint(1, 3)
+                       for item_id in range(args.items)}}
+        for warehouse_id in range(args.warehouses)])
+    # Every line but the last can be filled, the last asks for more than
+    # the whole network holds
+    orders = []
+    for _ in range(args.orders):
+        items = [item_name(item_id)
+                 for item_id in rng.sample(range(args.items), args.lines)]
+        order = {item: 1 for item in items[:-1]}
+        order[items[-1]] = network.get_total_quantity(items[-1]) + 1
+        orders.append(order)
+
+    allocator = InventoryAllocator(network, all_or_nothing=True)
+    scan_latencies, total_latencies = [], []
+    for order in orders:
+        start = time.perf_counter()
+        all(scan_total(network, item) >= quantity
+            for item, quantity in order.items())
+        scan_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        shipment = allocator.allocate_inventory(order)
+        total_latencies.append(time.perf_counter() - start)
+        assert shipment == []
+
+    print("%d orders of %d lines, %d warehouses stocking each SKU"
+          % (args.orders, args.lines, args.warehouses))
+    print("scan warehouses:      p50 %10.1f us  p99 %10.1f us"
+          % percentiles(scan_latencies))
+    print("all or nothing check: p50 %10.1f us  p99 %10.1f us"
+          % percentiles(total_latencies))
+
+
+if __name__ == "__main__":
+    main()
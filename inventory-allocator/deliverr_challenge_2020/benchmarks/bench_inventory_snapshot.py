@@ -0,0 +1,83 @@
+"""
+Compare cold start time and memory of loading a network from JSON into
+Warehouse objects against memory mapping a snapshot of it
+
+Each load runs in a fresh interpreter, which reports the time to load and
+to allocate its first orders, and its peak RSS.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_inventory_snapshot --warehouses 10000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from src import pipeline
+from src.inventory_allocator import InventoryAllocator
+from src.inventory_snapshot import MappedInventory, write_snapshot
+from .common import (get_peak_rss_mb, make_orders, make_warehouse_dicts,
+                     timed)
+
+
+def load(kind: str, path: str, args):
+    """Load the network at path, allocate some orders and print results"""
+    start = time.perf_counter()
+    if kind == "json":
+        allocator = InventoryAllocator(pipeline.load_network(path))
+    else:
+        allocator = MappedInventory(path)
+    load_time = time.perf_counter() - start
+    orders = make_orders(args.orders, args.items, args.lines)
+    order_time, _ = timed(allocator.allocate_batch, orders)
+    print(json.dumps({
+        "load_s": load_time, "first_orders_s": order_time,
+        "peak_rss_mb": get_peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--load", choices=["json", "snapshot"])
+    parser.add_argument("--path")
+    args = parser.parse_args()
+    if args.load:
+        load(args.load, args.path, args)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "warehouses.json")
+        snapshot_path = os.path.join(directory, "inventory.snapshot")
+        warehouse_dicts = make_warehouse_dicts(
+            args.warehouses, args.items, args.items_per_warehouse)
+        with open(json_path, "w") as json_file:
+            json.dump(warehouse_dicts, json_file)
+        write_time, _ = timed(write_snapshot, snapshot_path, warehouse_dicts)
+        del warehouse_dicts
+
+        print("%d warehouses x %d items, json %.1f MB, snapshot %.1f MB "
+              "written in %.1fs"
+              % (args.warehouses, args.items_per_warehouse,
+                 os.path.getsize(json_path) / float(1 << 20),
+                 os.path.getsize(snapshot_path) / float(1 << 20), write_time))
+        for kind, path in (("json", json_path), ("snapshot", snapshot_path)):
+            output = subprocess.check_output(
+                [sys.executable, "-m", "benchmarks.bench_inventory_snapshot",
+                 "--load", kind, "--path", path]
+                + ["--%s=%s" % (name, getattr(args, name.replace("-", "_")))
+                   for name in ("items", "orders", "lines")])
+            result = json.loads(output)
+            print("%-8s load %8.3fs  %d orders %6.3fs  peak RSS %7.1f MB"
+                  % (kind, result["load_s"], args.orders,
+                     result["first_orders_s"], result["peak_rss_mb"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measure MinimumCostStrategy solve time and warehouses per order against
+greedy allocation, as order width and warehouse count grow
+
+Every order is planned against the same starting network, so the
+strategies are compared on identical stock.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_minimum_cost_strategy
+"""
+import argparse
+import time
+from src.allocation_strategy import MinimumCostStrategy, plan_greedily
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, nargs="+",
+                        default=[10, 100, 1000])
+    parser.add_argument("--lines", type=int, nargs="+",
+                        default=[2, 5, 10, 20])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--coverage", type=float, default=0.1,
+                        help="fraction of the catalog each warehouse stocks")
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--time-budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    strategy = MinimumCostStrategy(time_budget_ms=args.time_budget_ms)
+    print("%d orders per row, %.0f ms budget, each warehouse stocks %.0f%% "
+          "of %d SKUs" % (args.orders, args.time_budget_ms,
+                          100 * args.coverage, args.items))
+    print("%10s %6s %12s %12s %12s %12s"
+          % ("warehouses", "lines", "greedy wh", "optimal wh", "mean ms",
+             "max ms"))
+    for num_warehouses in args.warehouses:
+        network = WarehouseNetwork(make_warehouse_dicts(
+            num_warehouses, args.items, int(args.coverage * args.items)))
+        for lines in args.lines:
+            orders = make_orders(args.orders, args.items, lines,
+                                 max_quantity=5)
+            greedy_warehouses = optimal_warehouses = 0
+            solve_times = []
+            for order in orders:
+                greedy_warehouses += len(plan_greedily(network, order))
+                start = time.perf_counter()
+                optimal_warehouses += len(strategy.plan_order(network, order))
+                solve_times.append(time.perf_counter() - start)
+            print("%10d %6d %12.2f %12.2f %12.2f %12.2f"
+                  % (num_warehouses, lines, greedy_warehouses / args.orders,
+                     optimal_warehouses / args.orders,
+                     1e3 * sum(solve_times) / args.orders,
+                     1e3 * max(solve_times)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure throughput and peak memory of the streaming JSON lines pipeline on
+a large synthetic order file
+
+Orders are drawn from a pool of distinct carts and written until the file
+reaches the requested size. Shipments are written to /dev/null so only
+parsing, allocation and encoding are measured.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_pipeline --size-mb 2048
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+from src import json_codec, pipeline
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def write_order_file(path: str, args) -> int:
+    """Write orders to path until it holds size_mb megabytes, return count"""
+    carts = [json_codec.dumps(order) + b"\n"
+             for order in make_orders(args.carts, args.items, args.lines)]
+    rng = random.Random(2)
+    target_bytes = args.size_mb << 20
+    written = num_orders = 0
+    with open(path, "wb", buffering=1 << 20) as order_file:
+        while written < target_bytes:
+            chunk = rng.choices(carts, k=10000)
+            data = b"".join(chunk)
+            order_file.write(data)
+            written += len(data)
+            num_orders += len(chunk)
+    return num_orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--carts", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    # Stock large enough that orders keep being shipped throughout
+    allocator = InventoryAllocator(WarehouseNetwork(make_warehouse_dicts(
+        args.warehouses, args.items, args.items_per_warehouse,
+        max_quantity=10 ** 9)))
+    with tempfile.TemporaryDirectory() as directory:
+        order_path = os.path.join(directory, "orders.jsonl")
+        write_time, num_orders = timed(write_order_file, order_path, args)
+        size_mb = os.path.getsize(order_path) / float(1 << 20)
+        print("wrote %d orders (%.0f MB) in %.1fs"
+              % (num_orders, size_mb, write_time))
+
+        with open(order_path, "rb") as input_stream, \
+                open(os.devnull, "wb", buffering=1 << 20) as output_stream:
+            run_time, _ = timed(pipeline.run_pipeline, allocator,
+                                input_stream, output_stream, args.batch_size)
+
+    print("json: %s" % ("orjson" if json_codec.orjson else "json"))
+    print("%10.0f orders/s %8.1f MB/s in %.1fs"
+          % (num_orders / run_time, size_mb / run_time, run_time))
+    print("peak RSS: %.1f MB"
+          % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare allocation with and without a PlanCache on traffic dominated by a
+small set of identical carts
+
+Most of the network is made of small warehouses holding a few units of each
+SKU, ahead of large warehouses in priority order, so greedy allocation has
+to probe many warehouses that can't ship a whole line before finding one.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_plan_cache
+"""
+import argparse
+import random
+from src.inventory_allocator import InventoryAllocator
+from src.plan_cache import PlanCache
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def make_fragmented_network(args):
+    """Return warehouse dicts with small warehouses ahead of large ones"""
+    num_small = int(args.small_fraction * args.warehouses)
+    small = make_warehouse_dicts(num_small, args.items,
+                                 args.items_per_warehouse, max_quantity=4)
+    large = make_warehouse_dicts(args.warehouses - num_small, args.items,
+                                 args.items_per_warehouse, max_quantity=1000,
+                                 seed=1)
+    for inp_warehouse in large:
+        inp_warehouse["name"] = "large-" + inp_warehouse["name"]
+    return small + large
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--items-per-warehouse", type=int, default=400)
+    parser.add_argument("--carts", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--max-quantity", type=int, default=10)
+    parser.add_argument("--small-fraction", type=float, default=0.9)
+    args = parser.parse_args()
+
+    warehouse_dicts = make_fragmented_network(args)
+    carts = make_orders(args.carts, args.items, args.lines,
+                        max_quantity=args.max_quantity)
+    rng = random.Random(2)
+    orders = [rng.choice(carts) for _ in range(args.orders)]
+
+    uncached_time, uncached_shipments = timed(
+        InventoryAllocator(WarehouseNetwork(warehouse_dicts)).allocate_batch,
+        orders)
+    cache = PlanCache()
+    cached_time, cached_shipments = timed(
+        InventoryAllocator(WarehouseNetwork(warehouse_dicts),
+                           plan_cache=cache).allocate_batch, orders)
+    assert cached_shipments == uncached_shipments
+
+    print("%d orders drawn from %d carts of %d lines, %d warehouses"
+          % (args.orders, args.carts, args.lines, args.warehouses))
+    print("uncached: %10.0f orders/s" % (args.orders / uncached_time))
+    print("cached:   %10.0f orders/s" % (args.orders / cached_time))
+    print(" ".join("%s=%d" % entry for entry in cache.get_stats().items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure reserve, commit, release and expiry throughput of ReservationManager
+with many outstanding holds
+
+Holds are reserved with random time to live on a simulated clock until
+--holds are outstanding, then a mixed phase commits, releases and reserves
+holds while the clock advances, so expiry runs alongside, and finally the
+clock jumps past every expiry to time releasing all remaining holds.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_reservations --holds 1000000
+"""
+import argparse
+import random
+from src.reservations import ReservationManager
+from src.warehouse_network import WarehouseNetwork
+from .common import (get_peak_rss_mb, iter_zipf_orders,
+                     make_zipf_warehouse_dicts, timed)
+
+
+class SimulatedClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--items-per-warehouse", type=int, default=500)
+    parser.add_argument("--holds", type=int, default=1000000)
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--ttl", type=float, default=900.0)
+    args = parser.parse_args()
+
+    # Stock is scaled up so reserving every hold never runs out
+    warehouse_dicts = make_zipf_warehouse_dicts(
+        args.warehouses, args.items, args.items_per_warehouse,
+        max_quantity=50 * max(1, args.holds // 10000))
+    network = WarehouseNetwork(warehouse_dicts)
+    del warehouse_dicts
+    clock = SimulatedClock()
+    reservations = ReservationManager(network, default_ttl_s=args.ttl,
+                                      clock=clock)
+    rng = random.Random(2)
+    orders = list(iter_zipf_orders(args.holds + args.ops, args.items))
+
+    def reserve_all():
+        hold_ids = []
+        for order in orders[:args.holds]:
+            clock.now += 1e-4
+            hold = reservations.reserve(
+                order, rng.uniform(0.5, 1.5) * args.ttl)
+            if hold is not None:
+                hold_ids.append(hold[0])
+        return hold_ids
+
+    seconds, hold_ids = timed(reserve_all)
+    print("reserve   %10d holds %8.2fs %10.0f ops/s"
+          % (args.holds, seconds, args.holds / seconds))
+
+    def mixed():
+        counts = {"commit": 0, "release": 0, "reserve": 0, "stale": 0}
+        for order in orders[args.holds:]:
+            clock.now += args.ttl / args.ops
+            operation = rng.choice(("commit", "release", "reserve"))
+            if operation == "reserve":
+                hold = reservations.reserve(order)
+                if hold is not None:
+                    hold_ids.append(hold[0])
+                counts[operation] += 1
+                continue
+            index = rng.randrange(len(hold_ids))
+            hold_ids[index], hold_ids[-1] = hold_ids[-1], hold_ids[index]
+            try:
+                getattr(reservations, operation)(hold_ids.pop())
+                counts[operation] += 1
+            except ValueError:
+                # The hold expired before it was picked
+                counts["stale"] += 1
+        return counts
+
+    seconds, counts = timed(mixed)
+    print("mixed     %10d ops   %8.2fs %10.0f ops/s  %s"
+          % (args.ops, seconds, args.ops / seconds,
+             ", ".join("%s %d" % item for item in sorted(counts.items()))))
+
+    outstanding = reservations.get_hold_count()
+    clock.now += 2 * args.ttl
+    seconds, expired = timed(reservations.expire)
+    print("expire    %10d holds %8.2fs %10.0f ops/s"
+          % (expired, seconds, expired / seconds if seconds else 0.0))
+    assert expired == outstanding
+    print("peak RSS  %10.1f MB" % get_peak_rss_mb())
+
+
+if __name__ == "__main__":
+    main()
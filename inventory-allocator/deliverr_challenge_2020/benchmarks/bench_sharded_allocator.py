@@ -0,0 +1,59 @@
+"""
+Measure throughput of ShardedInventoryAllocator as the number of worker
+processes grows, against a single process InventoryAllocator
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_sharded_allocator
+"""
+import argparse
+import os
+from src.inventory_allocator import InventoryAllocator
+from src.sharded_allocator import ShardedInventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--warehouses", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--items-per-warehouse", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--lines", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse,
+                                           max_quantity=100)
+    orders = make_orders(args.orders, args.items, args.lines)
+    batches = [orders[start:start + args.batch_size]
+               for start in range(0, args.orders, args.batch_size)]
+
+    allocator = InventoryAllocator(WarehouseNetwork(warehouse_dicts))
+    single_time, expected_result = timed(
+        lambda: [shipment for batch in batches
+                 for shipment in allocator.allocate_batch(batch)])
+
+    print("%d orders of %d lines, %d warehouses x %d SKUs, %d CPUs"
+          % (args.orders, args.lines, args.warehouses, args.items,
+             os.cpu_count()))
+    print("%8s %10s %12s %10s" % ("shards", "start s", "orders/s", "speedup"))
+    print("%8s %10s %12.0f %10s" % ("none", "-", args.orders / single_time,
+                                    "1.00x"))
+    for num_shards in args.shards:
+        start_time, sharded = timed(ShardedInventoryAllocator,
+                                    warehouse_dicts, num_shards)
+        with sharded:
+            sharded_time, result = timed(
+                lambda: [shipment for batch in batches
+                         for shipment in sharded.allocate_batch(batch)])
+        assert result == expected_result
+        print("%8d %10.3f %12.0f %9.2fx"
+              % (num_shards, start_time, args.orders / sharded_time,
+                 single_time / sharded_time))
+
+
+if __name__ == "__main__":
+    main()
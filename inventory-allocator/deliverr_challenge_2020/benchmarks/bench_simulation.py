@@ -0,0 +1,119 @@
+"""
+Measure replaying an order log against many what-if scenarios in one
+vectorized pass, against allocating the log once per scenario
+
+Scenarios reorder warehouse priorities, close warehouses, open new ones
+and schedule restocks of popular SKUs. The same Zipfian order log is
+replayed by a ScenarioSimulator and by replay_scenario for a sample of the
+scenarios, whose time is scaled up to all of them, and the results of the
+sample are checked to match. With --processes the simulator's scenarios
+are also shared between worker processes reading the log from a file.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_simulation --scenarios 64 --orders 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from src.json_codec import dumps
+from src.scenario_simulation import (ScenarioSimulator, replay_scenario,
+                                     simulate)
+from .common import (item_name, iter_zipf_orders, make_zipf_warehouse_dicts,
+                     timed)
+
+
+def make_scenarios(num_scenarios: int, warehouse_dicts: list,
+                   num_items: int, num_orders: int, seed: int = 2) -> list:
+    """Return scenarios each making one kind of change to the network"""
+    rng = random.Random(seed)
+    names = [inp_warehouse["name"] for inp_warehouse in warehouse_dicts]
+    popular = [item_name(item_id) for item_id in range(min(num_items, 50))]
+    scenarios = [{"name": "base"}]
+    for number in range(1, num_scenarios):
+        kind = number % 4
+        if kind == 0:
+            scenario = {"priority": rng.sample(names, 20)}
+        elif kind == 1:
+            scenario = {"remove_warehouses": rng.sample(names, 10)}
+        elif kind == 2:
+            scenario = {"priority": ["new"], "add_warehouses": [
+                {"name": "new", "inventory": {item: rng.randint(50, 500)
+                                              for item in popular}}]}
+        else:
+            scenario = {"restocks": [
+                [rng.randrange(num_orders), rng.choice(names),
+                 rng.choice(popular), rng.randint(20, 200)]
+                for _ in range(100)]}
+        scenario["name"] = "scenario-%d" % number
+        scenarios.append(scenario)
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=500)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--scenarios", type=int, default=64)
+    parser.add_argument("--sample", type=int, default=4,
+                        help="scenarios allocated one at a time")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="also simulate with this many processes")
+    parser.add_argument("--min-speedup", type=float, default=1.0)
+    args = parser.parse_args()
+
+    warehouse_dicts = make_zipf_warehouse_dicts(
+        args.warehouses, args.items, args.items_per_warehouse)
+    orders = list(iter_zipf_orders(args.orders, args.items))
+    scenarios = make_scenarios(args.scenarios, warehouse_dicts, args.items,
+                               args.orders)
+    print("%d warehouses, %d SKUs, %d orders, %d scenarios"
+          % (args.warehouses, args.items, args.orders, args.scenarios))
+
+    def run_simulator():
+        simulator = ScenarioSimulator(warehouse_dicts, scenarios)
+        simulator.replay(orders)
+        return simulator.get_results()
+
+    vectorized_time, results = timed(run_simulator)
+    sample = scenarios[:args.sample]
+    sample_time, sample_results = timed(
+        lambda: [replay_scenario(warehouse_dicts, orders, scenario)
+                 for scenario in sample])
+    if sample_results != results[:args.sample]:
+        sys.exit("vectorized results differ from allocating each scenario")
+    sequential_time = sample_time * len(scenarios) / len(sample)
+
+    print("%-22s %10s %18s" % ("replay", "seconds", "scenario orders/s"))
+    scenario_orders = args.orders * len(scenarios)
+    print("%-22s %10.2f %18.0f" % ("one scenario at a time",
+                                   sequential_time,
+                                   scenario_orders / sequential_time))
+    print("%-22s %10.2f %18.0f" % ("vectorized", vectorized_time,
+                                   scenario_orders / vectorized_time))
+    if args.processes:
+        with tempfile.TemporaryDirectory() as directory:
+            order_log = os.path.join(directory, "orders.jsonl")
+            with open(order_log, "wb") as log_file:
+                log_file.write(b"\n".join(map(dumps, orders)) + b"\n")
+            seconds, _ = timed(simulate, warehouse_dicts, order_log,
+                               scenarios, args.processes)
+        print("%-22s %10.2f %18.0f"
+              % ("%d processes" % args.processes, seconds,
+                 scenario_orders / seconds))
+    for result in results[:5]:
+        print("%-12s fill %.3f  split %.3f  warehouses/order %.2f"
+              % (result["name"], result["fill_rate"], result["split_rate"],
+                 result["warehouses_per_order"]))
+    speedup = sequential_time / vectorized_time
+    print("vectorized replay is %.1fx faster" % speedup)
+    if speedup < args.min_speedup:
+        sys.exit("speedup %.1fx is below %.1fx"
+                 % (speedup, args.min_speedup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Measure allocation preferring warehouses near each order's destination
+against a network of 50k located warehouses
+
+The same Zipfian order stream, each order with a random destination, is
+allocated by priority and nearest first on fresh copies of the network.
+For comparison, the time to rank the whole network by distance from each
+destination is measured, which is what every order would cost without the
+spatial index.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_spatial_index --warehouses 50000
+"""
+import argparse
+import random
+import time
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import iter_zipf_orders, make_zipf_warehouse_dicts, timed
+
+
+def make_location(rng: random.Random) -> list:
+    """Return a random latitude and longitude within the contiguous US"""
+    return [rng.uniform(25, 49), rng.uniform(-124, -67)]
+
+
+def allocate(network: WarehouseNetwork, orders: list, destinations: list
+             ) -> tuple:
+    """Return orders per second and p50 and p99 latency in microseconds"""
+    allocator = InventoryAllocator(network)
+    latencies = []
+    for order, destination in zip(orders, destinations):
+        start = time.perf_counter()
+        allocator.allocate_inventory(order, destination=destination)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return (len(orders) / sum(latencies),
+            1e6 * latencies[len(latencies) // 2],
+            1e6 * latencies[int(0.99 * len(latencies))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=50000)
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--items-per-warehouse", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--sorts", type=int, default=50,
+                        help="destinations to rank the whole network from")
+    args = parser.parse_args()
+
+    rng = random.Random(4)
+    warehouse_dicts = make_zipf_warehouse_dicts(
+        args.warehouses, args.items, args.items_per_warehouse)
+    for warehouse in warehouse_dicts:
+        warehouse["location"] = make_location(rng)
+    orders = list(iter_zipf_orders(args.orders, args.items))
+    destinations = [make_location(rng) for _ in orders]
+    print("%d warehouses, %d SKUs, %d orders"
+          % (args.warehouses, args.items, args.orders))
+
+    build_time, network = timed(WarehouseNetwork, warehouse_dicts)
+    print("build with spatial index %8.2fs" % build_time)
+    print("%-14s %10s %10s %10s" % ("ranking", "orders/s", "p50 us",
+                                    "p99 us"))
+    print("%-14s %10.0f %10.1f %10.1f"
+          % (("priority",) + allocate(network, orders,
+                                      [None] * len(orders))))
+    network = WarehouseNetwork(warehouse_dicts)
+    print("%-14s %10.0f %10.1f %10.1f"
+          % (("nearest first",) + allocate(network, orders, destinations)))
+
+    warehouse_list = network.get_warehouse_list()
+
+    def sort_network():
+        for destination in destinations[:args.sorts]:
+            network.get_nearest_warehouses(destination).sort(warehouse_list)
+
+    seconds, _ = timed(sort_network)
+    print("ranking the whole network takes %.1f us per order"
+          % (1e6 * seconds / args.sorts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Reproducible benchmark suite reporting throughput, latency percentiles and
+peak memory of InventoryAllocator across network scale tiers
+
+Networks and order streams are generated from a seed with Zipfian SKU
+popularity, lognormal warehouse sizes and sparse coverage. Each tier runs
+in a fresh interpreter so its peak memory is its own, --repeat times, and
+the median of each result is reported to damp noise. Results are written
+as JSON, and a previous result can be passed with --compare to fail the
+run if any tier regressed by more than --threshold percent.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_suite --output baseline.json
+    python -m benchmarks.bench_suite --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import (get_peak_rss_mb, iter_zipf_orders,
+                     make_zipf_warehouse_dicts, timed)
+
+TIERS = {
+    "small": {"warehouses": 100, "items": 1000, "items_per_warehouse": 50,
+              "orders": 20000},
+    "medium": {"warehouses": 1000, "items": 10000,
+               "items_per_warehouse": 200, "orders": 100000},
+    "large": {"warehouses": 10000, "items": 50000,
+              "items_per_warehouse": 200, "orders": 200000},
+}
+# Metrics compared between runs, and whether a higher value is better
+COMPARED_METRICS = {"orders_per_s": True, "p99_us": False,
+                    "peak_rss_mb": False}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Return the value below which fraction of sorted_values fall"""
+    return sorted_values[min(len(sorted_values) - 1,
+                             int(fraction * len(sorted_values)))]
+
+
+def run_tier(tier: dict, seed: int) -> dict:
+    """Return the results of allocating a tier's order stream"""
+    warehouse_dicts = make_zipf_warehouse_dicts(
+        tier["warehouses"], tier["items"], tier["items_per_warehouse"],
+        seed=seed)
+    orders = list(iter_zipf_orders(tier["orders"], tier["items"],
+                                   seed=seed + 1))
+    build_time, network = timed(WarehouseNetwork, warehouse_dicts)
+    del warehouse_dicts
+    allocator = InventoryAllocator(network)
+
+    latencies = []
+    filled = 0
+    for order in orders:
+        start = time.perf_counter()
+        shipment = allocator.allocate_inventory(order)
+        latencies.append(time.perf_counter() - start)
+        if shipment:
+            filled += 1
+    elapsed = sum(latencies)
+    latencies.sort()
+    return {
+        "build_s": build_time,
+        "orders_per_s": len(orders) / elapsed,
+        "p50_us": 1e6 * percentile(latencies, 0.5),
+        "p90_us": 1e6 * percentile(latencies, 0.9),
+        "p99_us": 1e6 * percentile(latencies, 0.99),
+        "max_us": 1e6 * latencies[-1],
+        "fill_rate": float(filled) / len(orders),
+        "peak_rss_mb": get_peak_rss_mb(),
+    }
+
+
+def find_regressions(baseline: dict, results: dict,
+                     threshold: float) -> list:
+    """
+    Return a message for each tier metric worse than in baseline by more
+    than threshold percent
+
+    Parameters:
+        baseline: Results of an earlier run.
+        results: Results of this run.
+        threshold: Percent a metric may worsen by.
+
+    """
+    regressions = []
+    for tier_name, tier_results in results["tiers"].items():
+        baseline_tier = baseline["tiers"].get(tier_name)
+        if baseline_tier is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            change = 100.0 * (tier_results[metric] / baseline_tier[metric]
+                              - 1)
+            worse_by = -change if higher_is_better else change
+            if worse_by > threshold:
+                regressions.append("%s %s %.4g -> %.4g (%+.1f%%)"
+                                   % (tier_name, metric,
+                                      baseline_tier[metric],
+                                      tier_results[metric], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--tiers", nargs="+", choices=list(TIERS),
+                        default=list(TIERS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="file to write JSON results to")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent a metric may worsen by")
+    parser.add_argument("--run-tier", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_tier:
+        print(json.dumps(run_tier(TIERS[args.run_tier], args.seed)))
+        return
+
+    results = {"seed": args.seed, "repeat": args.repeat,
+               "python": platform.python_version(),
+               "machine": platform.machine(), "tiers": {}}
+    print("%-8s %9s %11s %9s %9s %9s %9s %7s %9s"
+          % ("tier", "build s", "orders/s", "p50 us", "p90 us", "p99 us",
+             "max us", "filled", "RSS MB"))
+    for tier_name in args.tiers:
+        runs = [json.loads(subprocess.check_output(
+                    [sys.executable, "-m", "benchmarks.bench_suite",
+                     "--run-tier", tier_name, "--seed", str(args.seed)]))
+                for _ in range(args.repeat)]
+        tier_results = results["tiers"][tier_name] = {
+            metric: statistics.median(run[metric] for run in runs)
+            for metric in runs[0]}
+        print("%-8s %9.2f %11.0f %9.1f %9.1f %9.1f %9.1f %6.1f%% %9.1f"
+              % (tier_name, tier_results["build_s"],
+                 tier_results["orders_per_s"], tier_results["p50_us"],
+                 tier_results["p90_us"], tier_results["p99_us"],
+                 tier_results["max_us"], 100 * tier_results["fill_rate"],
+                 tier_results["peak_rss_mb"]))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("seed") != args.seed:
+            sys.exit("%s was run with seed %s, not %d"
+                     % (args.compare, baseline.get("seed"), args.seed))
+        regressions = find_regressions(baseline, results, args.threshold)
+        for regression in regressions:
+            print("regression: " + regression)
+        if regressions:
+            sys.exit("%d metrics regressed by more than %.1f%%"
+                     % (len(regressions), args.threshold))
+        print("no metric regressed by more than %.1f%%" % args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Microbenchmark building warehouses, probes, shipments and memory against
+a dict of changed stock over the caller's inventory, and against copying
+every item into slots when the warehouse is built
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_warehouse
+"""
+import argparse
+import gc
+import random
+import time
+import timeit
+import tracemalloc
+from array import array
+from sys import intern
+from src.warehouse import Warehouse
+from .common import item_name, make_warehouse_dicts
+
+
+class DictWarehouse(object):
+    """Changed stock kept in a dict over the caller's inventory"""
+
+    def __init__(self, name, inventory):
+        self.__name = name
+        self.__inventory = inventory
+        self.__stock_changes = {}
+        self.__to_be_shipped = {}
+
+    def get_quantity(self, item):
+        quantity = self.__stock_changes.get(item)
+        if quantity is None:
+            quantity = self.__inventory.get(item, 0)
+        return quantity if quantity > 0 else 0
+
+    def remove_stock(self, item, quantity):
+        quantity_in_stock = self.get_quantity(item)
+        if quantity <= 0 or quantity_in_stock == 0:
+            return 0
+        removed = min(quantity_in_stock, quantity)
+        self.__stock_changes[item] = quantity_in_stock - removed
+        return removed
+
+    def process_item_shipment(self, item, quantity):
+        removed = self.remove_stock(item, quantity)
+        if removed:
+            self.__to_be_shipped[item] = removed
+
+
+class CopiedWarehouse(object):
+    """Every item copied into slots of an array when built"""
+
+    __slots__ = ("__slots_by_item", "__quantities", "__to_be_shipped")
+
+    def __init__(self, name, inventory):
+        self.__slots_by_item = {}
+        self.__quantities = array("q")
+        for item, quantity in inventory.items():
+            if quantity > 0:
+                self.__slots_by_item[intern(item)] = len(self.__quantities)
+                self.__quantities.append(quantity)
+        self.__to_be_shipped = {}
+
+    def get_quantity(self, item):
+        slot = self.__slots_by_item.get(item)
+        return 0 if slot is None else self.__quantities[slot]
+
+    def remove_stock(self, item, quantity):
+        slot = self.__slots_by_item.get(item)
+        if slot is None or quantity <= 0:
+            return 0
+        removed = min(self.__quantities[slot], quantity)
+        self.__quantities[slot] -= removed
+        return removed
+
+    def process_item_shipment(self, item, quantity):
+        removed = self.remove_stock(item, quantity)
+        if removed:
+            self.__to_be_shipped[item] = removed
+
+
+def time_shipments(warehouse_class, inventory, probes) -> float:
+    """Return seconds to process a shipment of each probe at a new warehouse"""
+    warehouse = warehouse_class("wh", inventory)
+    start = time.perf_counter()
+    for item in probes:
+        warehouse.process_item_shipment(item, 1)
+    return time.perf_counter() - start
+
+
+def measure_memory(warehouse_class, args) -> float:
+    """
+    Return bytes held per warehouse once the caller drops the input dicts,
+    counting any a warehouse keeps
+
+    """
+    gc.collect()
+    tracemalloc.start()
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse)
+    warehouses = [warehouse_class(inp["name"], inp["inventory"])
+                  for inp in warehouse_dicts]
+    del warehouse_dicts
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del warehouses
+    return held / float(args.warehouses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--items-per-warehouse", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    inp = make_warehouse_dicts(1, args.items, args.items_per_warehouse)[0]
+    rng = random.Random(3)
+    # Half the probes hit stocked items, half miss
+    probes = (rng.choices(list(inp["inventory"]), k=args.probes // 2)
+              + [item_name(rng.randrange(args.items))
+                 for _ in range(args.probes - args.probes // 2)])
+
+    print("%d probes x %d, %d SKUs per warehouse"
+          % (args.probes, args.repeat, args.items_per_warehouse))
+    for warehouse_class in (DictWarehouse, CopiedWarehouse, Warehouse):
+        build_time = min(timeit.repeat(
+            lambda: warehouse_class("wh", inp["inventory"]),
+            number=args.repeat, repeat=5))
+        warehouse = warehouse_class("wh", inp["inventory"])
+        probe_time = min(timeit.repeat(
+            lambda: [warehouse.get_quantity(item) for item in probes],
+            number=args.repeat, repeat=5))
+        ship_time = min(time_shipments(warehouse_class, inp["inventory"],
+                                       probes) for _ in range(args.repeat))
+        print("%-15s build %8.1f ns  get_quantity %6.1f ns  "
+              "process_item_shipment %6.1f ns  %8.0f bytes/warehouse"
+              % (warehouse_class.__name__, 1e9 * build_time / args.repeat,
+                 1e9 * probe_time / (args.probes * args.repeat),
+                 1e9 * ship_time / args.probes,
+                 measure_memory(warehouse_class, args)))
+
+
+if __name__ == "__main__":
+    main()
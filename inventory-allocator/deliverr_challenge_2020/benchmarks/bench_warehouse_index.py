@@ -0,0 +1,83 @@
+"""
+Compare the indexed InventoryAllocator against a full scan of the network
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_warehouse_index
+"""
+import argparse
+from src.inventory_allocator import InventoryAllocator
+from src.typing import Inventory_Dist, Input_Warehouse_List, Shipment
+from src.warehouse import Warehouse
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def allocate_by_scanning(order: Inventory_Dist,
+                         warehouse_dicts: Input_Warehouse_List) -> Shipment:
+    """Allocate order by probing every warehouse for every order line"""
+    warehouses = [Warehouse(inp["name"], inp["inventory"])
+                  for inp in warehouse_dicts]
+    for item, quantity in order.items():
+        if quantity == 0:
+            continue
+        total_amount = 0
+        for warehouse in warehouses:
+            quantity_in_warehouse = warehouse.get_quantity(item)
+            if quantity_in_warehouse >= quantity:
+                warehouse.process_item_shipment(item, quantity)
+                break
+            total_amount += quantity_in_warehouse
+        else:
+            if total_amount >= quantity:
+                quantity_left = quantity
+                for warehouse in warehouses:
+                    shipping_quantity = min(warehouse.get_quantity(item),
+                                            quantity_left)
+                    if shipping_quantity > 0:
+                        quantity_left -= shipping_quantity
+                        warehouse.process_item_shipment(item,
+                                                        shipping_quantity)
+                    if quantity_left <= 0:
+                        break
+    shipment = []
+    for warehouse in warehouses:
+        warehouse_shipment = warehouse.ship_processed_shipments()
+        if warehouse_shipment:
+            shipment.append(warehouse_shipment)
+    return shipment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--items-per-warehouse", type=int, default=100)
+    parser.add_argument("--lines", type=int, default=5000)
+    args = parser.parse_args()
+
+    warehouse_dicts = make_warehouse_dicts(args.warehouses, args.items,
+                                           args.items_per_warehouse)
+    order = make_orders(1, args.items, args.lines)[0]
+
+    # An empty order measures the cost of building warehouses (and the index)
+    scan_build, _ = timed(allocate_by_scanning, {}, warehouse_dicts)
+    index_build, _ = timed(InventoryAllocator().allocate_inventory, {},
+                           warehouse_dicts)
+    scan_time, scan_shipment = timed(allocate_by_scanning, order,
+                                     warehouse_dicts)
+    index_time, index_shipment = timed(InventoryAllocator().allocate_inventory,
+                                       order, warehouse_dicts)
+    assert scan_shipment == index_shipment
+
+    print("%d warehouses x %d SKUs, order of %d lines"
+          % (args.warehouses, args.items, args.lines))
+    print("%-10s %10s %10s %10s" % ("", "total s", "build s", "allocate s"))
+    print("%-10s %10.3f %10.3f %10.3f" % ("full scan", scan_time, scan_build,
+                                          scan_time - scan_build))
+    print("%-10s %10.3f %10.3f %10.3f" % ("indexed", index_time, index_build,
+                                          index_time - index_build))
+    print("allocation speedup: %.1fx"
+          % ((scan_time - scan_build) / (index_time - index_build)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measure per-order latency of sequential orders against a persistent network
+
+Networks of increasing size are built once each, then the same stream of
+orders is allocated against them, showing that per-order latency does not
+depend on the cost of building the network.
+
+Run from the deliverr_challenge_2020 folder:
+    python -m benchmarks.bench_warehouse_network
+"""
+import argparse
+import time
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+from .common import make_orders, make_warehouse_dicts, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--warehouses", type=int, nargs="+",
+                        default=[100, 1000, 10000])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--stockers-per-item", type=int, default=10)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--lines", type=int, default=3)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders, args.items, args.lines, max_quantity=5)
+    print("%d orders of %d lines, %d SKUs"
+          % (args.orders, args.lines, args.items))
+    print("%10s %10s %12s %12s %12s" % ("warehouses", "build s",
+                                         "orders/s", "us/order", "filled"))
+    for num_warehouses in args.warehouses:
+        # Keep the number of warehouses stocking each SKU and the total stock
+        # fixed, so only the size of the network changes
+        items_per_warehouse = min(args.items, args.stockers_per_item
+                                  * args.items // num_warehouses)
+        max_quantity = max(20, 4 * args.orders * args.lines * 5
+                           // (num_warehouses * items_per_warehouse))
+        warehouse_dicts = make_warehouse_dicts(
+            num_warehouses, args.items, items_per_warehouse,
+            max_quantity=max_quantity)
+        build_time, network = timed(WarehouseNetwork, warehouse_dicts)
+        allocator = InventoryAllocator(network)
+
+        filled = 0
+        start = time.perf_counter()
+        for order in orders:
+            if allocator.allocate_inventory(order):
+                filled += 1
+        elapsed = time.perf_counter() - start
+        print("%10d %10.3f %12.0f %12.2f %11.1f%%"
+              % (num_warehouses, build_time, args.orders / elapsed,
+                 1e6 * elapsed / args.orders, 100.0 * filled / args.orders))
+
+
+if __name__ == "__main__":
+    main()
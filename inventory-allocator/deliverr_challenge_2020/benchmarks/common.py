@@ -0,0 +1,177 @@
+import random
+import resource
+import time
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Callable, Iterator, List, Tuple
+from src.typing import Inventory_Dist, Input_Warehouse_List
+
+
+def item_name(item_id: int) -> str:
+    """Return the SKU name used for a synthetic item id"""
+    return "sku-%d" % item_id
+
+
+def make_warehouse_dicts(num_warehouses: int, num_items: int,
+                         items_per_warehouse: int, max_quantity: int = 20,
+                         seed: int = 0) -> Input_Warehouse_List:
+    """
+    Return a synthetic network where each warehouse stocks a random sample
+    of the catalog
+
+    Parameters:
+        num_warehouses: Number of warehouses in the network.
+        num_items: Number of distinct SKUs in the catalog.
+        items_per_warehouse: Number of SKUs stocked by each warehouse.
+        max_quantity: Largest quantity of a SKU stocked by a warehouse.
+        seed: Seed for the random number generator.
+
+    """
+    rng = random.Random(seed)
+    warehouses = []
+    for warehouse_id in range(num_warehouses):
+        item_ids = rng.sample(range(num_items), items_per_warehouse)
+        warehouses.append({
+            "name": "wh-%d" % warehouse_id,
+            "inventory": {item_name(item_id): rng.randint(1, max_quantity)
+                          for item_id in item_ids},
+        })
+    return warehouses
+
+
+def make_orders(num_orders: int, num_items: int, lines_per_order: int,
+                max_quantity: int = 10, seed: int = 1) -> List[Inventory_Dist]:
+    """Return synthetic orders of uniformly random SKUs and quantities"""
+    rng = random.Random(seed)
+    return [{item_name(item_id): rng.randint(1, max_quantity)
+             for item_id in rng.sample(range(num_items), lines_per_order)}
+            for _ in range(num_orders)]
+
+
+def timed(func: Callable, *args, **kwargs) -> Tuple[float, object]:
+    """Return the wall clock seconds taken by func and its result"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Return peak resident memory of this process in MB
+
+    VmHWM is read where available since Linux carries ru_maxrss over from
+    the parent process across exec.
+
+    """
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class ZipfSampler(object):
+    """
+    Draws item ids where the id of rank r is drawn with probability
+    proportional to 1 / (r + 1) ** exponent, so id 0 is the most popular
+
+    Attributes:
+        __rng (random.Random): Source of randomness.
+        __cumulative (List[float]): Cumulative weight of each id.
+
+    """
+
+    def __init__(self, num_items: int, exponent: float, rng: random.Random):
+        self.__rng = rng
+        self.__cumulative = list(accumulate(
+            1.0 / (rank + 1) ** exponent for rank in range(num_items)))
+
+    def sample(self) -> int:
+        """Return a random item id"""
+        return bisect_left(self.__cumulative,
+                           self.__rng.random() * self.__cumulative[-1])
+
+    def sample_distinct(self, count: int) -> List[int]:
+        """
+        Return count distinct item ids, at most the number of items, topping
+        up with uniformly drawn ids if popular ids keep repeating
+
+        """
+        num_items = len(self.__cumulative)
+        count = min(count, num_items)
+        item_ids = {}
+        for _ in range(4 * count):
+            item_ids[self.sample()] = None
+            if len(item_ids) == count:
+                return list(item_ids)
+        while len(item_ids) < count:
+            item_ids[self.__rng.randrange(num_items)] = None
+        return list(item_ids)
+
+
+def make_zipf_warehouse_dicts(num_warehouses: int, num_items: int,
+                              mean_items_per_warehouse: int,
+                              exponent: float = 1.1, max_quantity: int = 50,
+                              seed: int = 0) -> Input_Warehouse_List:
+    """
+    Return a synthetic network with Zipfian SKU popularity, where
+    warehouse sizes follow a lognormal distribution and popular SKUs are
+    stocked by more warehouses in larger quantities
+
+    Parameters:
+        num_warehouses: Number of warehouses in the network.
+        num_items: Number of distinct SKUs in the catalog.
+        mean_items_per_warehouse: Average number of SKUs each warehouse
+            stocks, kept well below num_items for sparse coverage.
+        exponent: Zipf exponent of SKU popularity.
+        max_quantity: Largest quantity of the most popular SKU.
+        seed: Seed for the random number generator.
+
+    """
+    rng = random.Random(seed)
+    popularity = ZipfSampler(num_items, exponent, rng)
+    warehouses = []
+    for warehouse_id in range(num_warehouses):
+        # A lognormal with sigma 1 has mean exp(mu + 0.5)
+        size = min(num_items, max(1, int(rng.lognormvariate(0.0, 1.0)
+                                         * mean_items_per_warehouse
+                                         / 1.6487)))
+        inventory = {}
+        for item_id in popularity.sample_distinct(size):
+            scale = max(1, max_quantity // (1 + item_id // 100))
+            inventory[item_name(item_id)] = rng.randint(1, scale)
+        warehouses.append({"name": "wh-%d" % warehouse_id,
+                           "inventory": inventory})
+    return warehouses
+
+
+def iter_zipf_orders(num_orders: int, num_items: int, mean_lines: float = 3,
+                     exponent: float = 1.1, max_quantity: int = 5,
+                     seed: int = 1) -> Iterator[Inventory_Dist]:
+    """
+    Yield a stream of synthetic orders whose SKUs follow Zipfian popularity,
+    with a geometric number of lines and mostly small quantities
+
+    Parameters:
+        num_orders: Number of orders to yield.
+        num_items: Number of distinct SKUs in the catalog.
+        mean_lines: Average number of lines in an order.
+        exponent: Zipf exponent of SKU popularity.
+        max_quantity: Largest quantity of a line.
+        seed: Seed for the random number generator.
+
+    """
+    rng = random.Random(seed)
+    popularity = ZipfSampler(num_items, exponent, rng)
+    quantities = list(range(1, max_quantity + 1))
+    quantity_weights = [1.0 / quantity ** 2 for quantity in quantities]
+    for _ in range(num_orders):
+        num_lines = 1
+        while rng.random() > 1.0 / mean_lines:
+            num_lines += 1
+        yield {item_name(item_id): rng.choices(quantities,
+                                               quantity_weights)[0]
+               for item_id in popularity.sample_distinct(num_lines)}
@@ -0,0 +1,358 @@
+import os
+import threading
+from typing import List, Tuple
+from .json_codec import dumps, loads
+from .typing import Input_Warehouse_List, Shipment
+
+# Durability levels, from the strongest to the weakest
+DURABILITY_LEVELS = ("sync", "batch", "none")
+SNAPSHOT_PREFIX = "snapshot-"
+SEGMENT_PREFIX = "segment-"
+
+# Where available fdatasync skips flushing metadata such as the modification
+# time, which recovery doesn't need
+sync_file = getattr(os, "fdatasync", os.fsync)
+
+
+def get_sequence_files(directory: str, prefix: str) -> List[Tuple[int, str]]:
+    """
+    Return the sequence number in the name and path of every file in
+    directory whose name starts with prefix, in sequence order
+
+    """
+    files = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and not name.endswith(".tmp"):
+            files.append((int(name[len(prefix):].split(".")[0]),
+                          os.path.join(directory, name)))
+    return sorted(files)
+
+
+def sync_directory(directory: str):
+    """Make the creation, renaming and removal of files in directory durable"""
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def read_segment(path: str, is_last: bool) -> Tuple[List[Shipment], int]:
+    """
+    Return the records of the log segment at path and the length of the
+    file they take up
+
+    Only the last segment can end in a record torn by a crash while it was
+    written, which is left out.
+
+    Raises:
+        ValueError: If a record other than the last one of the last segment
+            can't be read.
+
+    Parameters:
+        path: Segment file to read.
+        is_last: True if no segment follows this one.
+
+    """
+    with open(path, "rb") as segment_file:
+        data = segment_file.read()
+    records, length = [], 0
+    lines = data.split(b"\n")
+    # Everything after the last newline was never completely written
+    for line_number, line in enumerate(lines[:-1], 1):
+        try:
+            records.append(loads(line))
+        except ValueError:
+            if not is_last or line_number < len(lines) - 1:
+                raise ValueError("Corrupt record at line %d of %s"
+                                 % (line_number, path))
+            break
+        length += len(line) + 1
+    return records, length
+
+
+class AllocationLog(object):
+    """
+    Append only log of stock changes, so the stock of a network survives a
+    crash, with snapshots so recovery only replays the log's tail
+
+    Each record is a Shipment of the stock removed by one order, or by an
+    adjustment with the negative of its delta, so recovery never applies
+    part of one. Records are encoded when appended and kept in memory
+    until written in a group, so concurrent orders share one write and
+    fsync. The durability level sets when records are written:
+
+    - sync: commit writes and fsyncs every record appended before it
+      returns, nothing is lost by a crash.
+    - batch: A background thread writes and fsyncs records once commit
+      finds batch_size waiting, or batch_interval_s after the last fsync,
+      so orders never wait for the disk. A crash loses at most the
+      records waiting.
+    - none: commit writes records once batch_size are waiting but they are
+      never fsynced. A process crash loses at most the records waiting,
+      but an operating system crash can lose everything since the last
+      snapshot.
+
+    Records are stored as JSON lines in segment files named after the
+    sequence number of their first record. A snapshot holds the warehouse
+    dicts of the network when the log reached the sequence number in its
+    name, and starts a new segment so older ones can be removed. Creating
+    a log recovers the warehouses from directory, or starts a log of
+    warehouse_dicts if directory holds none.
+
+    Attributes:
+        __directory (str): Folder holding the snapshot and segments.
+        __durability (str): One of DURABILITY_LEVELS.
+        __batch_size (int): Records waiting that trigger a write.
+        __batch_interval (float): Seconds between fsyncs of waiting records
+            with batch durability.
+        __checkpoint_records (int): Records after a snapshot that make
+            another one due.
+        __lock (threading.Lock): Guards the records waiting and the next
+            sequence number.
+        __write_lock (threading.Lock): Held while writing to the log files.
+        __pending (List[bytes]): Encoded records not yet written.
+        __next_sequence (int): Sequence number of the next record.
+        __snapshot_sequence (int): Sequence number of the last snapshot.
+        __synced_sequence (int): Records before this are durable.
+        __warehouse_dicts (Input_Warehouse_List): Warehouses as recovered,
+            or as given if there was no log.
+        __file (BinaryIO): Segment records are written to.
+        __batch_full (threading.Event): Set to wake the flusher early.
+        __closing (bool): True once the log is closing.
+        __flusher (threading.Thread): Writes batches in the background,
+            None unless durability is batch.
+
+    """
+
+    def __init__(self, directory: str,
+                 warehouse_dicts: Input_Warehouse_List = None,
+                 durability: str = "batch", batch_size: int = 1024,
+                 batch_interval_s: float = 0.05,
+                 checkpoint_records: int = 1000000):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError("Durability must be one of %s"
+                             % ", ".join(DURABILITY_LEVELS))
+        self.__directory = directory
+        self.__durability = durability
+        self.__batch_size = batch_size
+        self.__batch_interval = batch_interval_s
+        self.__checkpoint_records = checkpoint_records
+        self.__lock = threading.Lock()
+        self.__write_lock = threading.Lock()
+        self.__pending = []
+        os.makedirs(directory, exist_ok=True)
+        snapshots = get_sequence_files(directory, SNAPSHOT_PREFIX)
+        if snapshots:
+            self.__recover(*snapshots[-1])
+        elif warehouse_dicts is None:
+            raise ValueError("No log in %s to recover and no warehouses to "
+                             "start one" % directory)
+        else:
+            self.__warehouse_dicts = warehouse_dicts
+            self.__next_sequence = self.__snapshot_sequence = 0
+            self.__write_snapshot(warehouse_dicts)
+        self.__synced_sequence = self.__next_sequence
+        self.__file = open(self.__get_segment_path(self.__next_sequence),
+                           "ab")
+        # Records fsynced to a new segment are lost with it unless its
+        # directory entry is durable too
+        sync_directory(directory)
+        self.__batch_full = threading.Event()
+        self.__closing = False
+        self.__flusher = None
+        if durability == "batch":
+            self.__flusher = threading.Thread(target=self.__flush_batches,
+                                              daemon=True)
+            self.__flusher.start()
+
+    def __get_segment_path(self, sequence: int) -> str:
+        """Return path of the segment starting at sequence"""
+        return os.path.join(self.__directory,
+                            "%s%020d.log" % (SEGMENT_PREFIX, sequence))
+
+    def __recover(self, snapshot_sequence: int, snapshot_path: str):
+        """
+        Load the snapshot at snapshot_path and apply every later record,
+        cutting off a torn record at the end of the log
+
+        """
+        with open(snapshot_path, "rb") as snapshot_file:
+            self.__warehouse_dicts = loads(snapshot_file.read())
+        inventories = {inp_warehouse["name"]: inp_warehouse["inventory"]
+                       for inp_warehouse in self.__warehouse_dicts}
+        self.__next_sequence = self.__snapshot_sequence = snapshot_sequence
+        segments = get_sequence_files(self.__directory, SEGMENT_PREFIX)
+        for position, (start, path) in enumerate(segments):
+            is_last = position == len(segments) - 1
+            records, length = read_segment(path, is_last)
+            for sequence, record in enumerate(records, start):
+                if sequence < snapshot_sequence:
+                    continue
+                for warehouse_shipment in record:
+                    for name, items in warehouse_shipment.items():
+                        inventory = inventories[name]
+                        for item, removed in items.items():
+                            quantity = inventory.get(item, 0) - removed
+                            if quantity:
+                                inventory[item] = quantity
+                            else:
+                                inventory.pop(item, None)
+            self.__next_sequence = max(self.__next_sequence,
+                                       start + len(records))
+            if is_last and length < os.path.getsize(path):
+                os.truncate(path, length)
+
+    def __write_snapshot(self, warehouse_dicts: Input_Warehouse_List):
+        """
+        Durably write warehouse_dicts as the snapshot at the next sequence
+        number, then remove older snapshots and segments
+
+        """
+        sequence = self.__next_sequence
+        path = os.path.join(self.__directory,
+                            "%s%020d.json" % (SNAPSHOT_PREFIX, sequence))
+        with open(path + ".tmp", "wb") as snapshot_file:
+            snapshot_file.write(dumps(warehouse_dicts))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(path + ".tmp", path)
+        sync_directory(self.__directory)
+        for prefix in (SNAPSHOT_PREFIX, SEGMENT_PREFIX):
+            for old_sequence, old_path in get_sequence_files(
+                    self.__directory, prefix):
+                if old_sequence < sequence:
+                    os.remove(old_path)
+
+    def __write_pending(self) -> int:
+        """
+        Write every record waiting and return the sequence number every
+        record written comes before, the caller holds the write lock
+
+        """
+        with self.__lock:
+            records, self.__pending = self.__pending, []
+            sequence = self.__next_sequence
+        if records:
+            records.append(b"")
+            self.__file.write(b"\n".join(records))
+            self.__file.flush()
+        return sequence
+
+    def __sync(self, sequence: int):
+        """
+        fsync the segment once records before sequence are written, the
+        caller holds the write lock
+
+        """
+        sync_file(self.__file.fileno())
+        self.__synced_sequence = sequence
+
+    def __flush_batches(self):
+        """Write and fsync waiting records until the log closes"""
+        while not self.__closing:
+            self.__batch_full.wait(self.__batch_interval)
+            self.__batch_full.clear()
+            with self.__write_lock:
+                if self.__pending:
+                    self.__sync(self.__write_pending())
+
+    def get_warehouse_dicts(self) -> Input_Warehouse_List:
+        """
+        Return warehouse dicts with the stock recovered from the log, or the
+        warehouse dicts given if there was no log, to build the network from
+
+        """
+        return self.__warehouse_dicts
+
+    def get_next_sequence(self) -> int:
+        """Return sequence number the next record appended will have"""
+        with self.__lock:
+            return self.__next_sequence
+
+    def append(self, removed: Shipment):
+        """
+        Add a record of stock removed to the log, written by a later commit
+
+        A snapshot must hold every change recorded before it and none
+        after, so records should be appended while holding the locks of
+        their items.
+
+        Parameters:
+            removed: Amount of each item removed from each warehouse, a
+                negative amount for stock added.
+
+        """
+        record = dumps(removed)
+        with self.__lock:
+            self.__pending.append(record)
+            self.__next_sequence += 1
+
+    def commit(self):
+        """
+        Write records waiting as the durability level requires, which
+        should be called without holding any item locks
+
+        """
+        # Reading these without the lock is safe, a commit racing an append
+        # may miss the record but the commit after the append won't
+        sequence = self.__next_sequence
+        pending = len(self.__pending)
+        if self.__durability == "sync":
+            with self.__write_lock:
+                # A commit that held the lock first may have synced these
+                if self.__synced_sequence < sequence:
+                    self.__sync(self.__write_pending())
+            return
+        if pending < self.__batch_size:
+            return
+        if self.__durability == "batch":
+            self.__batch_full.set()
+            return
+        with self.__write_lock:
+            self.__write_pending()
+
+    def flush(self):
+        """Write and fsync every record appended, whatever the durability"""
+        with self.__write_lock:
+            self.__sync(self.__write_pending())
+
+    def is_checkpoint_due(self) -> bool:
+        """Return True if enough records follow the last snapshot"""
+        return (self.__next_sequence - self.__snapshot_sequence
+                >= self.__checkpoint_records)
+
+    def checkpoint(self, warehouse_dicts: Input_Warehouse_List):
+        """
+        Write a snapshot of warehouse_dicts and start a new segment, so
+        recovery only replays records appended after it
+
+        No records may be appended during the call.
+
+        Parameters:
+            warehouse_dicts: Warehouses with the stock left after every
+                record appended so far.
+
+        """
+        with self.__write_lock:
+            sequence = self.__write_pending()
+            self.__sync(sequence)
+            self.__file.close()
+            self.__file = open(self.__get_segment_path(sequence), "ab")
+            self.__write_snapshot(warehouse_dicts)
+            self.__snapshot_sequence = sequence
+
+    def close(self):
+        """Write and fsync every record appended and close the log"""
+        if self.__flusher is not None:
+            self.__closing = True
+            self.__batch_full.set()
+            self.__flusher.join()
+        self.flush()
+        self.__file.close()
+
+    def __enter__(self) -> "AllocationLog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,151 @@
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# Upper bounds of histogram buckets for timings, in seconds
+TIME_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+# Upper bounds of histogram buckets for counts, such as warehouses probed
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000,
+                 10000, 20000, 50000)
+
+
+class MetricsSink(object):
+    """
+    Receives counters and histogram observations from InventoryAllocator
+
+    Counters recorded by the allocator are orders, lines_single_warehouse,
+    lines_split, lines_rejected and orders_rejected. Histograms are
+    network_build_seconds, order_seconds, probe_seconds, split_seconds and
+    warehouses_probed.
+
+    """
+
+    def increment(self, name: str, amount: float = 1):
+        """Add amount to the counter called name"""
+        raise NotImplementedError
+
+    def observe(self, name: str, value: float):
+        """Record value in the histogram called name"""
+        raise NotImplementedError
+
+
+class InMemorySink(MetricsSink):
+    """
+    Keeps counters and bucketed histograms in memory, safe to share between
+    threads
+
+    Histograms whose name ends in _seconds use TIME_BUCKETS and the others
+    use COUNT_BUCKETS.
+
+    Attributes:
+        __lock (threading.Lock): Guards the counters and histograms.
+        __counters (Dict[str, float]): Value of each counter.
+        __histograms (Dict[str, List]): Count of observations in each
+            bucket, with the sum and count of all observations appended.
+
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__histograms = {}
+
+    def increment(self, name: str, amount: float = 1):
+        """Add amount to the counter called name"""
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float):
+        """Record value in the histogram called name"""
+        buckets = get_buckets(name)
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = self.__histograms[name] = \
+                    [0] * len(buckets) + [0, 0]
+            # Values above every bound only count towards the sum and count
+            bucket = bisect_left(buckets, value)
+            if bucket < len(buckets):
+                histogram[bucket] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def get_counters(self) -> Dict[str, float]:
+        """Return a copy of every counter by name"""
+        with self.__lock:
+            return dict(self.__counters)
+
+    def get_histogram(self, name: str) -> Dict[str, object]:
+        """
+        Return the histogram called name, with cumulative counts of
+        observations at or below each bucket bound, their sum and count
+
+        """
+        buckets = get_buckets(name)
+        with self.__lock:
+            histogram = list(self.__histograms.get(
+                name, [0] * len(buckets) + [0, 0]))
+        cumulative, total = [], 0
+        for bound, count in zip(buckets, histogram):
+            total += count
+            cumulative.append((bound, total))
+        return {"buckets": cumulative, "sum": histogram[-2],
+                "count": histogram[-1]}
+
+    def get_histogram_names(self) -> List[str]:
+        """Return names of histograms with observations"""
+        with self.__lock:
+            return sorted(self.__histograms)
+
+
+def get_buckets(name: str) -> Tuple[float, ...]:
+    """Return the bucket bounds of the histogram called name"""
+    return TIME_BUCKETS if name.endswith("_seconds") else COUNT_BUCKETS
+
+
+def format_prometheus(sink: InMemorySink,
+                      prefix: str = "inventory_allocator") -> str:
+    """
+    Return the metrics of sink in the Prometheus text exposition format
+
+    Parameters:
+        sink: Sink holding the metrics.
+        prefix: Prepended to every metric name.
+
+    """
+    lines = []
+    for name, value in sorted(sink.get_counters().items()):
+        metric = "%s_%s_total" % (prefix, name)
+        lines.append("# TYPE %s counter" % metric)
+        lines.append("%s %r" % (metric, value))
+    for name in sink.get_histogram_names():
+        metric = "%s_%s" % (prefix, name)
+        histogram = sink.get_histogram(name)
+        lines.append("# TYPE %s histogram" % metric)
+        for bound, count in histogram["buckets"]:
+            lines.append('%s_bucket{le="%r"} %d' % (metric, bound, count))
+        lines.append('%s_bucket{le="+Inf"} %d' % (metric, histogram["count"]))
+        lines.append("%s_sum %r" % (metric, histogram["sum"]))
+        lines.append("%s_count %d" % (metric, histogram["count"]))
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(sink: InMemorySink, path: str,
+                     prefix: str = "inventory_allocator"):
+    """
+    Write the metrics of sink to a Prometheus text file at path, replacing
+    it in one step so a collector never reads a partial file
+
+    Parameters:
+        sink: Sink holding the metrics.
+        path: File to write, such as one read by node_exporter's textfile
+            collector.
+        prefix: Prepended to every metric name.
+
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as metrics_file:
+        metrics_file.write(format_prometheus(sink, prefix))
+    os.replace(temp_path, path)
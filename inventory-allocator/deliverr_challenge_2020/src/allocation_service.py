@@ -0,0 +1,174 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from .inventory_allocator import InventoryAllocator
+from .typing import Inventory_Dist, Shipment
+
+
+def check_order(order: Inventory_Dist):
+    """
+    Check order maps item names to quantities the allocator can take
+
+    Raises:
+        TypeError: If order isn't a dict of str to int.
+        ValueError: If a quantity is negative.
+
+    """
+    if not isinstance(order, dict):
+        raise TypeError("Order must be a dict, not %s"
+                        % type(order).__name__)
+    for item, quantity in order.items():
+        if not isinstance(item, str) or not isinstance(quantity, int):
+            raise TypeError("Order must map item names to integer "
+                            "quantities, got %r: %r" % (item, quantity))
+        if quantity < 0:
+            raise ValueError("Quantity of %s can't be negative" % item)
+
+
+class AllocationService(object):
+    """
+    Asyncio front end to an allocator which coalesces concurrent allocate
+    calls into micro batches
+
+    A batch closes once it holds max_batch_size orders or max_batch_delay_ms
+    after its first order arrived, and is allocated as one job on a single
+    worker thread, so the event loop is never blocked and batches are
+    applied to the shared inventory one at a time in arrival order.
+
+    Orders are checked before they join a batch, so a malformed order only
+    fails its own caller. Within a job each order is allocated on its own
+    with allocate_batch, so an error allocating one order, such as from an
+    allocator without a network, only reaches its caller, and orders before
+    it keep the stock they were allocated and get their Shipments.
+
+    Attributes:
+        __allocator (InventoryAllocator): Allocator with a network, or any
+            object with the same allocate_batch method.
+        __max_batch_size (int): Most orders allocated in one batch.
+        __max_batch_delay (float): Seconds a batch waits for more orders.
+        __queue (asyncio.Queue): Orders with the future of their Shipment,
+            None when the service is stopping.
+        __executor (ThreadPoolExecutor): Thread batches are allocated on.
+        __batcher (asyncio.Task): Task collecting and allocating batches.
+
+    """
+
+    def __init__(self, allocator: InventoryAllocator,
+                 max_batch_size: int = 256, max_batch_delay_ms: float = 2.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.__allocator = allocator
+        self.__max_batch_size = max_batch_size
+        self.__max_batch_delay = max_batch_delay_ms / 1000.0
+        self.__queue = None
+        self.__executor = None
+        self.__batcher = None
+
+    async def __aenter__(self) -> "AllocationService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def start(self):
+        """Start allocating orders in the running event loop"""
+        if self.__batcher is not None:
+            raise RuntimeError("AllocationService is already running")
+        self.__queue = asyncio.Queue()
+        self.__executor = ThreadPoolExecutor(max_workers=1)
+        self.__batcher = asyncio.ensure_future(self.__run_batches())
+
+    async def stop(self):
+        """Allocate orders already queued, then stop the service"""
+        if self.__batcher is None:
+            return
+        self.__queue.put_nowait(None)
+        batcher, self.__batcher = self.__batcher, None
+        await batcher
+        self.__executor.shutdown()
+
+    async def allocate(self, order: Inventory_Dist) -> Shipment:
+        """
+        Returns Shipment of optimally allocated inventory, once the batch
+        holding order has been allocated
+
+        Raises:
+            RuntimeError: If the service is not running.
+            TypeError: If order isn't a dict of str to int.
+            ValueError: If a quantity is negative.
+
+        Parameters:
+            order: The order to be completed.
+
+        """
+        if self.__batcher is None:
+            raise RuntimeError("AllocationService is not running")
+        check_order(order)
+        future = asyncio.get_running_loop().create_future()
+        self.__queue.put_nowait((order, future))
+        return await future
+
+    async def __next_batch(self):
+        """
+        Return the next batch of queued requests, and whether the service
+        is stopping, waiting for the first request of the batch
+
+        """
+        loop = asyncio.get_running_loop()
+        request = await self.__queue.get()
+        if request is None:
+            return [], True
+        batch = [request]
+        deadline = loop.time() + self.__max_batch_delay
+        while len(batch) < self.__max_batch_size:
+            if self.__queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self.__queue.get(),
+                                                     timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                request = self.__queue.get_nowait()
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def __allocate_each(self, orders: List[Inventory_Dist]
+                        ) -> List[Tuple[Shipment, Exception]]:
+        """
+        Return the Shipment of each order, or the error raised allocating
+        it, allocating orders one after another
+
+        """
+        results = []
+        for order in orders:
+            try:
+                results.append(
+                    (self.__allocator.allocate_batch([order])[0], None))
+            except Exception as error:
+                results.append((None, error))
+        return results
+
+    async def __run_batches(self):
+        """Allocate batches of requests until the service is stopped"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch, stopping = await self.__next_batch()
+            if not batch:
+                continue
+            results = await loop.run_in_executor(
+                self.__executor, self.__allocate_each,
+                [order for order, _ in batch])
+            for (_, future), (shipment, error) in zip(batch, results):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(shipment)
+                else:
+                    future.set_exception(error)
@@ -0,0 +1,175 @@
+import time
+from typing import Dict, List, Set
+from .typing import Inventory_Dist
+from .warehouse import Warehouse
+from .warehouse_network import WarehouseNetwork
+
+
+class AllocationStrategy(object):
+    """
+    Decides which warehouses ship each item of an order, for use with
+    InventoryAllocator in place of its built in greedy allocation
+
+    """
+
+    def plan_order(self, network: WarehouseNetwork, order: Inventory_Dist
+                   ) -> Dict[Warehouse, Inventory_Dist]:
+        """
+        Return the amount of each item every warehouse should ship for order,
+        without changing any stock
+
+        Items that can't be shipped in full must be left out of the plan.
+
+        Parameters:
+            network: Network to plan shipments from.
+            order: The order to be completed.
+
+        """
+        raise NotImplementedError
+
+
+def plan_greedily(network: WarehouseNetwork, order: Inventory_Dist,
+                  warehouses: Set[Warehouse] = None
+                  ) -> Dict[Warehouse, Inventory_Dist]:
+    """
+    Return the plan InventoryAllocator's greedy allocation would process,
+    shipping each item from the cheapest warehouse that can ship all of it,
+    otherwise from warehouses in priority order
+
+    Parameters:
+        network: Network to plan shipments from.
+        order: The order to be completed.
+        warehouses: Only plan shipments from these warehouses if given.
+
+    """
+    plan = {}
+    for item, quantity in order.items():
+        if quantity <= 0:
+            continue
+        stocking = [warehouse for warehouse in network.get_warehouses(item)
+                    if warehouses is None or warehouse in warehouses]
+        single = next((warehouse for warehouse in stocking
+                       if warehouse.get_quantity(item) >= quantity), None)
+        if single is not None:
+            plan.setdefault(single, {})[item] = quantity
+            continue
+        if sum(warehouse.get_quantity(item) for warehouse in stocking) \
+                < quantity:
+            continue
+        quantity_left = quantity
+        for warehouse in stocking:
+            shipping_quantity = min(warehouse.get_quantity(item),
+                                    quantity_left)
+            plan.setdefault(warehouse, {})[item] = shipping_quantity
+            quantity_left -= shipping_quantity
+            if quantity_left <= 0:
+                break
+    return plan
+
+
+class MinimumCostStrategy(AllocationStrategy):
+    """
+    Ship every order from the set of warehouses with the lowest total cost,
+    by default the fewest warehouses, rather than choosing item by item
+
+    Sets of warehouses are searched with branch and bound, starting from the
+    warehouses greedy allocation would use. If the time budget runs out the
+    cheapest set found so far is used, which is never worse than greedy.
+    Items are then allocated greedily within the chosen warehouses, and
+    items that can't be shipped in full are skipped as with greedy.
+
+    Attributes:
+        __warehouse_costs (Dict[str, float]): Cost of shipping from each
+            warehouse by name, warehouses not listed cost 1.
+        __time_budget (float): Seconds to search for each order.
+
+    """
+
+    def __init__(self, warehouse_costs: Dict[str, float] = None,
+                 time_budget_ms: float = 50.0):
+        self.__warehouse_costs = warehouse_costs or {}
+        self.__time_budget = time_budget_ms / 1000.0
+
+    def __get_cost(self, warehouse: Warehouse) -> float:
+        """Return cost of shipping from warehouse"""
+        return self.__warehouse_costs.get(warehouse.get_name(), 1.0)
+
+    def __search(self, lines: List[Dict[Warehouse, int]],
+                 needs: List[int], deadline: float,
+                 incumbent: Set[Warehouse]) -> Set[Warehouse]:
+        """
+        Return the cheapest set of warehouses holding enough stock for every
+        line, or the cheapest found before deadline
+
+        Parameters:
+            lines: Stock of the line's item at each warehouse stocking it.
+            needs: Quantity ordered for each line.
+            deadline: perf_counter time to stop searching at.
+            incumbent: A set of warehouses known to cover every line.
+
+        """
+        best = [incumbent, sum(map(self.__get_cost, incumbent))]
+        cheapest = min(self.__get_cost(warehouse)
+                       for line in lines for warehouse in line)
+        seen = set()
+
+        def visit(chosen: List[Warehouse], cost: float,
+                  covered: List[int]):
+            if time.perf_counter() > deadline:
+                return
+            # Branch on the uncovered line with the fewest warehouses left
+            uncovered = None
+            for line_number, line in enumerate(lines):
+                if covered[line_number] < needs[line_number]:
+                    options = [warehouse for warehouse in line
+                               if warehouse not in chosen]
+                    if uncovered is None or len(options) < len(uncovered):
+                        uncovered = options
+            if uncovered is None:
+                best[:] = [set(chosen), cost]
+                return
+            if cost + cheapest >= best[1]:
+                return
+            for warehouse in sorted(uncovered, key=self.__get_cost):
+                warehouse_cost = cost + self.__get_cost(warehouse)
+                key = frozenset(chosen) | {warehouse}
+                if warehouse_cost >= best[1] or key in seen:
+                    continue
+                seen.add(key)
+                visit(chosen + [warehouse], warehouse_cost,
+                      [covered[line_number] + line.get(warehouse, 0)
+                       for line_number, line in enumerate(lines)])
+
+        visit([], 0.0, [0] * len(lines))
+        return best[0]
+
+    def plan_order(self, network: WarehouseNetwork, order: Inventory_Dist
+                   ) -> Dict[Warehouse, Inventory_Dist]:
+        """
+        Return the amount of each item every warehouse should ship for order,
+        using the cheapest set of warehouses found within the time budget
+
+        Parameters:
+            network: Network to plan shipments from.
+            order: The order to be completed.
+
+        """
+        deadline = time.perf_counter() + self.__time_budget
+        greedy_plan = plan_greedily(network, order)
+        if not greedy_plan or (len(greedy_plan) == 1
+                               and not self.__warehouse_costs):
+            # Nothing to ship, or already the fewest warehouses possible
+            return greedy_plan
+
+        # Only items greedy allocation can ship in full need covering
+        shipped_items = {item for items in greedy_plan.values()
+                         for item in items}
+        lines, needs = [], []
+        for item, quantity in order.items():
+            if item in shipped_items:
+                lines.append({warehouse: warehouse.get_quantity(item)
+                              for warehouse in network.get_warehouses(item)})
+                needs.append(quantity)
+
+        warehouses = self.__search(lines, needs, deadline, set(greedy_plan))
+        return plan_greedily(network, order, warehouses)
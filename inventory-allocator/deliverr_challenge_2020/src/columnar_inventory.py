@@ -0,0 +1,142 @@
+from array import array
+from typing import Dict, Iterable, List
+from .typing import Inventory_Dist, Input_Warehouse_List, Shipment
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ColumnarInventory(object):
+    """
+    Inventory of a warehouse network stored as a sparse warehouse by item
+    matrix, allocating orders with vectorized NumPy operations.
+
+    The matrix is stored column by column (CSC), so the warehouses stocking
+    an item and their quantities are contiguous slices in priority order.
+    Allocations produce the same Shipment as InventoryAllocator. Quantities
+    are stored as int32, so creating one with a larger quantity raises
+    ValueError.
+
+    Attributes:
+        __warehouse_names (List[str]): Warehouse names in priority order.
+        __warehouse_ranks (Dict[str, int]): Rank of each warehouse by name.
+        __item_ids (Dict[str, int]): Interned id of each item.
+        __item_starts (array): Start of each item's slice of
+            __ranks and __quantities, with the end of the last slice appended.
+        __ranks (numpy.ndarray): Rank of the warehouse for each stored entry.
+        __quantities (numpy.ndarray): Quantity in stock for each stored entry.
+
+    """
+
+    def __init__(self, warehouse_dicts: Input_Warehouse_List):
+        if numpy is None:
+            raise ImportError("ColumnarInventory requires numpy")
+        self.__warehouse_names = []
+        self.__warehouse_ranks = {}
+        self.__item_ids = {}
+        entry_items, entry_ranks, entry_quantities = (array("i"), array("i"),
+                                                      array("i"))
+        for rank, inp_warehouse in enumerate(warehouse_dicts):
+            self.__warehouse_names.append(inp_warehouse["name"])
+            self.__warehouse_ranks[inp_warehouse["name"]] = rank
+            for item, quantity in inp_warehouse["inventory"].items():
+                if quantity > 0:
+                    item_id = self.__item_ids.setdefault(
+                        item, len(self.__item_ids))
+                    try:
+                        entry_quantities.append(quantity)
+                    except OverflowError:
+                        raise ValueError("Quantity %d of %s does not fit in "
+                                         "an int32" % (quantity, item))
+                    entry_items.append(item_id)
+                    entry_ranks.append(rank)
+
+        # A stable sort by item keeps each item's warehouses in rank order
+        entry_items = numpy.frombuffer(entry_items, dtype=numpy.int32)
+        order = numpy.argsort(entry_items, kind="stable")
+        self.__ranks = numpy.frombuffer(entry_ranks, dtype=numpy.int32)[order]
+        self.__quantities = numpy.frombuffer(entry_quantities,
+                                             dtype=numpy.int32)[order]
+        # Kept as an array of Python ints since it is only indexed one item
+        # at a time, which is much faster than indexing a NumPy array
+        self.__item_starts = array("q", [0])
+        self.__item_starts.extend(numpy.cumsum(numpy.bincount(
+            entry_items, minlength=len(self.__item_ids))).tolist())
+
+    def get_quantity(self, warehouse_name: str, item: str) -> int:
+        """Return quantity of item in stock at the named warehouse"""
+        if (item not in self.__item_ids
+                or warehouse_name not in self.__warehouse_ranks):
+            return 0
+        item_id = self.__item_ids[item]
+        start = self.__item_starts[item_id]
+        end = self.__item_starts[item_id + 1]
+        matches = numpy.flatnonzero(
+            self.__ranks[start:end]
+            == self.__warehouse_ranks[warehouse_name])
+        return (int(self.__quantities[start + matches[0]]) if matches.size
+                else 0)
+
+    def __allocate_item(self, item: str, order_quantity: int,
+                        shipments: Dict[int, Inventory_Dist]):
+        """
+        Process shipments of an item from the cheapest warehouse that can ship
+        all of it, otherwise greedily across warehouses if there is enough
+
+        Parameters:
+            item: Item to be shipped.
+            order_quantity: Amount of item to be shipped.
+            shipments: Items processed so far by each warehouse rank.
+
+        """
+        item_id = self.__item_ids.get(item)
+        if item_id is None:
+            return
+        start = self.__item_starts[item_id]
+        end = self.__item_starts[item_id + 1]
+        stock = self.__quantities[start:end]
+
+        can_ship_all = stock >= order_quantity
+        single = int(can_ship_all.argmax()) if end > start else 0
+        if end > start and can_ship_all[single]:
+            # Single warehouse can ship all of the item
+            stock[single] -= order_quantity
+            shipments.setdefault(int(self.__ranks[start + single]), {})[
+                item] = order_quantity
+            return
+
+        totals = numpy.cumsum(stock)
+        if not totals.size or totals[-1] < order_quantity:
+            return
+        # Take everything from warehouses before the one that completes the
+        # order, and the remainder from that one
+        last = int(numpy.searchsorted(totals, order_quantity))
+        shipped = stock[:last + 1].copy()
+        shipped[last] = order_quantity - (totals[last - 1] if last else 0)
+        stock[:last + 1] -= shipped
+        ranks = self.__ranks[start:start + last + 1]
+        for rank, quantity in zip(ranks[shipped > 0].tolist(),
+                                  shipped[shipped > 0].tolist()):
+            shipments.setdefault(rank, {})[item] = quantity
+
+    def allocate_inventory(self, order: Inventory_Dist) -> Shipment:
+        """
+        Returns Shipment of optimally allocated inventory
+
+        Parameters:
+            order: The order to be completed.
+
+        """
+        shipments = {}
+        for item, quantity in order.items():
+            if quantity > 0:
+                self.__allocate_item(item, quantity, shipments)
+        return [{self.__warehouse_names[rank]: shipments[rank]}
+                for rank in sorted(shipments)]
+
+    def allocate_batch(self, orders: Iterable[Inventory_Dist]
+                       ) -> List[Shipment]:
+        """Returns a Shipment for each order, allocated one after another"""
+        return [self.allocate_inventory(order) for order in orders]
@@ -1,5 +1,12 @@
-from .typing import Inventory_Dist, Input_Warehouse_List, Shipment
+import time
+from typing import Dict, Iterable, List, Tuple
+from .allocation_metrics import MetricsSink
+from .allocation_strategy import AllocationStrategy
+from .plan_cache import PlanCache
+from .spatial_index import NearestWarehouses
+from .typing import Inventory_Dist, Input_Warehouse_List, Location, Shipment
 from .warehouse import Warehouse
+from .warehouse_network import WarehouseNetwork
 
 
 class InventoryAllocator(object):
@@ -7,28 +14,54 @@ class InventoryAllocator(object):
     Optimally create shipments of inventory to complete orders
 
     Attributes:
-        __warhouse_list (List[Warhouse]): List of all Warehouse objects.
+        __network (WarehouseNetwork): Network orders are allocated from when
+            no warehouses are passed to allocate_inventory.
+        __strategy (AllocationStrategy): Strategy planning each order's
+            shipments, if None items are allocated greedily one at a time.
+        __plan_cache (PlanCache): Cache of greedy plans of repeated orders.
+        __all_or_nothing (bool): Ship nothing for an order unless every item
+            can be shipped in full.
+        __metrics (MetricsSink): Sink receiving timings and counts of each
+            allocation, None to record nothing.
+        __allocate_item (Callable): Allocates one item of an order, recording
+            metrics if there is a sink.
+        __allocate_item_nearest_first (Callable): Allocates one item of an
+            order with a destination, recording metrics if there is a sink.
 
     """
 
-    def __init__(self):
-        self.__warehouse_list = []
+    def __init__(self, network: WarehouseNetwork = None,
+                 strategy: AllocationStrategy = None,
+                 plan_cache: PlanCache = None, all_or_nothing: bool = False,
+                 metrics: MetricsSink = None):
+        if strategy is not None and plan_cache is not None:
+            raise ValueError("Only greedy allocation plans can be cached")
+        self.__network = network
+        self.__strategy = strategy
+        self.__plan_cache = plan_cache
+        self.__all_or_nothing = all_or_nothing
+        self.__metrics = metrics
+        # Chosen once so allocation without metrics never checks for them
+        self.__allocate_item = (self.__allocate_item_greedily
+                                if metrics is None
+                                else self.__allocate_item_measured)
+        self.__allocate_item_nearest_first = (
+            self.__allocate_item_nearest if metrics is None
+            else self.__allocate_item_nearest_measured)
 
-    def __create_warehouse_list(self, warehouse_dict_list: Input_Warehouse_List):
-        """
-        Creates a Warehouse object for each Warhouse_Dict in the list
-
-        Parameters:
-           warhouse_dict_list: A list of dicts mapping warehouse names to inventories
+    def __process_item_shipment(self, network: WarehouseNetwork,
+                                warehouse: Warehouse, item: str,
+                                quantity: int,
+                                shipments: Dict[Warehouse, Inventory_Dist]):
+        """Process an item shipment from warehouse into shipments"""
+        shipped = network.remove_stock(warehouse, item, quantity)
+        if shipped:
+            shipments.setdefault(warehouse, {})[item] = shipped
 
-        """
-        for inp_warehouse in warehouse_dict_list:
-            self.__warehouse_list.append(
-                Warehouse(inp_warehouse["name"], inp_warehouse["inventory"])
-            )
-
-    def __are_multiple_warehouses_required(self, item: str,
-                                           order_quantity: int) -> bool:
+    def __are_multiple_warehouses_required(
+            self, network: WarehouseNetwork, warehouses: List[Warehouse],
+            item: str, order_quantity: int,
+            shipments: Dict[Warehouse, Inventory_Dist]) -> bool:
         """
         Return True if multiple warehouses are needed otherwise False
 
@@ -37,71 +70,504 @@ class InventoryAllocator(object):
             a shipment for item from that warehouse and returns False
 
         Parameters:
+            network: Network to take inventory from.
+            warehouses: Warehouses in network with item in stock.
             item: Item to be shipped.
             order_quantity: Amount of item to be shipped.
+            shipments: Items processed so far by each warehouse for the order.
 
         """
         total_amount = 0
 
-        for warehouse in self.__warehouse_list:
+        # Only warehouses that have the item in stock need to be checked
+        for warehouse in warehouses:
             quantity_in_warehouse = warehouse.get_quantity(item)
             if quantity_in_warehouse >= order_quantity:
                 # Single warehouse can ship all of the item so return False
-                warehouse.process_item_shipment(item, order_quantity)
+                self.__process_item_shipment(network, warehouse, item,
+                                             order_quantity, shipments)
                 return False
             # Keep track of total item amount across warehouses
             total_amount += quantity_in_warehouse
 
         return total_amount >= order_quantity
 
-    def __process_item_shipments_across_warehouses(self, item: str,
-                                                   order_quantity: int):
+    def __process_item_shipments_across_warehouses(
+            self, network: WarehouseNetwork, warehouses: List[Warehouse],
+            item: str, order_quantity: int,
+            shipments: Dict[Warehouse, Inventory_Dist]):
         """
         Process item shipments across warehouses for order_quantity amount
 
         Parameters:
+            network: Network to take inventory from.
+            warehouses: Warehouses in network with item in stock.
             item: Item to be shipped.
             order_quantity: Amount of item to be shipped.
+            shipments: Items processed so far by each warehouse for the order.
 
         """
         quantity_left = order_quantity
 
-        # Greedily take inventory from warehouses until shipment is complete
-        for warehouse in self.__warehouse_list:
+        # Greedily take inventory from warehouses until shipment is complete,
+        # copying the list as emptied warehouses are removed from the index
+        for warehouse in list(warehouses):
             quantity_in_warehouse = warehouse.get_quantity(item)
             if quantity_in_warehouse > 0:
                 shipping_quantity = min(quantity_in_warehouse,
                                         quantity_left)
                 quantity_left -= shipping_quantity
-                warehouse.process_item_shipment(item, shipping_quantity)
+                self.__process_item_shipment(network, warehouse, item,
+                                             shipping_quantity, shipments)
             if quantity_left <= 0:
                 break
 
-    def allocate_inventory(self, order: Inventory_Dist,
-                           warehouse_dicts: Input_Warehouse_List) -> Shipment:
+    def __get_network(self, warehouse_dicts: Input_Warehouse_List
+                      ) -> WarehouseNetwork:
         """
-        Returns Shipment of optimally allocated inventory
+        Return network to allocate from, built from warehouse_dicts if given
+
+        Raises:
+            ValueError: If no warehouses are given and the allocator was
+                created without a network, or warehouses are given to an
+                allocator with a plan cache.
+
+        """
+        if warehouse_dicts is not None:
+            if self.__plan_cache is not None:
+                # Plans only hold for the network they were made on, which
+                # would be new for every call
+                raise ValueError("An allocator with a plan cache can only "
+                                 "allocate from its own network")
+            if self.__metrics is None:
+                return WarehouseNetwork(warehouse_dicts)
+            start = time.perf_counter()
+            network = WarehouseNetwork(warehouse_dicts)
+            self.__metrics.observe("network_build_seconds",
+                                   time.perf_counter() - start)
+            return network
+        if self.__network is None:
+            raise ValueError("No warehouses to allocate inventory from")
+        return self.__network
+
+    def __allocate_item_greedily(self, network: WarehouseNetwork, item: str,
+                                 quantity: int,
+                                 candidates: Dict[str, List[Warehouse]],
+                                 shipments: Dict[Warehouse, Inventory_Dist]):
+        """
+        Process shipments of an item from the cheapest warehouse that can
+        ship all of it, otherwise across warehouses if there is enough
+
+        Parameters:
+            network: Network to take inventory from.
+            item: Item to be shipped.
+            quantity: Amount of item to be shipped.
+            candidates: Warehouses stocking each item, looked up from network
+                the first time an item is seen.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        if network.get_total_quantity(item) < quantity:
+            # Not enough in the whole network, no warehouse needs checking
+            return
+        warehouses = candidates.get(item)
+        if warehouses is None:
+            warehouses = network.get_warehouses(item)
+            if warehouses:
+                # Only lists held by the index are kept up to date
+                candidates[item] = warehouses
+        if self.__are_multiple_warehouses_required(
+                network, warehouses, item, quantity, shipments):
+            # Single warehouse can't do shipment and distributed shipment is possible
+            self.__process_item_shipments_across_warehouses(
+                network, warehouses, item, quantity, shipments)
+
+    def __allocate_item_measured(self, network: WarehouseNetwork, item: str,
+                                 quantity: int,
+                                 candidates: Dict[str, List[Warehouse]],
+                                 shipments: Dict[Warehouse, Inventory_Dist]):
+        """
+        Allocate an item the same way as __allocate_item_greedily, recording
+        how long each phase took and how many warehouses were probed
+
+        Parameters:
+            network: Network to take inventory from.
+            item: Item to be shipped.
+            quantity: Amount of item to be shipped.
+            candidates: Warehouses stocking each item, looked up from network
+                the first time an item is seen.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        metrics = self.__metrics
+        if network.get_total_quantity(item) < quantity:
+            metrics.increment("lines_rejected")
+            metrics.observe("warehouses_probed", 0)
+            return
+        warehouses = candidates.get(item)
+        if warehouses is None:
+            warehouses = network.get_warehouses(item)
+            if warehouses:
+                candidates[item] = warehouses
+        num_stocking = len(warehouses)
+        start = time.perf_counter()
+        split = self.__are_multiple_warehouses_required(
+            network, warehouses, item, quantity, shipments)
+        probe_end = time.perf_counter()
+        metrics.observe("probe_seconds", probe_end - start)
+        if split:
+            self.__process_item_shipments_across_warehouses(
+                network, warehouses, item, quantity, shipments)
+            metrics.observe("split_seconds", time.perf_counter() - probe_end)
+            metrics.increment("lines_split")
+            metrics.observe("warehouses_probed", num_stocking)
+            return
+        shipper = next((warehouse for warehouse, items in shipments.items()
+                        if item in items), None)
+        if shipper is None:
+            metrics.increment("lines_rejected")
+            metrics.observe("warehouses_probed", num_stocking)
+            return
+        metrics.increment("lines_single_warehouse")
+        # Warehouses ahead of the shipper by rank were probed before it
+        shipper_rank = network.get_rank(shipper)
+        metrics.observe("warehouses_probed", 1 + sum(
+            1 for warehouse in warehouses
+            if network.get_rank(warehouse) < shipper_rank))
+
+    def __probe_nearest(self, network: WarehouseNetwork, item: str,
+                        quantity: int, nearest: NearestWarehouses,
+                        shipments: Dict[Warehouse, Inventory_Dist]
+                        ) -> Tuple[List[Warehouse], int]:
+        """
+        Return the nearest warehouses with enough of item between them to
+        split across, empty if the nearest warehouse that can ship all of
+        it did, and the number of warehouses probed
+
+        Side Effects:
+            If a single warehouse can ship all of the item then it processes
+            a shipment for item from the nearest one
+
+        Parameters:
+            network: Network to take inventory from, with at least quantity
+                of item in stock.
+            item: Item to be shipped.
+            quantity: Amount of item to be shipped.
+            nearest: Warehouses of network ordered nearest first from the
+                order's destination.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        warehouses = network.get_warehouses(item)
+        if len(warehouses) ** 2 <= len(network.get_warehouse_list()):
+            # Searching outwards passes about n / k warehouses to find one
+            # of k stocking item, so for few of them sorting is cheaper
+            warehouses = nearest.sort(warehouses)
+            for position, warehouse in enumerate(warehouses):
+                if warehouse.get_quantity(item) >= quantity:
+                    self.__process_item_shipment(network, warehouse, item,
+                                                 quantity, shipments)
+                    return [], position + 1
+            return warehouses, len(warehouses)
+        # Search outwards to the nearest warehouse that can ship all of item
+        # if there is one, otherwise until there is enough to split, every
+        # warehouse passed counting as probed
+        single = any(warehouse.get_quantity(item) >= quantity
+                     for warehouse in warehouses)
+        stocking, total_amount, probed = [], 0, 0
+        for warehouse in nearest:
+            probed += 1
+            quantity_in_warehouse = warehouse.get_quantity(item)
+            if single and quantity_in_warehouse >= quantity:
+                self.__process_item_shipment(network, warehouse, item,
+                                             quantity, shipments)
+                return [], probed
+            if quantity_in_warehouse > 0:
+                stocking.append(warehouse)
+                total_amount += quantity_in_warehouse
+                if not single and total_amount >= quantity:
+                    break
+        return stocking, probed
+
+    def __allocate_item_nearest(self, network: WarehouseNetwork, item: str,
+                                quantity: int, nearest: NearestWarehouses,
+                                shipments: Dict[Warehouse, Inventory_Dist]):
+        """
+        Process shipments of an item from the nearest warehouse that can
+        ship all of it, otherwise across the nearest warehouses if there is
+        enough
+
+        Parameters:
+            network: Network to take inventory from.
+            item: Item to be shipped.
+            quantity: Amount of item to be shipped.
+            nearest: Warehouses of network ordered nearest first from the
+                order's destination.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        if network.get_total_quantity(item) < quantity:
+            return
+        stocking, _ = self.__probe_nearest(network, item, quantity, nearest,
+                                           shipments)
+        if stocking:
+            self.__process_item_shipments_across_warehouses(
+                network, stocking, item, quantity, shipments)
+
+    def __allocate_item_nearest_measured(
+            self, network: WarehouseNetwork, item: str, quantity: int,
+            nearest: NearestWarehouses,
+            shipments: Dict[Warehouse, Inventory_Dist]):
+        """
+        Allocate an item the same way as __allocate_item_nearest, recording
+        how long each phase took and how many warehouses were probed
+
+        Parameters:
+            network: Network to take inventory from.
+            item: Item to be shipped.
+            quantity: Amount of item to be shipped.
+            nearest: Warehouses of network ordered nearest first from the
+                order's destination.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        metrics = self.__metrics
+        if network.get_total_quantity(item) < quantity:
+            metrics.increment("lines_rejected")
+            metrics.observe("warehouses_probed", 0)
+            return
+        start = time.perf_counter()
+        stocking, probed = self.__probe_nearest(network, item, quantity,
+                                                nearest, shipments)
+        probe_end = time.perf_counter()
+        metrics.observe("probe_seconds", probe_end - start)
+        metrics.observe("warehouses_probed", probed)
+        if stocking:
+            self.__process_item_shipments_across_warehouses(
+                network, stocking, item, quantity, shipments)
+            metrics.observe("split_seconds", time.perf_counter() - probe_end)
+            metrics.increment("lines_split")
+            return
+        metrics.increment("lines_single_warehouse")
+
+    def __allocate_greedily(self, network: WarehouseNetwork,
+                            order: Inventory_Dist,
+                            candidates: Dict[str, List[Warehouse]],
+                            shipments: Dict[Warehouse, Inventory_Dist]):
+        """
+        Process shipments for each item of order in turn
 
         Parameters:
+            network: Network to take inventory from.
             order: The order to be completed.
-            warhouse_dicts: A list of dicts mapping warehouse names and to inventories
+            candidates: Warehouses stocking each item, looked up from network
+                the first time an item is seen.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        for item, quantity in order.items():
+            if quantity == 0:
+                # Skip orders of 0
+                continue
+            self.__allocate_item(network, item, quantity, candidates,
+                                 shipments)
+
+    def __allocate_nearest_first(self, network: WarehouseNetwork,
+                                 order: Inventory_Dist,
+                                 nearest: NearestWarehouses,
+                                 shipments: Dict[Warehouse, Inventory_Dist]):
+        """
+        Process shipments for each item of order in turn, from the
+        warehouses nearest the order's destination first
+
+        Parameters:
+            network: Network to take inventory from.
+            order: The order to be completed.
+            nearest: Warehouses of network ordered nearest first from the
+                order's destination.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        for item, quantity in order.items():
+            if quantity == 0:
+                # Skip orders of 0
+                continue
+            self.__allocate_item_nearest_first(network, item, quantity,
+                                               nearest, shipments)
 
+    def __allocate_with_plan_cache(
+            self, network: WarehouseNetwork, order: Inventory_Dist,
+            candidates: Dict[str, List[Warehouse]],
+            shipments: Dict[Warehouse, Inventory_Dist]):
         """
-        self.__create_warehouse_list(warehouse_dicts)
+        Process shipments for order from the cached plan of each item that
+        still holds, allocating the other items greedily and caching the
+        updated plan
 
-        # Process all items in order into warehouse shipments
+        Parameters:
+            network: Network to take inventory from.
+            order: The order to be completed.
+            candidates: Warehouses stocking each item, looked up from network
+                the first time an item is seen.
+            shipments: Items processed so far by each warehouse for the order.
+
+        """
+        plan = self.__plan_cache.get_plan(network, order)
+        replanned = plan is None
         for item, quantity in order.items():
             if quantity == 0:
                 # Skip orders of 0
                 continue
-            if self.__are_multiple_warehouses_required(item, quantity):
-                # Single warehouse can't do shipment and distributed shipment is possible
-                self.__process_item_shipments_across_warehouses(item, quantity)
-
-        # Combine warehouse shipments to fufill order
-        shipment = []
-        for warehouse in self.__warehouse_list:
-            warehouse_shipment = warehouse.ship_processed_shipments()
-            if warehouse_shipment:
-                shipment.append(warehouse_shipment)
+            item_shipments = plan.get(item) if plan is not None else None
+            if item_shipments is None:
+                self.__allocate_item(network, item, quantity, candidates,
+                                     shipments)
+                replanned = True
+                continue
+            for warehouse, shipping_quantity in item_shipments:
+                self.__process_item_shipment(network, warehouse, item,
+                                             shipping_quantity, shipments)
+        if replanned:
+            self.__plan_cache.put_plan(network, order, shipments)
+
+    def __can_fill(self, network: WarehouseNetwork,
+                   order: Inventory_Dist) -> bool:
+        """Return True if network has enough stock of every item in order"""
+        return all(network.get_total_quantity(item) >= quantity
+                   for item, quantity in order.items() if quantity > 0)
+
+    def __allocate_order(self, network: WarehouseNetwork,
+                         order: Inventory_Dist,
+                         candidates: Dict[str, List[Warehouse]],
+                         destination: Location = None) -> Shipment:
+        """
+        Returns Shipment of order allocated from network
+
+        Raises:
+            ValueError: If a destination is given to an allocator with a
+                strategy or plan cache.
+
+        Parameters:
+            network: Network to take inventory from.
+            order: The order to be completed.
+            candidates: Warehouses stocking each item, looked up from network
+                the first time an item is seen.
+            destination: Location the order ships to, if given warehouses
+                nearest to it are preferred over priority.
+
+        """
+        nearest = None
+        if destination is not None:
+            if self.__strategy is not None or self.__plan_cache is not None:
+                raise ValueError(
+                    "Only greedy allocation can prefer nearby warehouses")
+            nearest = network.get_nearest_warehouses(destination)
+        metrics = self.__metrics
+        if metrics is not None:
+            start = time.perf_counter()
+            metrics.increment("orders")
+        # Process all items in order into warehouse shipments, holding every
+        # item so concurrent orders can't take the same stock
+        shipments = {}
+        with network.lock_items(order):
+            if self.__all_or_nothing and not self.__can_fill(network, order):
+                # Rejected before any stock is touched
+                if metrics is not None:
+                    metrics.increment("orders_rejected")
+                    metrics.observe("order_seconds",
+                                    time.perf_counter() - start)
+                return []
+            if self.__plan_cache is not None:
+                self.__allocate_with_plan_cache(network, order, candidates,
+                                                shipments)
+            elif nearest is not None:
+                self.__allocate_nearest_first(network, order, nearest,
+                                              shipments)
+            elif self.__strategy is None:
+                self.__allocate_greedily(network, order, candidates,
+                                         shipments)
+            else:
+                plan = self.__strategy.plan_order(network, order)
+                for warehouse, items in plan.items():
+                    for item, quantity in items.items():
+                        self.__process_item_shipment(network, warehouse, item,
+                                                     quantity, shipments)
+
+            # Combine warehouse shipments in priority order, or nearest first
+            # if there is a destination, to fufill order
+            shipment = [{warehouse.get_name(): shipments[warehouse]}
+                        for warehouse in sorted(
+                            shipments, key=network.get_rank if nearest is None
+                            else nearest.get_sort_key)]
+            if shipment:
+                # Logged while the items are held, so a snapshot of the
+                # network never holds part of what a record removed
+                network.log_shipment(shipment)
+        network.commit_log()
+        if metrics is not None:
+            metrics.observe("order_seconds", time.perf_counter() - start)
         return shipment
+
+    def allocate_inventory(self, order: Inventory_Dist,
+                           warehouse_dicts: Input_Warehouse_List = None,
+                           destination: Location = None) -> Shipment:
+        """
+        Returns Shipment of optimally allocated inventory
+
+        Raises:
+            ValueError: If no warehouses are given and the allocator was
+                created without a network, warehouses are given to an
+                allocator with a plan cache, or a destination is given to an
+                allocator with a strategy or plan cache.
+
+        Parameters:
+            order: The order to be completed.
+            warhouse_dicts: A list of dicts mapping warehouse names and to
+                inventories, if not given the allocator's network is used
+            destination: Latitude and longitude the order ships to, if given
+                the nearest warehouses are preferred, then priority.
+
+        """
+        return self.__allocate_order(self.__get_network(warehouse_dicts),
+                                     order, {}, destination)
+
+    def allocate_batch(self, orders: Iterable[Inventory_Dist],
+                       warehouse_dicts: Input_Warehouse_List = None,
+                       destinations: Iterable[Location] = None
+                       ) -> List[Shipment]:
+        """
+        Returns a Shipment for each order, allocated one after another
+
+        The result is the same as calling allocate_inventory for each order
+        in turn, but the warehouses stocking each item are looked up once
+        for the whole batch.
+
+        Raises:
+            ValueError: If no warehouses are given and the allocator was
+                created without a network, warehouses are given to an
+                allocator with a plan cache, destinations are given to an
+                allocator with a strategy or plan cache, or there isn't one
+                destination for every order.
+
+        Parameters:
+            orders: The orders to be completed, in the order to allocate them.
+            warhouse_dicts: A list of dicts mapping warehouse names and to
+                inventories, if not given the allocator's network is used
+            destinations: Destination of each order, or None for orders
+                without one, if not given every order uses priority.
+
+        """
+        network = self.__get_network(warehouse_dicts)
+        # The index updates these lists in place as stock runs out, so they
+        # stay valid for every order in the batch
+        candidates = {}
+        if destinations is None:
+            return [self.__allocate_order(network, order, candidates)
+                    for order in orders]
+        orders, destinations = list(orders), list(destinations)
+        if len(orders) != len(destinations):
+            # Checked before any order is allocated, so no stock is taken
+            raise ValueError("Got %d destinations for %d orders"
+                             % (len(destinations), len(orders)))
+        return [self.__allocate_order(network, order, candidates, destination)
+                for order, destination in zip(orders, destinations)]
@@ -0,0 +1,372 @@
+"""
+Binary snapshot of a warehouse network's inventory, laid out so it can be
+memory mapped and allocated from without parsing it first
+
+A snapshot is a header followed by the sections below, in native byte
+order. Fixed width sections come first so every column stays aligned.
+
+    header            magic, warehouse count, item count, entry count
+    warehouse_offsets int64[warehouses + 1], slices of warehouse_names
+    item_offsets      int64[items + 1], slices of item_names
+    item_starts       int64[items + 1], slices of ranks and quantities
+    ranks             int32[entries], warehouse rank of each entry
+    quantities        int32[entries], quantity in stock of each entry
+    warehouse_names   UTF-8 warehouse names in priority order
+    item_names        UTF-8 item names, sorted so they can be searched
+
+Each item's entries are its warehouses with stock, in priority order.
+"""
+import mmap
+import os
+import struct
+from array import array
+from typing import BinaryIO, Dict, Iterable, List
+from .allocation_log import sync_directory
+from .typing import Inventory_Dist, Input_Warehouse_List, Shipment
+
+MAGIC = b"INVSNAP1"
+HEADER = struct.Struct("=8sQQQ")
+
+
+def write_columns(snapshot_file: BinaryIO, warehouse_names: List[bytes],
+                  item_names: List[bytes], item_starts: array, ranks: array,
+                  quantities: array):
+    """
+    Write a snapshot from its columns to snapshot_file
+
+    Parameters:
+        snapshot_file: Binary file to write the snapshot to.
+        warehouse_names: Encoded warehouse names in priority order.
+        item_names: Encoded item names in sorted order.
+        item_starts: int64 start of each item's entries, with the end of the
+            last item's entries appended.
+        ranks: int32 warehouse rank of each entry.
+        quantities: int32 quantity in stock of each entry.
+
+    """
+    warehouse_offsets = array("q", [0])
+    for name in warehouse_names:
+        warehouse_offsets.append(warehouse_offsets[-1] + len(name))
+    item_offsets = array("q", [0])
+    for name in item_names:
+        item_offsets.append(item_offsets[-1] + len(name))
+
+    snapshot_file.write(HEADER.pack(MAGIC, len(warehouse_names),
+                                    len(item_names), len(ranks)))
+    for column in (warehouse_offsets, item_offsets, item_starts, ranks,
+                   quantities):
+        column.tofile(snapshot_file)
+    snapshot_file.write(b"".join(warehouse_names))
+    snapshot_file.write(b"".join(item_names))
+
+
+def write_snapshot(path: str, warehouse_dicts: Input_Warehouse_List):
+    """
+    Write the inventory of warehouse_dicts to a snapshot at path
+
+    Raises:
+        ValueError: If a quantity does not fit in an int32.
+
+    Parameters:
+        path: File to write the snapshot to.
+        warehouse_dicts: Warehouses in priority order.
+
+    """
+    warehouse_names = []
+    stock = {}
+    for rank, inp_warehouse in enumerate(warehouse_dicts):
+        warehouse_names.append(inp_warehouse["name"].encode("utf-8"))
+        for item, quantity in inp_warehouse["inventory"].items():
+            if quantity > 0:
+                stock.setdefault(item.encode("utf-8"), []).append(
+                    (rank, quantity))
+
+    item_names = sorted(stock)
+    item_starts, ranks, quantities = array("q", [0]), array("i"), array("i")
+    for item in item_names:
+        for rank, quantity in stock[item]:
+            ranks.append(rank)
+            try:
+                quantities.append(quantity)
+            except OverflowError:
+                raise ValueError("Quantity %d of %s does not fit in a "
+                                 "snapshot" % (quantity, item.decode()))
+        item_starts.append(len(ranks))
+
+    with open(path, "wb") as snapshot_file:
+        write_columns(snapshot_file, warehouse_names, item_names,
+                      item_starts, ranks, quantities)
+
+
+class MappedInventory(object):
+    """
+    Inventory of a warehouse network memory mapped from a snapshot, which
+    allocates orders the same way as InventoryAllocator
+
+    Opening a snapshot only maps the file, so pages are read from disk as
+    items are first allocated. Shipped stock is recorded in a delta overlay
+    and never written to the mapped file, until compact folds the overlay
+    into a new snapshot.
+
+    Attributes:
+        __path (str): Snapshot file.
+        __file (BinaryIO): Open snapshot file.
+        __map (mmap.mmap): Read only mapping of the snapshot.
+        __num_warehouses (int): Number of warehouses.
+        __num_items (int): Number of items with stock.
+        __warehouse_offsets (memoryview): int64 slices of the warehouse names.
+        __item_offsets (memoryview): int64 slices of the item names.
+        __item_starts (memoryview): int64 slices of each item's entries.
+        __ranks (memoryview): int32 warehouse rank of each entry.
+        __quantities (memoryview): int32 quantity in the snapshot of each
+            entry.
+        __warehouse_names_start (int): Position of the warehouse names.
+        __item_names_start (int): Position of the item names.
+        __item_ids (Dict[str, int]): Item ids looked up so far, -1 for items
+            not in the snapshot.
+        __warehouse_ranks (Dict[str, int]): Rank of each warehouse by name,
+            built the first time a warehouse is looked up by name.
+        __shipped (Dict[int, int]): Quantity shipped from each entry since
+            the snapshot was written.
+
+    """
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.__map = None
+        self.__open()
+
+    def __enter__(self) -> "MappedInventory":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __open(self):
+        """
+        Map the snapshot at path
+
+        Raises:
+            ValueError: If the file is not a snapshot.
+
+        """
+        self.__file = open(self.__path, "rb")
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise ValueError("%s is not an inventory snapshot" % self.__path)
+        if (len(self.__map) < HEADER.size
+                or self.__map[:len(MAGIC)] != MAGIC):
+            self.__map.close()
+            self.__file.close()
+            raise ValueError("%s is not an inventory snapshot" % self.__path)
+        _, self.__num_warehouses, self.__num_items, num_entries = \
+            HEADER.unpack_from(self.__map)
+
+        view = memoryview(self.__map)
+        position = HEADER.size
+        columns = []
+        for typecode, length in (("q", self.__num_warehouses + 1),
+                                 ("q", self.__num_items + 1),
+                                 ("q", self.__num_items + 1),
+                                 ("i", num_entries), ("i", num_entries)):
+            size = length * struct.calcsize(typecode)
+            columns.append(view[position:position + size].cast(typecode))
+            position += size
+        view.release()
+        (self.__warehouse_offsets, self.__item_offsets, self.__item_starts,
+         self.__ranks, self.__quantities) = columns
+        self.__warehouse_names_start = position
+        self.__item_names_start = position + self.__warehouse_offsets[-1]
+
+        self.__item_ids = {}
+        self.__warehouse_ranks = None
+        self.__shipped = {}
+
+    def close(self):
+        """Unmap the snapshot"""
+        if self.__map is None:
+            return
+        for column in (self.__warehouse_offsets, self.__item_offsets,
+                       self.__item_starts, self.__ranks, self.__quantities):
+            column.release()
+        self.__map.close()
+        self.__file.close()
+        self.__map = None
+
+    def __get_item_name(self, item_id: int) -> bytes:
+        """Return the encoded name of item_id"""
+        start = self.__item_names_start + self.__item_offsets[item_id]
+        end = self.__item_names_start + self.__item_offsets[item_id + 1]
+        return self.__map[start:end]
+
+    def __get_warehouse_name(self, rank: int) -> str:
+        """Return the name of the warehouse with rank"""
+        start = self.__warehouse_names_start + self.__warehouse_offsets[rank]
+        end = self.__warehouse_names_start + self.__warehouse_offsets[rank + 1]
+        return self.__map[start:end].decode("utf-8")
+
+    def __get_item_id(self, item: str) -> int:
+        """Return the id of item, or -1 if it is not in the snapshot"""
+        item_id = self.__item_ids.get(item)
+        if item_id is None:
+            # Binary search of the sorted item names
+            name = item.encode("utf-8")
+            low, high = 0, self.__num_items
+            while low < high:
+                middle = (low + high) // 2
+                if self.__get_item_name(middle) < name:
+                    low = middle + 1
+                else:
+                    high = middle
+            item_id = (low if low < self.__num_items
+                       and self.__get_item_name(low) == name else -1)
+            self.__item_ids[item] = item_id
+        return item_id
+
+    def get_warehouse_names(self) -> List[str]:
+        """Return all warehouse names in priority order"""
+        return [self.__get_warehouse_name(rank)
+                for rank in range(self.__num_warehouses)]
+
+    def get_delta_count(self) -> int:
+        """Return number of entries shipped from since the last compaction"""
+        return len(self.__shipped)
+
+    def get_quantity(self, warehouse_name: str, item: str) -> int:
+        """Return quantity of item in stock at the named warehouse"""
+        if self.__warehouse_ranks is None:
+            self.__warehouse_ranks = {
+                name: rank
+                for rank, name in enumerate(self.get_warehouse_names())}
+        rank = self.__warehouse_ranks.get(warehouse_name)
+        item_id = self.__get_item_id(item)
+        if rank is None or item_id < 0:
+            return 0
+        for entry in range(self.__item_starts[item_id],
+                           self.__item_starts[item_id + 1]):
+            if self.__ranks[entry] == rank:
+                return self.__quantities[entry] - self.__shipped.get(entry, 0)
+        return 0
+
+    def __allocate_item(self, item: str, order_quantity: int,
+                        shipments: Dict[int, Inventory_Dist]):
+        """
+        Process shipments of an item from the cheapest warehouse that can ship
+        all of it, otherwise greedily across warehouses if there is enough
+
+        Parameters:
+            item: Item to be shipped.
+            order_quantity: Amount of item to be shipped.
+            shipments: Items processed so far by each warehouse rank.
+
+        """
+        item_id = self.__get_item_id(item)
+        if item_id < 0:
+            return
+        shipped = self.__shipped
+        entries = range(self.__item_starts[item_id],
+                        self.__item_starts[item_id + 1])
+        total = 0
+        for entry in entries:
+            quantity = self.__quantities[entry] - shipped.get(entry, 0)
+            if quantity >= order_quantity:
+                # Single warehouse can ship all of the item
+                shipped[entry] = shipped.get(entry, 0) + order_quantity
+                shipments.setdefault(self.__ranks[entry], {})[item] = \
+                    order_quantity
+                return
+            total += quantity
+        if total < order_quantity:
+            return
+
+        quantity_left = order_quantity
+        for entry in entries:
+            quantity = min(self.__quantities[entry] - shipped.get(entry, 0),
+                           quantity_left)
+            if quantity > 0:
+                shipped[entry] = shipped.get(entry, 0) + quantity
+                shipments.setdefault(self.__ranks[entry], {})[item] = quantity
+                quantity_left -= quantity
+                if quantity_left <= 0:
+                    break
+
+    def allocate_inventory(self, order: Inventory_Dist) -> Shipment:
+        """
+        Returns Shipment of optimally allocated inventory
+
+        Raises:
+            ValueError: If the snapshot has been closed.
+
+        Parameters:
+            order: The order to be completed.
+
+        """
+        if self.__map is None:
+            raise ValueError("MappedInventory is closed")
+        shipments = {}
+        for item, quantity in order.items():
+            if quantity > 0:
+                self.__allocate_item(item, quantity, shipments)
+        return [{self.__get_warehouse_name(rank): shipments[rank]}
+                for rank in sorted(shipments)]
+
+    def allocate_batch(self, orders: Iterable[Inventory_Dist]
+                       ) -> List[Shipment]:
+        """Returns a Shipment for each order, allocated one after another"""
+        return [self.allocate_inventory(order) for order in orders]
+
+    def compact(self):
+        """
+        Fold the delta overlay into a new snapshot, replacing the file at
+        path, and map the new snapshot
+
+        Entries with no stock left are dropped. The new snapshot is written
+        beside the old one and renamed over it before the old one is
+        unmapped, so a failure part way through leaves the old snapshot in
+        place and still mapped, with its delta overlay. The directory is
+        fsynced after the rename so the new snapshot survives a crash.
+
+        Raises:
+            ValueError: If the snapshot has been closed.
+
+        """
+        if self.__map is None:
+            raise ValueError("MappedInventory is closed")
+        warehouse_names = [
+            self.__map[self.__warehouse_names_start + start:
+                       self.__warehouse_names_start + end]
+            for start, end in zip(self.__warehouse_offsets,
+                                  self.__warehouse_offsets[1:])]
+        item_names = []
+        item_starts = array("q", [0])
+        ranks, quantities = array("i"), array("i")
+        for item_id in range(self.__num_items):
+            for entry in range(self.__item_starts[item_id],
+                               self.__item_starts[item_id + 1]):
+                quantity = (self.__quantities[entry]
+                            - self.__shipped.get(entry, 0))
+                if quantity > 0:
+                    ranks.append(self.__ranks[entry])
+                    quantities.append(quantity)
+            if len(ranks) > item_starts[-1]:
+                item_names.append(self.__get_item_name(item_id))
+                item_starts.append(len(ranks))
+
+        temp_path = self.__path + ".compacting"
+        with open(temp_path, "wb") as snapshot_file:
+            write_columns(snapshot_file, warehouse_names, item_names,
+                          item_starts, ranks, quantities)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        try:
+            # The old snapshot stays mapped through the rename
+            os.replace(temp_path, self.__path)
+        except OSError:
+            os.remove(temp_path)
+            raise
+        sync_directory(os.path.dirname(os.path.abspath(self.__path)))
+        self.close()
+        self.__open()
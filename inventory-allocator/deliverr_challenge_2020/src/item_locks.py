@@ -0,0 +1,100 @@
+from threading import Lock
+from typing import Dict, Iterable, List
+
+
+class HeldItemLocks(object):
+    """
+    Context manager holding a set of item locks for a with block
+
+    Attributes:
+        __locks (List[Lock]): Locks to hold, in the order to acquire them.
+
+    """
+
+    def __init__(self, locks: List[Lock]):
+        self.__locks = locks
+
+    def __enter__(self):
+        for lock in self.__locks:
+            lock.acquire()
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.__locks):
+            lock.release()
+
+
+class HeldAllItemLocks(object):
+    """
+    Context manager holding every item lock of a table for a with block,
+    with no new item locks created until it exits
+
+    Attributes:
+        __table_lock (Lock): Guards creation of new item locks.
+        __locks (Dict[str, Lock]): Lock for each item.
+        __held (List[Lock]): Item locks held, in the order acquired.
+
+    """
+
+    def __init__(self, table_lock: Lock, locks: Dict[str, Lock]):
+        self.__table_lock = table_lock
+        self.__locks = locks
+        self.__held = []
+
+    def __enter__(self):
+        # Threads only wait for the table lock before taking item locks, so
+        # taking it first can't deadlock and keeps the set of locks fixed
+        self.__table_lock.acquire()
+        self.__held = [self.__locks[item] for item in sorted(self.__locks)]
+        for lock in self.__held:
+            lock.acquire()
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.__held):
+            lock.release()
+        self.__table_lock.release()
+
+
+class ItemLockTable(object):
+    """
+    A lock for every item, so threads updating stock of different items
+    never wait on each other
+
+    Attributes:
+        __locks (Dict[str, Lock]): Lock for each item, created on first use.
+        __table_lock (Lock): Guards creation of new item locks.
+
+    """
+
+    def __init__(self):
+        self.__locks = {}
+        self.__table_lock = Lock()
+
+    def __get_lock(self, item: str) -> Lock:
+        """Return the lock for item, creating it if needed"""
+        lock = self.__locks.get(item)
+        if lock is None:
+            with self.__table_lock:
+                lock = self.__locks.setdefault(item, Lock())
+        return lock
+
+    def hold(self, items: Iterable[str]) -> HeldItemLocks:
+        """
+        Return a context manager holding the locks of all items
+
+        Locks are always taken in sorted item order, so threads holding
+        overlapping sets of items cannot deadlock.
+
+        Parameters:
+            items: Items to lock, duplicates are ignored.
+
+        """
+        return HeldItemLocks([self.__get_lock(item)
+                              for item in sorted(set(items))])
+
+    def hold_all(self) -> HeldAllItemLocks:
+        """
+        Return a context manager holding the locks of every item, so no
+        thread can update stock until it exits
+
+        """
+        return HeldAllItemLocks(self.__table_lock, self.__locks)
@@ -0,0 +1,20 @@
+"""
+Compact JSON encoding to and from bytes, using orjson when it is installed
+and falling back to the json module
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    loads = orjson.loads
+    dumps = orjson.dumps
+else:
+    loads = json.loads
+
+    def dumps(value) -> bytes:
+        """Return value encoded as compact JSON bytes"""
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
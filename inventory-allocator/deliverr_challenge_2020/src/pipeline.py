@@ -0,0 +1,117 @@
+"""
+Stream orders from JSON lines through a warehouse network, writing and
+flushing a line with the Shipment of each order as soon as its batch is
+allocated
+
+Run from the deliverr_challenge_2020 folder:
+    python -m src.pipeline warehouses.json orders.jsonl -o shipments.jsonl
+
+The warehouse file holds the list of warehouse dicts taken by
+allocate_inventory, and orders are read from stdin and shipments written
+to stdout when no files are given. Orders read from stdin are allocated
+one at a time by default, so a slow producer gets each Shipment back
+without waiting for a batch to fill.
+"""
+import argparse
+import sys
+from contextlib import ExitStack
+from typing import BinaryIO, Iterator, List
+from .inventory_allocator import InventoryAllocator
+from .json_codec import dumps, loads
+from .typing import Inventory_Dist
+from .warehouse_network import WarehouseNetwork
+
+
+def load_network(path: str, thread_safe: bool = False) -> WarehouseNetwork:
+    """Return a network of the warehouse dicts in the JSON file at path"""
+    with open(path, "rb") as warehouse_file:
+        return WarehouseNetwork(loads(warehouse_file.read()), thread_safe)
+
+
+def read_order_batches(input_stream: BinaryIO, batch_size: int
+                       ) -> Iterator[List[Inventory_Dist]]:
+    """
+    Yield lists of up to batch_size orders read from JSON lines
+
+    Raises:
+        ValueError: If a line is not a JSON object.
+
+    Parameters:
+        input_stream: Binary stream with one JSON order per line, blank lines
+            are skipped.
+        batch_size: Most orders in each list.
+
+    """
+    batch = []
+    for line_number, line in enumerate(input_stream, 1):
+        if not line.strip():
+            continue
+        try:
+            order = loads(line)
+        except ValueError as error:
+            raise ValueError("Invalid JSON on line %d: %s"
+                             % (line_number, error))
+        if not isinstance(order, dict):
+            raise ValueError("Order on line %d is not an object"
+                             % line_number)
+        batch.append(order)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_pipeline(allocator: InventoryAllocator, input_stream: BinaryIO,
+                 output_stream: BinaryIO, batch_size: int = 1024) -> int:
+    """
+    Return number of orders allocated, streaming orders from input_stream
+    and writing one JSON Shipment per line to output_stream
+
+    Only one batch of orders is held in memory at a time, and the shipments
+    of each batch are written with a single write and flushed.
+
+    Parameters:
+        allocator: Allocator with the network to allocate from.
+        input_stream: Binary stream with one JSON order per line.
+        output_stream: Binary stream to write shipments to.
+        batch_size: Orders read and allocated at a time.
+
+    """
+    num_orders = 0
+    for orders in read_order_batches(input_stream, batch_size):
+        shipments = allocator.allocate_batch(orders)
+        output_stream.write(b"\n".join(map(dumps, shipments)) + b"\n")
+        output_stream.flush()
+        num_orders += len(orders)
+    return num_orders
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("warehouses", help="JSON file of warehouse dicts")
+    parser.add_argument("orders", nargs="?", default="-",
+                        help="JSON lines file of orders, - for stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file to write shipments to, - for stdout")
+    parser.add_argument("--batch-size", type=int,
+                        help="orders allocated at a time, by default 1 "
+                             "from stdin and 1024 from a file")
+    args = parser.parse_args(argv)
+    batch_size = args.batch_size
+    if batch_size is None:
+        batch_size = 1 if args.orders == "-" else 1024
+
+    allocator = InventoryAllocator(load_network(args.warehouses))
+    with ExitStack() as stack:
+        input_stream = (sys.stdin.buffer if args.orders == "-"
+                        else stack.enter_context(open(args.orders, "rb")))
+        output_stream = (sys.stdout.buffer if args.output == "-"
+                         else stack.enter_context(
+                             open(args.output, "wb", buffering=1 << 20)))
+        run_pipeline(allocator, input_stream, output_stream, batch_size)
+
+
+if __name__ == "__main__":
+    main()
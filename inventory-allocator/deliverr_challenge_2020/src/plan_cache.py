@@ -0,0 +1,145 @@
+import sys
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from .typing import Inventory_Dist
+from .warehouse import Warehouse
+from .warehouse_network import WarehouseNetwork
+
+# Shipments of each item of an order, as (warehouse, quantity) pairs in
+# priority order, and the item's restock version when they were planned
+Item_Plan = Tuple[str, List[Tuple[Warehouse, int]], int]
+
+
+class PlanCache(object):
+    """
+    LRU cache of the greedy allocation plan of recently seen orders, keyed by
+    the order's items and quantities
+
+    The plan of each item is reused only while greedy allocation would still
+    choose it, otherwise that item is allocated again and the plan updated.
+    Orders only take stock away, so if no warehouse gained stock of an item
+    since it was planned, the warehouses passed over still can't ship it.
+    The plan then holds if its warehouses still have the stock it takes,
+    and every warehouse emptied by a split shipment still has exactly what
+    was taken from it, so split plans are recomputed once applied.
+
+    Attributes:
+        __max_bytes (int): Approximate memory the cached plans may use.
+        __plans (OrderedDict): Network and List[Item_Plan] for each order
+            key, least recently used first.
+        __sizes (Dict[Tuple, int]): Approximate bytes used by each plan.
+        __total_bytes (int): Approximate bytes used by all plans.
+        __lock (Lock): Guards the cache when shared between threads.
+        __stats (Dict[str, int]): Hit, miss, invalidation and eviction
+            counters.
+
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2 ** 20):
+        self.__max_bytes = max_bytes
+        self.__plans = OrderedDict()
+        self.__sizes = {}
+        self.__total_bytes = 0
+        self.__lock = Lock()
+        self.__stats = {"hits": 0, "misses": 0, "invalidations": 0,
+                        "evictions": 0}
+
+    @staticmethod
+    def __get_key(order: Inventory_Dist) -> Tuple:
+        """Return the cache key of order, ignoring item order and zeros"""
+        return tuple(sorted((item, quantity)
+                            for item, quantity in order.items() if quantity))
+
+    @staticmethod
+    def __is_valid(network: WarehouseNetwork, item: str,
+                   shipments: List[Tuple[Warehouse, int]],
+                   restock_version: int) -> bool:
+        """Return True if greedy allocation would still plan shipments"""
+        if network.get_restock_version(item) != restock_version:
+            return False
+        if not shipments:
+            # Stock that was too little can only have shrunk
+            return True
+        *emptied, (last_warehouse, last_quantity) = shipments
+        return (last_warehouse.get_quantity(item) >= last_quantity
+                and all(warehouse.get_quantity(item) == quantity
+                        for warehouse, quantity in emptied))
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return hit, miss, invalidation and eviction counts and size"""
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["entries"] = len(self.__plans)
+            stats["bytes"] = self.__total_bytes
+        return stats
+
+    def get_plan(self, network: WarehouseNetwork, order: Inventory_Dist
+                 ) -> Optional[Dict[str, List[Tuple[Warehouse, int]]]]:
+        """
+        Return shipments of each item of order from the cached plan, leaving
+        out items whose plan no longer holds, or None if there is no plan
+
+        The caller must hold the locks of the order's items.
+
+        Parameters:
+            network: Network the order will be allocated from.
+            order: The order to be completed.
+
+        """
+        key = self.__get_key(order)
+        with self.__lock:
+            cached = self.__plans.get(key)
+            if cached is None or cached[0] is not network:
+                self.__stats["misses"] += 1
+                return None
+            self.__plans.move_to_end(key)
+        plan = {item: shipments for item, shipments, restock_version
+                in cached[1]
+                if self.__is_valid(network, item, shipments, restock_version)}
+        with self.__lock:
+            if len(plan) == len(cached[1]):
+                self.__stats["hits"] += 1
+            else:
+                self.__stats["invalidations"] += 1
+        return plan
+
+    def put_plan(self, network: WarehouseNetwork, order: Inventory_Dist,
+                 shipments: Dict[Warehouse, Inventory_Dist]):
+        """
+        Cache the plan of order, just allocated greedily as shipments
+
+        The caller must still hold the locks of the order's items.
+
+        Parameters:
+            network: Network the order was allocated from.
+            order: The order that was completed.
+            shipments: Items shipped by each warehouse for the order.
+
+        """
+        key = self.__get_key(order)
+        warehouses = sorted(shipments, key=network.get_rank)
+        item_plans = []
+        for item, _ in key:
+            item_shipments = [(warehouse, shipments[warehouse][item])
+                              for warehouse in warehouses
+                              if item in shipments[warehouse]]
+            item_plans.append((item, item_shipments,
+                               network.get_restock_version(item)))
+        size = (sys.getsizeof(key) + sys.getsizeof(item_plans)
+                + sum(sys.getsizeof(item_plan[1]) + 64 * len(item_plan[1])
+                      for item_plan in item_plans))
+
+        with self.__lock:
+            if key in self.__plans:
+                self.__total_bytes -= self.__sizes.pop(key)
+                del self.__plans[key]
+            if size > self.__max_bytes:
+                return
+            self.__plans[key] = (network, item_plans)
+            self.__sizes[key] = size
+            self.__total_bytes += size
+            while self.__total_bytes > self.__max_bytes:
+                evicted, _ = self.__plans.popitem(last=False)
+                self.__total_bytes -= self.__sizes.pop(evicted)
+                self.__stats["evictions"] += 1
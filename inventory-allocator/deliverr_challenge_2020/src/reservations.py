@@ -0,0 +1,211 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from .inventory_allocator import InventoryAllocator
+from .typing import Inventory_Dist, Shipment
+from .warehouse_network import WarehouseNetwork
+
+
+class ReservationManager(object):
+    """
+    Holds stock for orders during checkout, until each hold is committed,
+    released or expires after its time to live
+
+    Reserving allocates the order at once, so held stock is taken out of
+    the network and every later allocation, and the network's totals, only
+    see stock available to promise. Releasing or expiring a hold puts its
+    stock back with return_shipment, as one logged change. Expiry times are
+    kept in a heap, and expired holds are released at the start of every
+    operation, so each operation costs O(log n) in the number of
+    outstanding holds. Heap entries of holds that were committed or
+    released early are skipped when they come due.
+
+    Allocators sharing the network only see expired stock once it has been
+    released, so unless the manager is busy, expire must be called
+    regularly. Given expiry_interval_s, a background thread calls it that
+    often until the manager is closed, logging any error and carrying on.
+
+    Attributes:
+        __network (WarehouseNetwork): Network stock is held in.
+        __allocator (InventoryAllocator): Allocator with the same network.
+        __default_ttl (float): Seconds a hold lasts unless given.
+        __clock (Callable[[], float]): Returns the current time in seconds.
+        __lock (threading.Lock): Guards the holds and expiry heap.
+        __hold_ids (Iterator[int]): Source of hold ids.
+        __holds (Dict[int, Tuple[float, Shipment]]): Expiry time and
+            Shipment of each outstanding hold.
+        __expiries (List[Tuple[float, int]]): Heap of expiry times and hold
+            ids, including holds no longer outstanding.
+        __held (Dict[str, int]): Quantity of each item held.
+        __closed (threading.Event): Set once the manager is closed.
+        __expirer (threading.Thread): Releases expired holds in the
+            background, None unless there is an expiry interval.
+
+    """
+
+    def __init__(self, network: WarehouseNetwork,
+                 allocator: InventoryAllocator = None,
+                 default_ttl_s: float = 900.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 expiry_interval_s: float = None):
+        self.__network = network
+        self.__allocator = allocator or InventoryAllocator(network)
+        self.__default_ttl = default_ttl_s
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__hold_ids = itertools.count(1)
+        self.__holds = {}
+        self.__expiries = []
+        self.__held = {}
+        self.__closed = threading.Event()
+        self.__expirer = None
+        if expiry_interval_s is not None:
+            self.__expirer = threading.Thread(
+                target=self.__expire_periodically, args=(expiry_interval_s,),
+                daemon=True)
+            self.__expirer.start()
+
+    def __update_held(self, shipment: Shipment, sign: int):
+        """Add, or subtract if sign is negative, shipment to held stock"""
+        for warehouse_shipment in shipment:
+            for items in warehouse_shipment.values():
+                for item, quantity in items.items():
+                    held = self.__held.get(item, 0) + sign * quantity
+                    if held:
+                        self.__held[item] = held
+                    else:
+                        del self.__held[item]
+
+    def __release(self, hold_id: int):
+        """Put the stock of an outstanding hold back into the network"""
+        _, shipment = self.__holds.pop(hold_id)
+        self.__network.return_shipment(shipment)
+        self.__update_held(shipment, -1)
+
+    def __expire(self, now: float) -> int:
+        """Release every hold expiring at or before now, return how many"""
+        expired = 0
+        while self.__expiries and self.__expiries[0][0] <= now:
+            _, hold_id = heapq.heappop(self.__expiries)
+            # Skip holds committed or released before they expired
+            if hold_id in self.__holds:
+                self.__release(hold_id)
+                expired += 1
+        return expired
+
+    def __get_outstanding_hold(self, hold_id: int) -> Shipment:
+        """
+        Return the Shipment of an outstanding hold, after releasing every
+        expired hold
+
+        Raises:
+            ValueError: If the hold does not exist, has expired or was
+                already committed or released.
+
+        """
+        self.__expire(self.__clock())
+        if hold_id not in self.__holds:
+            raise ValueError("Hold %s is not outstanding" % hold_id)
+        return self.__holds[hold_id][1]
+
+    def __expire_periodically(self, interval: float):
+        """Release expired holds every interval seconds until closed"""
+        while not self.__closed.wait(interval):
+            try:
+                self.expire()
+            except Exception:
+                # Keep expiring, holds left outstanding are retried next time
+                logging.getLogger(__name__).exception(
+                    "Failed to release expired holds")
+
+    def expire(self) -> int:
+        """Release every hold that has expired, return how many"""
+        with self.__lock:
+            return self.__expire(self.__clock())
+
+    def close(self):
+        """Stop releasing expired holds in the background"""
+        self.__closed.set()
+        if self.__expirer is not None:
+            self.__expirer.join()
+
+    def __enter__(self) -> "ReservationManager":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def reserve(self, order: Inventory_Dist,
+                ttl_s: float = None) -> Optional[Tuple[int, Shipment]]:
+        """
+        Return the id of a new hold and the Shipment of stock it holds, or
+        None without creating a hold if none of the order can be shipped
+
+        Parameters:
+            order: The order to hold stock for.
+            ttl_s: Seconds until the hold expires, the default if not given.
+
+        """
+        with self.__lock:
+            now = self.__clock()
+            self.__expire(now)
+            shipment = self.__allocator.allocate_inventory(order)
+            if not shipment:
+                return None
+            hold_id = next(self.__hold_ids)
+            expiry = now + (self.__default_ttl if ttl_s is None else ttl_s)
+            self.__holds[hold_id] = (expiry, shipment)
+            heapq.heappush(self.__expiries, (expiry, hold_id))
+            self.__update_held(shipment, 1)
+            return hold_id, shipment
+
+    def commit(self, hold_id: int) -> Shipment:
+        """
+        Return the Shipment of a hold, which is no longer held and will
+        never be put back
+
+        Raises:
+            ValueError: If the hold does not exist, has expired or was
+                already committed or released.
+
+        """
+        with self.__lock:
+            shipment = self.__get_outstanding_hold(hold_id)
+            del self.__holds[hold_id]
+            self.__update_held(shipment, -1)
+            return shipment
+
+    def release(self, hold_id: int):
+        """
+        Put the stock of a hold back into the network
+
+        Raises:
+            ValueError: If the hold does not exist, has expired or was
+                already committed or released.
+
+        """
+        with self.__lock:
+            self.__get_outstanding_hold(hold_id)
+            self.__release(hold_id)
+
+    def get_hold_count(self) -> int:
+        """Return number of outstanding holds"""
+        with self.__lock:
+            self.__expire(self.__clock())
+            return len(self.__holds)
+
+    def get_held_quantity(self, item: str) -> int:
+        """Return quantity of item held by outstanding holds"""
+        with self.__lock:
+            self.__expire(self.__clock())
+            return self.__held.get(item, 0)
+
+    def get_available_to_promise(self, item: str) -> int:
+        """Return quantity of item in stock across the network and not held"""
+        with self.__lock:
+            self.__expire(self.__clock())
+            with self.__network.lock_items([item]):
+                return self.__network.get_total_quantity(item)
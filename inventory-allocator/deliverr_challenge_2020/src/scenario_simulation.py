@@ -0,0 +1,439 @@
+"""
+Replay a log of orders against alternative versions of a warehouse network
+and report each scenario's fill rate, split shipment rate and warehouses
+shipped from per order
+
+Run from the deliverr_challenge_2020 folder:
+    python -m src.scenario_simulation warehouses.json orders.jsonl \\
+        scenarios.json --processes 4
+
+The warehouse file holds the list of warehouse dicts taken by
+allocate_inventory, the order log holds one JSON order per line and the
+scenario file holds a list of Scenario dicts. Results are written to
+stdout as one JSON object per scenario.
+"""
+import argparse
+import multiprocessing
+import sys
+from typing import Dict, Iterable, List
+from .inventory_allocator import InventoryAllocator
+from .json_codec import dumps, loads
+from .pipeline import read_order_batches
+from .typing import Inventory_Dist, Input_Warehouse_List, Scenario
+from .warehouse_network import WarehouseNetwork
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def get_scenario_names(warehouse_names: List[str],
+                       scenario: Scenario) -> List[str]:
+    """
+    Return names of the warehouses in scenario in priority order
+
+    Raises:
+        ValueError: If the scenario adds a warehouse whose name is taken,
+            or removes or prioritizes a warehouse it doesn't have.
+
+    Parameters:
+        warehouse_names: Names of the warehouses of the base network in
+            priority order.
+        scenario: Changes to the base network.
+
+    """
+    removed = set(scenario.get("remove_warehouses", ()))
+    unknown = removed.difference(warehouse_names)
+    if unknown:
+        raise ValueError("Can't remove unknown warehouses: %s"
+                         % ", ".join(sorted(unknown)))
+    names = [name for name in warehouse_names if name not in removed]
+    for inp_warehouse in scenario.get("add_warehouses", ()):
+        if inp_warehouse["name"] in names:
+            raise ValueError("Warehouse %s is already in the network"
+                             % inp_warehouse["name"])
+        names.append(inp_warehouse["name"])
+    priority = scenario.get("priority", [])
+    unknown = set(priority).difference(names)
+    if unknown:
+        raise ValueError("Can't prioritize unknown warehouses: %s"
+                         % ", ".join(sorted(unknown)))
+    prioritized = set(priority)
+    return list(priority) + [name for name in names
+                             if name not in prioritized]
+
+
+def get_scenario_warehouse_dicts(warehouse_dicts: Input_Warehouse_List,
+                                 scenario: Scenario) -> Input_Warehouse_List:
+    """
+    Return warehouse dicts of the network as changed by scenario, with
+    copies of their inventories
+
+    Raises:
+        ValueError: If the scenario adds a warehouse whose name is taken,
+            or removes or prioritizes a warehouse it doesn't have.
+
+    """
+    by_name = {inp_warehouse["name"]: inp_warehouse
+               for inp_warehouse in warehouse_dicts}
+    by_name.update((inp_warehouse["name"], inp_warehouse)
+                   for inp_warehouse in scenario.get("add_warehouses", ()))
+    return [{"name": name, "inventory": dict(by_name[name]["inventory"])}
+            for name in get_scenario_names(
+                [inp_warehouse["name"] for inp_warehouse in warehouse_dicts],
+                scenario)]
+
+
+def get_scenario_result(name: str, orders: int, filled_orders: int,
+                        shipped_orders: int, split_orders: int,
+                        warehouse_shipments: int) -> Dict[str, object]:
+    """
+    Return the counts and rates reported for a scenario
+
+    Parameters:
+        name: Name of the scenario.
+        orders: Orders replayed.
+        filled_orders: Orders with every item shipped in full.
+        shipped_orders: Orders shipping anything.
+        split_orders: Orders shipped from more than one warehouse.
+        warehouse_shipments: Sum over orders of the warehouses shipped from.
+
+    """
+    return {"name": name, "orders": orders, "filled_orders": filled_orders,
+            "shipped_orders": shipped_orders, "split_orders": split_orders,
+            "fill_rate": filled_orders / orders if orders else 0.0,
+            "split_rate": (split_orders / shipped_orders
+                           if shipped_orders else 0.0),
+            "warehouses_per_order": (warehouse_shipments / shipped_orders
+                                     if shipped_orders else 0.0)}
+
+
+def check_restocks(scenario: Scenario):
+    """
+    Check every restock of scenario adds stock
+
+    Raises:
+        ValueError: If a restock of scenario doesn't add stock.
+
+    """
+    for order_index, name, item, quantity in scenario.get("restocks", ()):
+        if quantity <= 0:
+            raise ValueError("Restock of %s at %s must add stock"
+                             % (item, name))
+
+
+def replay_scenario(warehouse_dicts: Input_Warehouse_List,
+                    orders: Iterable[Inventory_Dist],
+                    scenario: Scenario) -> Dict[str, object]:
+    """
+    Return the result of allocating orders one at a time with an
+    InventoryAllocator on the network as changed by scenario
+
+    This is the reference ScenarioSimulator is checked against, and needs
+    no numpy.
+
+    Raises:
+        ValueError: If the scenario doesn't fit the network.
+
+    Parameters:
+        warehouse_dicts: Warehouses of the base network in priority order.
+        orders: The orders to replay, in the order they were placed.
+        scenario: Changes to the base network.
+
+    """
+    check_restocks(scenario)
+    network = WarehouseNetwork(get_scenario_warehouse_dicts(warehouse_dicts,
+                                                            scenario))
+    allocator = InventoryAllocator(network)
+    restocks = {}
+    for order_index, name, item, quantity in scenario.get("restocks", ()):
+        restocks.setdefault(order_index, []).append((name, item, quantity))
+    counts = [0, 0, 0, 0, 0]
+    for order_index, order in enumerate(orders):
+        for name, item, quantity in restocks.get(order_index, ()):
+            network.adjust_stock(name, item, quantity)
+        shipment = allocator.allocate_inventory(order)
+        shipped = {}
+        for warehouse_shipment in shipment:
+            for items in warehouse_shipment.values():
+                for item, quantity in items.items():
+                    shipped[item] = shipped.get(item, 0) + quantity
+        counts[0] += 1
+        counts[1] += all(shipped.get(item, 0) >= quantity
+                         for item, quantity in order.items())
+        counts[2] += bool(shipment)
+        counts[3] += len(shipment) > 1
+        counts[4] += len(shipment)
+    return get_scenario_result(scenario.get("name", ""), *counts)
+
+
+class ScenarioSimulator(object):
+    """
+    Replay orders against many scenarios at once, allocating each order
+    line in every scenario with one set of vectorized NumPy operations
+
+    Each column is a warehouse of the base network or one added by a
+    scenario, and a scenario by column matrix holds the rank of each
+    warehouse in each scenario, infinite where a scenario doesn't have it.
+    The first time an item is ordered its stock is laid out as a scenario
+    by warehouse matrix, with each row sorted in that scenario's priority
+    order, so the single warehouse check and greedy split InventoryAllocator
+    does for one network run on every row together. Allocation gives the
+    same result as replay_scenario for each scenario.
+
+    Attributes:
+        __names (List[str]): Name of each scenario.
+        __num_columns (int): Number of warehouse columns.
+        __rows (numpy.ndarray): Index of each scenario's row.
+        __ranks (numpy.ndarray): Rank of each column in each scenario.
+        __column_stock (Dict[str, List[Tuple[int, int]]]): Column and
+            starting quantity of every column that can stock each item.
+        __item_stock (Dict[str, Tuple[numpy.ndarray, ...]]): Stock of each
+            item ordered so far in each scenario's priority order, with the
+            column each quantity belongs to and each scenario's total.
+        __restocks (Dict[int, List[Tuple[int, int, str, int]]]): Scenario,
+            column, item and quantity of the stock received before each
+            order index.
+        __order_index (int): Index of the next order replayed.
+        __orders (numpy.ndarray): Orders replayed in each scenario, with
+            the filled, shipped and split orders and warehouse shipments.
+
+    """
+
+    def __init__(self, warehouse_dicts: Input_Warehouse_List,
+                 scenarios: List[Scenario]):
+        if numpy is None:
+            raise ImportError("ScenarioSimulator requires numpy")
+        base_names = [inp_warehouse["name"]
+                      for inp_warehouse in warehouse_dicts]
+        base_columns = {name: column for column, name in enumerate(base_names)}
+        inventories = [inp_warehouse["inventory"]
+                       for inp_warehouse in warehouse_dicts]
+        self.__names = [scenario.get("name", "") for scenario in scenarios]
+        scenario_columns = []
+        for scenario in scenarios:
+            check_restocks(scenario)
+            columns = dict(base_columns)
+            for inp_warehouse in scenario.get("add_warehouses", ()):
+                columns[inp_warehouse["name"]] = len(inventories)
+                inventories.append(inp_warehouse["inventory"])
+            scenario_columns.append(columns)
+        self.__num_columns = len(inventories)
+
+        self.__ranks = numpy.full((len(scenarios), len(inventories)),
+                                  numpy.inf)
+        self.__column_stock = {}
+        for column, inventory in enumerate(inventories):
+            for item, quantity in inventory.items():
+                if quantity > 0:
+                    self.__column_stock.setdefault(item, []).append(
+                        (column, quantity))
+        self.__restocks = {}
+        for row, scenario in enumerate(scenarios):
+            columns = scenario_columns[row]
+            names = get_scenario_names(base_names, scenario)
+            self.__ranks[row, [columns[name] for name in names]] = \
+                numpy.arange(len(names))
+            for order_index, name, item, quantity in scenario.get(
+                    "restocks", ()):
+                if name not in names:
+                    raise ValueError("Can't restock unknown warehouse %s"
+                                     % name)
+                column_stock = self.__column_stock.setdefault(item, [])
+                if all(column != columns[name]
+                       for column, _ in column_stock):
+                    # Restocked columns start empty in every scenario
+                    column_stock.append((columns[name], 0))
+                self.__restocks.setdefault(order_index, []).append(
+                    (row, columns[name], item, quantity))
+        self.__item_stock = {}
+        self.__rows = numpy.arange(len(scenarios))
+        self.__order_index = 0
+        self.__orders = numpy.zeros((5, len(scenarios)), dtype=numpy.int64)
+
+    def __get_item_stock(self, item: str) -> tuple:
+        """
+        Return stock of item in each scenario's priority order, the column
+        of each quantity and each scenario's total, laying them out the
+        first time
+
+        """
+        item_stock = self.__item_stock.get(item)
+        if item_stock is None:
+            column_stock = self.__column_stock.get(item, [])
+            columns = numpy.array([column for column, _ in column_stock],
+                                  dtype=numpy.int64)
+            quantities = numpy.array([quantity for _, quantity
+                                      in column_stock], dtype=numpy.int64)
+            ranks = self.__ranks[:, columns]
+            order = numpy.argsort(ranks, axis=1, kind="stable")
+            # Columns a scenario doesn't have sort last and hold nothing
+            stock = numpy.where(
+                numpy.take_along_axis(ranks, order, axis=1) < numpy.inf,
+                quantities[order], 0)
+            item_stock = self.__item_stock[item] = (
+                stock, columns[order], stock.sum(axis=1))
+        return item_stock
+
+    def __allocate_line(self, item: str, quantity: int,
+                        filled: "numpy.ndarray", used: list):
+        """
+        Allocate quantity of item in every scenario
+
+        Parameters:
+            item: Item to be shipped.
+            quantity: Amount of item to be shipped.
+            filled: Whether each scenario has shipped every line of the
+                order so far, cleared where this line can't be shipped.
+            used: Keys of scenario and column pairs shipped from, added to.
+
+        """
+        stock, columns, totals = self.__get_item_stock(item)
+        if not stock.shape[1]:
+            filled[:] = False
+            return
+        fits = stock >= quantity
+        first = fits.argmax(axis=1)
+        single_rows = fits[self.__rows, first]
+        shipped_rows = totals >= quantity
+        filled &= shipped_rows
+        totals[shipped_rows] -= quantity
+
+        rows = numpy.flatnonzero(single_rows)
+        if rows.size:
+            first = first[rows]
+            stock[rows, first] -= quantity
+            used.append(rows * self.__num_columns + columns[rows, first])
+        rows = numpy.flatnonzero(shipped_rows & ~single_rows)
+        if rows.size:
+            # Take from each warehouse in priority order what the earlier
+            # ones leave of the quantity, only summing rows that split
+            row_stock = stock[rows]
+            taken = numpy.clip(
+                quantity - (row_stock.cumsum(axis=1) - row_stock), 0,
+                row_stock)
+            stock[rows] = row_stock - taken
+            row_indexes, positions = numpy.nonzero(taken)
+            used.append(rows[row_indexes] * self.__num_columns
+                        + columns[rows[row_indexes], positions])
+
+    def __restock(self, row: int, column: int, item: str, quantity: int):
+        """Add quantity of item to column in the scenario at row"""
+        stock, columns, totals = self.__get_item_stock(item)
+        position = numpy.flatnonzero(columns[row] == column)[0]
+        stock[row, position] += quantity
+        totals[row] += quantity
+
+    def replay(self, orders: Iterable[Inventory_Dist]):
+        """
+        Allocate orders in every scenario, following the orders already
+        replayed
+
+        Parameters:
+            orders: The orders to replay, in the order they were placed.
+
+        """
+        num_scenarios = len(self.__names)
+        counts = self.__orders
+        for order in orders:
+            for restock in self.__restocks.get(self.__order_index, ()):
+                self.__restock(*restock)
+            self.__order_index += 1
+            filled = numpy.ones(num_scenarios, dtype=bool)
+            used = []
+            for item, quantity in order.items():
+                if quantity > 0:
+                    self.__allocate_line(item, quantity, filled, used)
+            counts[0] += 1
+            counts[1] += filled
+            if used:
+                # A warehouse shipping several lines is counted once
+                keys = numpy.unique(numpy.concatenate(used))
+                num_warehouses = numpy.bincount(
+                    keys // self.__num_columns, minlength=num_scenarios)
+                counts[2] += num_warehouses > 0
+                counts[3] += num_warehouses > 1
+                counts[4] += num_warehouses
+
+    def get_results(self) -> List[Dict[str, object]]:
+        """Return the result of each scenario for the orders replayed"""
+        return [get_scenario_result(name, *map(int, self.__orders[:, row]))
+                for row, name in enumerate(self.__names)]
+
+
+def run_scenarios(warehouse_dicts: Input_Warehouse_List, order_log: str,
+                  scenarios: List[Scenario], batch_size: int = 1024
+                  ) -> List[Dict[str, object]]:
+    """
+    Return the result of each scenario, streaming orders from order_log
+
+    Parameters:
+        warehouse_dicts: Warehouses of the base network in priority order.
+        order_log: JSON lines file of orders in the order they were placed.
+        scenarios: Changes to the base network to simulate.
+        batch_size: Orders read at a time.
+
+    """
+    simulator = ScenarioSimulator(warehouse_dicts, scenarios)
+    with open(order_log, "rb") as input_stream:
+        for orders in read_order_batches(input_stream, batch_size):
+            simulator.replay(orders)
+    return simulator.get_results()
+
+
+def simulate(warehouse_dicts: Input_Warehouse_List, order_log: str,
+             scenarios: List[Scenario], processes: int = 1,
+             batch_size: int = 1024) -> List[Dict[str, object]]:
+    """
+    Return the result of each scenario, in the order given, of replaying
+    the orders in order_log
+
+    Scenarios never share stock, so with more than one process they are
+    dealt out to worker processes that each replay the whole log.
+
+    Parameters:
+        warehouse_dicts: Warehouses of the base network in priority order.
+        order_log: JSON lines file of orders in the order they were placed.
+        scenarios: Changes to the base network to simulate.
+        processes: Worker processes to share the scenarios between.
+        batch_size: Orders read at a time.
+
+    """
+    processes = max(1, min(processes, len(scenarios)))
+    if processes == 1:
+        return run_scenarios(warehouse_dicts, order_log, scenarios,
+                             batch_size)
+    with multiprocessing.Pool(processes) as pool:
+        chunk_results = pool.starmap(
+            run_scenarios, [(warehouse_dicts, order_log,
+                             scenarios[process::processes], batch_size)
+                            for process in range(processes)])
+    results = [None] * len(scenarios)
+    for process, chunk in enumerate(chunk_results):
+        results[process::processes] = chunk
+    return results
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("warehouses", help="JSON file of warehouse dicts")
+    parser.add_argument("orders", help="JSON lines file of orders")
+    parser.add_argument("scenarios", help="JSON file of scenario dicts")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    with open(args.warehouses, "rb") as warehouse_file:
+        warehouse_dicts = loads(warehouse_file.read())
+    with open(args.scenarios, "rb") as scenario_file:
+        scenarios = loads(scenario_file.read())
+    for result in simulate(warehouse_dicts, args.orders, scenarios,
+                           args.processes, args.batch_size):
+        sys.stdout.buffer.write(dumps(result) + b"\n")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
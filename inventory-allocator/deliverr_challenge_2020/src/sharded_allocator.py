@@ -0,0 +1,171 @@
+import multiprocessing
+import zlib
+from typing import Iterable, List
+from multiprocessing.connection import Connection
+from .inventory_allocator import InventoryAllocator
+from .typing import Inventory_Dist, Input_Warehouse_List, Shipment
+from .warehouse_network import WarehouseNetwork
+
+
+def get_shard(item: str, num_shards: int) -> int:
+    """Return the shard owning item, the same in every process"""
+    return zlib.crc32(item.encode("utf-8")) % num_shards
+
+
+def serve_shard(connection: Connection,
+                warehouse_dicts: Input_Warehouse_List):
+    """
+    Allocate batches of orders received on connection from a network of the
+    shard's inventory until None is received
+
+    Parameters:
+        connection: Pipe to the ShardedInventoryAllocator.
+        warehouse_dicts: Every warehouse, holding only the shard's items.
+
+    """
+    allocator = InventoryAllocator(WarehouseNetwork(warehouse_dicts))
+    while True:
+        orders = connection.recv()
+        if orders is None:
+            break
+        try:
+            connection.send(allocator.allocate_batch(orders))
+        except Exception as error:
+            connection.send(error)
+    connection.close()
+
+
+class ShardedInventoryAllocator(object):
+    """
+    Allocate orders in worker processes that each own the inventory of a
+    slice of the items, producing the same Shipments as InventoryAllocator
+
+    Greedy allocation of an item never depends on other items, so each
+    order is split by item, the parts are allocated by their shards in
+    parallel and the results are merged back in warehouse priority order.
+
+    Attributes:
+        __num_shards (int): Number of worker processes.
+        __warehouse_ranks (Dict[str, int]): Priority of each warehouse name.
+        __connections (List[Connection]): Pipe to each worker process.
+        __processes (List[Process]): Worker process owning each shard.
+
+    """
+
+    def __init__(self, warehouse_dicts: Input_Warehouse_List,
+                 num_shards: int = None):
+        self.__num_shards = num_shards or multiprocessing.cpu_count()
+        self.__warehouse_ranks = {inp_warehouse["name"]: rank
+                                  for rank, inp_warehouse
+                                  in enumerate(warehouse_dicts)}
+
+        # Every shard keeps every warehouse, holding only the shard's items
+        shard_dicts = [[] for _ in range(self.__num_shards)]
+        for inp_warehouse in warehouse_dicts:
+            shard_inventories = [{} for _ in range(self.__num_shards)]
+            for item, quantity in inp_warehouse["inventory"].items():
+                shard_inventories[get_shard(item, self.__num_shards)][
+                    item] = quantity
+            for shard, inventory in enumerate(shard_inventories):
+                shard_dicts[shard].append({"name": inp_warehouse["name"],
+                                           "inventory": inventory})
+
+        self.__connections = []
+        self.__processes = []
+        for shard in range(self.__num_shards):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=serve_shard, args=(worker_connection,
+                                          shard_dicts[shard]), daemon=True)
+            process.start()
+            worker_connection.close()
+            self.__connections.append(connection)
+            self.__processes.append(process)
+
+    def __enter__(self) -> "ShardedInventoryAllocator":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes"""
+        for connection in self.__connections:
+            connection.send(None)
+            connection.close()
+        for process in self.__processes:
+            process.join()
+        self.__connections = []
+        self.__processes = []
+
+    def __merge_shipments(self, order: Inventory_Dist,
+                          shard_shipments: List[Shipment]) -> Shipment:
+        """Return the Shipment of order from the Shipments of its shards"""
+        if len(shard_shipments) == 1:
+            return shard_shipments[0]
+        merged = {}
+        for shipment in shard_shipments:
+            for warehouse_shipment in shipment:
+                for name, items in warehouse_shipment.items():
+                    merged.setdefault(name, {}).update(items)
+        # Match the item order InventoryAllocator ships items in
+        return [{name: {item: merged[name][item] for item in order
+                        if item in merged[name]}}
+                for name in sorted(merged, key=self.__warehouse_ranks.get)]
+
+    def allocate_batch(self, orders: Iterable[Inventory_Dist]
+                       ) -> List[Shipment]:
+        """
+        Returns a Shipment for each order, allocated one after another
+
+        Raises:
+            ValueError: If the allocator has been closed.
+
+        Parameters:
+            orders: The orders to be completed, in the order to allocate them.
+
+        """
+        if not self.__connections:
+            raise ValueError("ShardedInventoryAllocator is closed")
+        orders = list(orders)
+        # Each shard only receives the orders containing its items
+        shard_orders = [[] for _ in range(self.__num_shards)]
+        shard_order_numbers = [[] for _ in range(self.__num_shards)]
+        for order_number, order in enumerate(orders):
+            sub_orders = {}
+            for item, quantity in order.items():
+                sub_orders.setdefault(get_shard(item, self.__num_shards),
+                                      {})[item] = quantity
+            for shard, sub_order in sub_orders.items():
+                shard_orders[shard].append(sub_order)
+                shard_order_numbers[shard].append(order_number)
+
+        for connection, sub_orders in zip(self.__connections, shard_orders):
+            connection.send(sub_orders)
+        # Every result is read before raising so the pipes stay in step
+        shard_results = [connection.recv()
+                         for connection in self.__connections]
+        for result in shard_results:
+            if isinstance(result, Exception):
+                raise result
+
+        order_shipments = [[] for _ in orders]
+        for order_numbers, result in zip(shard_order_numbers, shard_results):
+            for order_number, shipment in zip(order_numbers, result):
+                order_shipments[order_number].append(shipment)
+
+        return [self.__merge_shipments(order, shipments)
+                for order, shipments in zip(orders, order_shipments)]
+
+    def allocate_inventory(self, order: Inventory_Dist) -> Shipment:
+        """
+        Returns Shipment of optimally allocated inventory
+
+        Raises:
+            ValueError: If the allocator has been closed.
+
+        Parameters:
+            order: The order to be completed.
+
+        """
+        return self.allocate_batch([order])[0]
@@ -0,0 +1,191 @@
+import heapq
+import math
+from typing import Callable, Iterator, List, Tuple
+from .typing import Location
+from .warehouse import Warehouse
+
+# Subtrees with at most this many warehouses are not split any further
+LEAF_SIZE = 8
+
+Point = Tuple[float, float, float]
+
+
+def to_point(location: Location) -> Point:
+    """
+    Return the point on the unit sphere at location, a latitude and
+    longitude in degrees
+
+    Straight line distance between points increases with distance along the
+    earth's surface, so it ranks warehouses the same way.
+
+    """
+    latitude, longitude = map(math.radians, location)
+    return (math.cos(latitude) * math.cos(longitude),
+            math.cos(latitude) * math.sin(longitude),
+            math.sin(latitude))
+
+
+def get_squared_distance(point: Point, other: Point) -> float:
+    """Return the squared straight line distance between two points"""
+    x, y, z = point[0] - other[0], point[1] - other[1], point[2] - other[2]
+    return x * x + y * y + z * z
+
+
+class SpatialIndex(object):
+    """
+    k-d tree over warehouse locations, finding warehouses nearest first
+    from a destination without sorting every warehouse
+
+    It is built from each located warehouse with its priority and location.
+    The tree is stored implicitly, every subtree being a range of the
+    warehouse list whose middle warehouse splits the rest on the axis their
+    points are most spread along. Searches are best first, popping subtrees
+    and warehouses off a heap keyed by their least possible distance, so
+    each warehouse found costs O(log n).
+
+    Attributes:
+        __warehouses (List[Warehouse]): Warehouses in tree order.
+        __points (List[Point]): Point of each warehouse in tree order.
+        __ranks (List[int]): Priority of each warehouse in tree order,
+            breaking ties in distance.
+        __axes (List[int]): Axis the subtree centred on each position is
+            split on, -1 for positions in leaves.
+        __points_by_warehouse (Dict[Warehouse, Point]): Point of each
+            warehouse.
+
+    """
+
+    def __init__(self, located: List[Tuple[Warehouse, int, Location]]):
+        entries = [(to_point(location), rank, warehouse)
+                   for warehouse, rank, location in located]
+        self.__axes = [-1] * len(entries)
+        self.__build(entries, 0, len(entries))
+        self.__points = [entry[0] for entry in entries]
+        self.__ranks = [entry[1] for entry in entries]
+        self.__warehouses = [entry[2] for entry in entries]
+        self.__points_by_warehouse = {warehouse: point
+                                      for point, _, warehouse in entries}
+
+    def __build(self, entries: List[Tuple[Point, int, Warehouse]], low: int,
+                high: int):
+        """Arrange entries[low:high] into a subtree"""
+        if high - low <= LEAF_SIZE:
+            return
+        spreads = [max(entry[0][axis] for entry in entries[low:high])
+                   - min(entry[0][axis] for entry in entries[low:high])
+                   for axis in range(3)]
+        axis = spreads.index(max(spreads))
+        entries[low:high] = sorted(entries[low:high],
+                                   key=lambda entry: entry[0][axis])
+        middle = (low + high) // 2
+        self.__axes[middle] = axis
+        self.__build(entries, low, middle)
+        self.__build(entries, middle + 1, high)
+
+    def get_point(self, warehouse: Warehouse) -> Point:
+        """Return the point of warehouse, None if it has no location"""
+        return self.__points_by_warehouse.get(warehouse)
+
+    def iter_nearest(self, point: Point) -> Iterator[Tuple[float, Warehouse]]:
+        """
+        Return an iterator of the squared distance to point and warehouse
+        of every warehouse, nearest first and then by priority
+
+        """
+        points, ranks, axes = self.__points, self.__ranks, self.__axes
+        x, y, z = point
+        heappush, heappop = heapq.heappush, heapq.heappop
+        # Subtrees have a rank of -1, so they are opened before any
+        # warehouse at the same distance is found
+        heap = [(0.0, -1, 0, len(points))]
+        while heap:
+            distance, rank, low, high = heappop(heap)
+            if rank >= 0:
+                yield distance, self.__warehouses[low]
+                continue
+            if high - low <= LEAF_SIZE:
+                for position in range(low, high):
+                    other_x, other_y, other_z = points[position]
+                    heappush(heap, (
+                        (x - other_x) * (x - other_x)
+                        + (y - other_y) * (y - other_y)
+                        + (z - other_z) * (z - other_z),
+                        ranks[position], position, position + 1))
+                continue
+            middle = (low + high) // 2
+            heappush(heap, (get_squared_distance(point, points[middle]),
+                            ranks[middle], middle, middle + 1))
+            offset = point[axes[middle]] - points[middle][axes[middle]]
+            # The far side is at least as far away as the splitting plane
+            if offset < 0:
+                near_low, near_high, far_low, far_high = (low, middle,
+                                                          middle + 1, high)
+            else:
+                near_low, near_high, far_low, far_high = (middle + 1, high,
+                                                          low, middle)
+            if near_low < near_high:
+                heappush(heap, (distance, -1, near_low, near_high))
+            if far_low < far_high:
+                heappush(heap, (max(distance, offset * offset), -1, far_low,
+                                far_high))
+
+
+class NearestWarehouses(object):
+    """
+    Every warehouse of a network ordered nearest first from one destination
+    and then by priority, with warehouses without a location last
+
+    Warehouses are found lazily by one search of the spatial index, which
+    is remembered so every item of an order shares it and only searches as
+    far as the farthest warehouse any item needed.
+
+    Attributes:
+        __index (SpatialIndex): Index of warehouses with a location.
+        __point (Point): Point of the destination.
+        __get_rank (Callable[[Warehouse], int]): Priority of a warehouse.
+        __unlocated (List[Warehouse]): Warehouses without a location, in
+            priority order.
+        __search (Iterator[Tuple[float, Warehouse]]): Search of the index,
+            None once every located warehouse has been found.
+        __found (List[Warehouse]): Warehouses found so far, nearest first.
+
+    """
+
+    def __init__(self, index: SpatialIndex, destination: Location,
+                 get_rank: Callable[[Warehouse], int],
+                 unlocated: List[Warehouse]):
+        self.__index = index
+        self.__point = to_point(destination)
+        self.__get_rank = get_rank
+        self.__unlocated = unlocated
+        self.__search = index.iter_nearest(self.__point)
+        self.__found = []
+
+    def __iter__(self) -> Iterator[Warehouse]:
+        """Yield every warehouse, nearest first"""
+        found = self.__found
+        position = 0
+        while True:
+            if position < len(found):
+                yield found[position]
+                position += 1
+                continue
+            if self.__search is not None:
+                try:
+                    found.append(next(self.__search)[1])
+                    continue
+                except StopIteration:
+                    self.__search = None
+            break
+        yield from self.__unlocated
+
+    def get_sort_key(self, warehouse: Warehouse) -> Tuple[float, int]:
+        """Return a key ordering warehouses nearest first, then by priority"""
+        point = self.__index.get_point(warehouse)
+        distance = (math.inf if point is None
+                    else get_squared_distance(self.__point, point))
+        return distance, self.__get_rank(warehouse)
+
+    def sort(self, warehouses: List[Warehouse]) -> List[Warehouse]:
+        """Return warehouses ordered nearest first, then by priority"""
+        return sorted(warehouses, key=self.get_sort_key)
@@ -1,4 +1,4 @@
-from typing import TypedDict, Dict,  List
+from typing import TypedDict, Dict,  List, Tuple
 
 Inventory_Dist = Dict[str, int]
 Input_Warehouse = TypedDict("Warehouse_Dict_List",
@@ -6,3 +6,13 @@ Input_Warehouse = TypedDict("Warehouse_Dict_List",
 Input_Warehouse_List = List[Input_Warehouse]
 Warehouse_Shipment = Dict[str, Inventory_Dist]
 Shipment = List[Warehouse_Shipment]
+# Latitude and longitude in degrees
+Location = Tuple[float, float]
+# A change to a warehouse network to simulate, every key is optional:
+# warehouses added after the others, names of warehouses removed, names of
+# warehouses moved to the front in priority order, and stock received as
+# [order index it arrives before, warehouse name, item, quantity] lists
+Scenario = TypedDict("Scenario",
+                     {"name": str, "add_warehouses": Input_Warehouse_List,
+                      "remove_warehouses": List[str], "priority": List[str],
+                      "restocks": List[list]}, total=False)
@@ -1,32 +1,114 @@
+from array import array
+from sys import intern
+from typing import List
 from .typing import Inventory_Dist, Warehouse_Shipment
-from copy import deepcopy
 
 
 class Warehouse(object):
     """
     A warehouse to store inventory, process shipments and ship them.
 
+    The inventory the warehouse is created with is read in place and never
+    modified. Only items whose stock changes are copied, each mapping to a
+    slot of a packed array of quantities, so building a warehouse copies
+    nothing and a probe of a changed item is a single dict lookup. Item
+    names are interned as they are copied, so every warehouse that changed
+    an item shares one key string.
+
     Attributes:
         __name (str): Name of the warehouse.
-        __inventory (Inventory_Dist): Inventory available in warehouse.
+        __inventory (Inventory_Dist): Inventory the warehouse was created
+            with, which is never modified.
+        __slots_by_item (Dict[str, int]): Slot in __quantities of every item
+            whose stock has changed, overriding __inventory.
+        __quantities (array): Current quantity of the item in each slot.
         __to_be_shipped (Inventory_Dist): Inventory processed to be shipped.
 
     """
 
+    __slots__ = ("__name", "__inventory", "__slots_by_item", "__quantities",
+                 "__to_be_shipped")
+
     def __init__(self, name: str, inventory: Inventory_Dist):
         self.__name = name
         self.__inventory = inventory
+        self.__slots_by_item = {}
+        self.__quantities = array("q")
         self.__to_be_shipped = {}
 
-    def __is_item_in_stock(self, item: str) -> bool:
-        """Return True if item is in inventory, False otherwise"""
-        return item in self.__inventory and self.__inventory[item] > 0
+    def get_name(self) -> str:
+        """Returns name of the warehouse"""
+        return self.__name
 
     def get_quantity(self, item: str) -> int:
         """Returns quantity of item in inventory currently"""
-        if not self.__is_item_in_stock(item):
+        slot = self.__slots_by_item.get(item)
+        if slot is not None:
+            return self.__quantities[slot]
+        quantity = self.__inventory.get(item, 0)
+        return quantity if quantity > 0 else 0
+
+    def get_items_in_stock(self) -> List[str]:
+        """Returns items with a positive quantity in inventory currently"""
+        inventory, quantities = self.__inventory, self.__quantities
+        items = [item for item, quantity in inventory.items()
+                 if quantity > 0 and self.get_quantity(item) > 0]
+        # Then items the warehouse was created without any stock of
+        items.extend(item for item, slot in self.__slots_by_item.items()
+                     if quantities[slot] > 0 and inventory.get(item, 0) <= 0)
+        return items
+
+    def __set_quantity(self, item: str, quantity: int):
+        """Record quantity of item, copying it into a slot the first time"""
+        slot = self.__slots_by_item.get(item)
+        if slot is None:
+            self.__slots_by_item[intern(item)] = len(self.__quantities)
+            self.__quantities.append(quantity)
+        else:
+            self.__quantities[slot] = quantity
+
+    def remove_stock(self, item: str, quantity: int) -> int:
+        """
+        Return amount of item removed from inventory, at most quantity
+
+        Parameters:
+            item: Item to be removed.
+            quantity: Amount of item to be removed.
+
+        """
+        slot = self.__slots_by_item.get(item)
+        if slot is not None:
+            if quantity <= 0:
+                return 0
+            removed = min(self.__quantities[slot], quantity)
+            self.__quantities[slot] -= removed
+            return removed
+        quantity_in_stock = self.get_quantity(item)
+        if quantity <= 0 or quantity_in_stock == 0:
             return 0
-        return self.__inventory[item]
+        removed = min(quantity_in_stock, quantity)
+        # Only the changed item is copied, the caller's inventory is untouched
+        self.__set_quantity(item, quantity_in_stock - removed)
+        return removed
+
+    def adjust_stock(self, item: str, delta: int):
+        """
+        Add delta of item to inventory, a negative delta takes stock away
+
+        Raises:
+            ValueError: If the adjustment would leave negative stock.
+
+        Parameters:
+            item: Item to be adjusted.
+            delta: Amount of item received, or removed if negative.
+
+        """
+        quantity = self.get_quantity(item) + delta
+        if quantity < 0:
+            raise ValueError("Cannot remove %d of %s from %s, only %d in stock"
+                             % (-delta, item, self.__name,
+                                self.get_quantity(item)))
+        self.__set_quantity(item, quantity)
 
     def process_item_shipment(self, item: str, quantity: int):
         """
@@ -37,9 +119,9 @@ class Warehouse(object):
             quantity: Amount of item to be ordered.
 
         """
-        if quantity > 0 and self.__is_item_in_stock(item):
-            self.__to_be_shipped[item] = min(self.get_quantity(item), quantity)
-            self.__inventory[item] -= self.__to_be_shipped[item]
+        removed = self.remove_stock(item, quantity)
+        if removed:
+            self.__to_be_shipped[item] = removed
 
     def ship_processed_shipments(self) -> Warehouse_Shipment:
         """Return a Warhouse_Shipment from inventory to be shipped"""
@@ -0,0 +1,91 @@
+from typing import Dict, List
+from .warehouse import Warehouse
+
+
+class WarehouseIndex(object):
+    """
+    Inverted index from items to the warehouses that have them in stock
+
+    Attributes:
+        __stocking_warehouses (Dict[str, List[Warehouse]]): Warehouses with
+            an item in stock, kept in priority order.
+        __ranks (Dict[Warehouse, int]): Priority of each warehouse, where a
+            lower rank is cheaper to ship from.
+        __totals (Dict[str, int]): Quantity of each item in stock across
+            every warehouse.
+
+    """
+
+    def __init__(self, warehouse_list: List[Warehouse]):
+        self.__stocking_warehouses = {}
+        self.__ranks = {}
+        self.__totals = {}
+        for rank, warehouse in enumerate(warehouse_list):
+            self.__ranks[warehouse] = rank
+            for item in warehouse.get_items_in_stock():
+                self.__stocking_warehouses.setdefault(item, []).append(
+                    warehouse)
+                self.__totals[item] = (self.__totals.get(item, 0)
+                                       + warehouse.get_quantity(item))
+
+    def get_warehouses(self, item: str) -> List[Warehouse]:
+        """Return warehouses with item in stock, in priority order"""
+        return self.__stocking_warehouses.get(item, [])
+
+    def get_total_quantity(self, item: str) -> int:
+        """Return quantity of item in stock across every warehouse"""
+        return self.__totals.get(item, 0)
+
+    def get_rank(self, warehouse: Warehouse) -> int:
+        """Return priority of warehouse, lower ranks are cheaper"""
+        return self.__ranks[warehouse]
+
+    def __insert(self, warehouse: Warehouse, item: str):
+        """Insert warehouse into the warehouses stocking item by rank"""
+        warehouses = self.__stocking_warehouses.setdefault(item, [])
+        rank = self.__ranks[warehouse]
+        low, high = 0, len(warehouses)
+        while low < high:
+            middle = (low + high) // 2
+            if self.__ranks[warehouses[middle]] < rank:
+                low = middle + 1
+            else:
+                high = middle
+        warehouses.insert(low, warehouse)
+
+    def remove_stock(self, warehouse: Warehouse, item: str,
+                     quantity: int) -> int:
+        """
+        Return amount of item removed from warehouse, keeping index up to date
+
+        Parameters:
+            warehouse: Warehouse to remove stock from.
+            item: Item to be removed.
+            quantity: Amount of item to be removed.
+
+        """
+        removed = warehouse.remove_stock(item, quantity)
+        if removed:
+            self.__totals[item] -= removed
+            if warehouse.get_quantity(item) == 0:
+                self.__stocking_warehouses[item].remove(warehouse)
+        return removed
+
+    def adjust_stock(self, warehouse: Warehouse, item: str, delta: int):
+        """
+        Add delta of item to warehouse, keeping index up to date
+
+        Parameters:
+            warehouse: Warehouse to adjust stock of.
+            item: Item to be adjusted.
+            delta: Amount of item received, or removed if negative.
+
+        """
+        was_in_stock = warehouse.get_quantity(item) > 0
+        warehouse.adjust_stock(item, delta)
+        self.__totals[item] = self.__totals.get(item, 0) + delta
+        is_in_stock = warehouse.get_quantity(item) > 0
+        if is_in_stock and not was_in_stock:
+            self.__insert(warehouse, item)
+        elif was_in_stock and not is_in_stock:
+            self.__stocking_warehouses[item].remove(warehouse)
@@ -0,0 +1,278 @@
+from contextlib import nullcontext
+from typing import ContextManager, Iterable, List
+from .allocation_log import AllocationLog
+from .item_locks import ItemLockTable
+from .spatial_index import NearestWarehouses, SpatialIndex
+from .typing import Input_Warehouse_List, Location, Shipment
+from .warehouse import Warehouse
+from .warehouse_index import WarehouseIndex
+
+
+class WarehouseNetwork(object):
+    """
+    A long lived network of warehouses whose inventory is shared by, and
+    depleted by, every order allocated against it
+
+    Warehouse dicts may give a "location", a latitude and longitude in
+    degrees, so orders with a destination can ship from the nearest
+    warehouses first. With an AllocationLog every stock change is logged, so
+    the network can be rebuilt from the log's warehouse dicts after a crash.
+
+    Attributes:
+        __warehouse_list (List[Warehouse]): Warehouses in priority order.
+        __warehouses_by_name (Dict[str, Warehouse]): Warehouses by name.
+        __warehouse_index (WarehouseIndex): Warehouses stocking each item.
+        __item_locks (ItemLockTable): Locks guarding the stock of each item,
+            None unless the network is thread safe.
+        __restock_versions (Dict[str, int]): Number of times stock of each
+            item has increased at any warehouse.
+        __spatial_index (SpatialIndex): Index of warehouses with a location.
+        __unlocated (List[Warehouse]): Warehouses without a location, in
+            priority order.
+        __locations (Dict[Warehouse, Location]): Location of each warehouse
+            with one.
+        __log (AllocationLog): Log of stock changes, None to keep none.
+
+    """
+
+    def __init__(self, warehouse_dicts: Input_Warehouse_List,
+                 thread_safe: bool = False, log: AllocationLog = None):
+        self.__warehouse_list = []
+        self.__unlocated = []
+        self.__locations = {}
+        located = []
+        for rank, inp_warehouse in enumerate(warehouse_dicts):
+            warehouse = Warehouse(inp_warehouse["name"],
+                                  inp_warehouse["inventory"])
+            self.__warehouse_list.append(warehouse)
+            location = inp_warehouse.get("location")
+            if location is None:
+                self.__unlocated.append(warehouse)
+            else:
+                located.append((warehouse, rank, location))
+                self.__locations[warehouse] = location
+        self.__warehouses_by_name = {warehouse.get_name(): warehouse
+                                     for warehouse in self.__warehouse_list}
+        self.__warehouse_index = WarehouseIndex(self.__warehouse_list)
+        self.__item_locks = ItemLockTable() if thread_safe else None
+        self.__restock_versions = {}
+        self.__spatial_index = SpatialIndex(located)
+        self.__log = log
+
+    def lock_items(self, items: Iterable[str]) -> ContextManager[None]:
+        """
+        Return a context manager giving the caller sole access to the stock
+        of items, which does nothing unless the network is thread safe
+
+        Parameters:
+            items: Items whose stock will be read and updated.
+
+        """
+        if self.__item_locks is None:
+            return nullcontext()
+        return self.__item_locks.hold(items)
+
+    def __lock_all_items(self) -> ContextManager[None]:
+        """
+        Return a context manager giving the caller sole access to the stock
+        of every item, which does nothing unless the network is thread safe
+
+        """
+        if self.__item_locks is None:
+            return nullcontext()
+        return self.__item_locks.hold_all()
+
+    def get_warehouse_list(self) -> List[Warehouse]:
+        """Return all warehouses in priority order"""
+        return self.__warehouse_list
+
+    def get_warehouse_dicts(self) -> Input_Warehouse_List:
+        """
+        Return warehouse dicts of every warehouse with its current stock, in
+        priority order
+
+        On a thread safe network the caller must hold every item's lock.
+
+        """
+        warehouse_dicts = []
+        for warehouse in self.__warehouse_list:
+            warehouse_dict = {
+                "name": warehouse.get_name(),
+                "inventory": {item: warehouse.get_quantity(item)
+                              for item in warehouse.get_items_in_stock()},
+            }
+            if warehouse in self.__locations:
+                warehouse_dict["location"] = self.__locations[warehouse]
+            warehouse_dicts.append(warehouse_dict)
+        return warehouse_dicts
+
+    def get_nearest_warehouses(self, destination: Location
+                               ) -> NearestWarehouses:
+        """
+        Return every warehouse ordered nearest first from destination, then
+        by priority, with warehouses without a location last
+
+        """
+        return NearestWarehouses(self.__spatial_index, destination,
+                                 self.get_rank, self.__unlocated)
+
+    def get_warehouse(self, name: str) -> Warehouse:
+        """
+        Return the warehouse called name
+
+        Raises:
+            ValueError: If there is no warehouse called name in the network.
+
+        """
+        if name not in self.__warehouses_by_name:
+            raise ValueError("No warehouse named %s in network" % name)
+        return self.__warehouses_by_name[name]
+
+    def get_warehouses(self, item: str) -> List[Warehouse]:
+        """Return warehouses with item in stock, in priority order"""
+        return self.__warehouse_index.get_warehouses(item)
+
+    def get_total_quantity(self, item: str) -> int:
+        """
+        Return quantity of item in stock across every warehouse, kept up to
+        date as stock is removed and adjusted
+
+        On a thread safe network the caller must hold the lock of item.
+
+        """
+        return self.__warehouse_index.get_total_quantity(item)
+
+    def get_rank(self, warehouse: Warehouse) -> int:
+        """Return priority of warehouse, lower ranks are cheaper"""
+        return self.__warehouse_index.get_rank(warehouse)
+
+    def get_quantity(self, warehouse_name: str, item: str) -> int:
+        """Return quantity of item in stock at the named warehouse"""
+        return self.get_warehouse(warehouse_name).get_quantity(item)
+
+    def get_restock_version(self, item: str) -> int:
+        """
+        Return a counter that changes whenever stock of item increases
+
+        Orders only ever take stock away, so while the counter is unchanged
+        no warehouse can have gained stock of item.
+
+        """
+        return self.__restock_versions.get(item, 0)
+
+    def remove_stock(self, warehouse: Warehouse, item: str,
+                     quantity: int) -> int:
+        """
+        Return amount of item removed from warehouse, at most quantity
+
+        On a thread safe network the caller must hold the lock of item, and
+        with a log the caller must log what was removed with log_shipment.
+
+        Parameters:
+            warehouse: Warehouse in the network to remove stock from.
+            item: Item to be removed.
+            quantity: Amount of item to be removed.
+
+        """
+        return self.__warehouse_index.remove_stock(warehouse, item, quantity)
+
+    def adjust_stock(self, warehouse_name: str, item: str, delta: int):
+        """
+        Apply a stock delta, such as a receipt or adjustment, between orders
+
+        Raises:
+            ValueError: If there is no warehouse called warehouse_name or the
+                adjustment would leave negative stock.
+
+        Parameters:
+            warehouse_name: Name of the warehouse whose stock changed.
+            item: Item whose stock changed.
+            delta: Amount of item received, or removed if negative.
+
+        """
+        warehouse = self.get_warehouse(warehouse_name)
+        with self.lock_items([item]):
+            self.__warehouse_index.adjust_stock(warehouse, item, delta)
+            if delta > 0:
+                self.__restock_versions[item] = \
+                    self.get_restock_version(item) + 1
+            if self.__log is not None:
+                self.__log.append([{warehouse_name: {item: -delta}}])
+        self.commit_log()
+
+    def return_shipment(self, shipment: Shipment):
+        """
+        Put the stock of a Shipment back into the warehouses it came from,
+        such as when a hold is released, logged as a single record so a
+        crash never replays part of it
+
+        Raises:
+            ValueError: If a warehouse of shipment isn't in the network.
+
+        Parameters:
+            shipment: Amount of each item to put back into each warehouse.
+
+        """
+        # Every warehouse is looked up before any stock changes
+        changes = [(self.get_warehouse(name), item, quantity)
+                   for warehouse_shipment in shipment
+                   for name, items in warehouse_shipment.items()
+                   for item, quantity in items.items()]
+        with self.lock_items(item for _, item, _ in changes):
+            for warehouse, item, quantity in changes:
+                self.__warehouse_index.adjust_stock(warehouse, item, quantity)
+                self.__restock_versions[item] = \
+                    self.get_restock_version(item) + 1
+            if self.__log is not None and changes:
+                self.__log.append([
+                    {name: {item: -quantity
+                            for item, quantity in items.items()}
+                     for name, items in warehouse_shipment.items()}
+                    for warehouse_shipment in shipment])
+        self.commit_log()
+
+    def log_shipment(self, shipment: Shipment):
+        """
+        Log the stock removed by one order as a single record, which does
+        nothing unless the network has a log
+
+        On a thread safe network the caller must hold the locks of the items.
+
+        Parameters:
+            shipment: Amount of each item removed from each warehouse.
+
+        """
+        if self.__log is not None:
+            self.__log.append(shipment)
+
+    def commit_log(self):
+        """
+        Make logged stock changes as durable as the log requires, taking a
+        snapshot if one is due, which does nothing unless the network has a
+        log
+
+        It must be called without holding any item locks.
+
+        """
+        if self.__log is None:
+            return
+        self.__log.commit()
+        if self.__log.is_checkpoint_due():
+            with self.__lock_all_items():
+                # Another thread may have taken the snapshot already
+                if self.__log.is_checkpoint_due():
+                    self.__log.checkpoint(self.get_warehouse_dicts())
+
+    def checkpoint_log(self):
+        """
+        Write a snapshot of every warehouse's stock to the log, so recovery
+        only replays changes after it
+
+        Raises:
+            ValueError: If the network has no log.
+
+        """
+        if self.__log is None:
+            raise ValueError("Network has no log to checkpoint")
+        with self.__lock_all_items():
+            self.__log.checkpoint(self.get_warehouse_dicts())
@@ -0,0 +1,240 @@
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from src import allocation_log
+from src.allocation_log import AllocationLog, get_sequence_files
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+
+ITEMS = ["sku-%d" % item_id for item_id in range(10)]
+
+
+def make_warehouse_dicts():
+    rng = random.Random(7)
+    return [{"name": "wh-%d" % warehouse_id,
+             "location": [warehouse_id, -warehouse_id],
+             "inventory": {item: rng.randint(1, 30)
+                           for item in rng.sample(ITEMS, 6)}}
+            for warehouse_id in range(8)]
+
+
+def place_orders(network, seed, count):
+    """Allocate count random orders with some restocks in between"""
+    rng = random.Random(seed)
+    allocator = InventoryAllocator(network)
+    for _ in range(count):
+        allocator.allocate_inventory(
+            {item: rng.randint(1, 6) for item in rng.sample(ITEMS, 3)})
+        if rng.random() < 0.2:
+            network.adjust_stock("wh-%d" % rng.randrange(8),
+                                 rng.choice(ITEMS), rng.randint(1, 5))
+
+
+# Places orders with a log and crashes without closing it
+CRASH_SCRIPT = """
+import os, sys
+from src.allocation_log import AllocationLog
+from src.warehouse_network import WarehouseNetwork
+from test.test_allocation_log import make_warehouse_dicts, place_orders
+log = AllocationLog(sys.argv[1], make_warehouse_dicts(), durability="sync",
+                    checkpoint_records=25)
+place_orders(WarehouseNetwork(log.get_warehouse_dicts(), log=log), 3,
+             int(sys.argv[2]))
+os._exit(1)
+"""
+
+
+class TestAllocationLog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_expected_stock(self, seed, count):
+        network = WarehouseNetwork(make_warehouse_dicts())
+        place_orders(network, seed, count)
+        return network.get_warehouse_dicts()
+
+    def get_logged_count(self):
+        count = 0
+        for _, path in get_sequence_files(self.path, "segment-"):
+            with open(path, "rb") as segment_file:
+                count += segment_file.read().count(b"\n")
+        return count
+
+    def recover(self, durability="none"):
+        log = AllocationLog(self.path, durability=durability)
+        return log, WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+
+    def test_new_log_needs_warehouses(self):
+        with self.assertRaises(ValueError):
+            AllocationLog(self.path)
+        with self.assertRaises(ValueError):
+            AllocationLog(self.path, make_warehouse_dicts(),
+                          durability="eventually")
+
+    def test_sync_log_survives_crash(self):
+        log = AllocationLog(self.path, make_warehouse_dicts(),
+                            durability="sync")
+        network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+        place_orders(network, 1, 200)
+        # Crash without closing the log
+        _, recovered = self.recover()
+        self.assertEqual(recovered.get_warehouse_dicts(),
+                         network.get_warehouse_dicts())
+        self.assertEqual(recovered.get_warehouse_dicts(),
+                         self.get_expected_stock(1, 200))
+
+    def test_batch_log_loses_only_waiting_records(self):
+        log = AllocationLog(self.path, make_warehouse_dicts(),
+                            durability="batch", batch_size=1000,
+                            batch_interval_s=60)
+        network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+        place_orders(network, 1, 20)
+        log.flush()
+        flushed = network.get_warehouse_dicts()
+        allocator = InventoryAllocator(network)
+        self.assertTrue(allocator.allocate_inventory({"sku-1": 1}))
+        # The last order is still waiting when the process crashes
+        _, recovered = self.recover()
+        self.assertEqual(recovered.get_warehouse_dicts(), flushed)
+        log.close()
+
+    def test_batch_log_written_in_background(self):
+        log = AllocationLog(self.path, make_warehouse_dicts(),
+                            durability="batch", batch_size=10,
+                            batch_interval_s=60)
+        network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+        place_orders(network, 1, 30)
+        # Full batches are written without waiting for the interval
+        deadline = time.monotonic() + 5
+        while (log.get_next_sequence() - self.get_logged_count() >= 10
+               and time.monotonic() < deadline):
+            time.sleep(0.01)
+        self.assertLess(log.get_next_sequence() - self.get_logged_count(), 10)
+        log.close()
+        self.assertEqual(self.get_logged_count(), log.get_next_sequence())
+
+    def test_close_writes_waiting_records(self):
+        with AllocationLog(self.path, make_warehouse_dicts(),
+                           durability="none") as log:
+            network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+            place_orders(network, 2, 50)
+        log, recovered = self.recover()
+        self.assertEqual(recovered.get_warehouse_dicts(),
+                         network.get_warehouse_dicts())
+        log.close()
+
+    def test_checkpoint_replays_only_tail(self):
+        log = AllocationLog(self.path, make_warehouse_dicts(),
+                            durability="sync", checkpoint_records=30)
+        network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+        place_orders(network, 4, 100)
+        snapshots = get_sequence_files(self.path, "snapshot-")
+        segments = get_sequence_files(self.path, "segment-")
+        self.assertEqual(len(snapshots), 1)
+        self.assertGreater(snapshots[0][0], 0)
+        # Segments from before the snapshot are removed
+        self.assertEqual([sequence for sequence, _ in segments],
+                         [snapshots[0][0]])
+        self.assertLess(log.get_next_sequence() - snapshots[0][0], 30)
+        _, recovered = self.recover()
+        self.assertEqual(recovered.get_warehouse_dicts(),
+                         self.get_expected_stock(4, 100))
+        # Locations are kept in snapshots
+        self.assertEqual(
+            recovered.get_nearest_warehouses([7, -7]).sort(
+                recovered.get_warehouse_list())[0].get_name(), "wh-7")
+
+    def test_torn_record_cut_off(self):
+        log = AllocationLog(self.path, make_warehouse_dicts(),
+                            durability="sync")
+        network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+        place_orders(network, 5, 40)
+        expected = network.get_warehouse_dicts()
+        segment_path = get_sequence_files(self.path, "segment-")[-1][1]
+        with open(segment_path, "ab") as segment_file:
+            segment_file.write(b'[{"wh-1":{"sku-1":')
+        log, recovered = self.recover(durability="sync")
+        self.assertEqual(recovered.get_warehouse_dicts(), expected)
+        # Records appended after recovery follow the cut off record
+        recovered.adjust_stock("wh-1", "sku-1", 3)
+        _, recovered_again = self.recover()
+        self.assertEqual(recovered_again.get_warehouse_dicts(),
+                         recovered.get_warehouse_dicts())
+
+    def test_new_segment_directory_synced(self):
+        synced = []
+
+        def sync_directory(directory):
+            segments = get_sequence_files(directory, "segment-")
+            synced.append(segments[-1][0] if segments else None)
+
+        with mock.patch.object(allocation_log, "sync_directory",
+                               sync_directory):
+            log = AllocationLog(self.path, make_warehouse_dicts(),
+                                durability="sync")
+            network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+            place_orders(network, 7, 5)
+            log.close()
+            sequence = log.get_next_sequence()
+            synced.clear()
+            AllocationLog(self.path, durability="sync").close()
+        # The segment recovery starts is synced once it exists
+        self.assertEqual(synced, [sequence])
+
+    def test_corrupt_record_rejected(self):
+        log = AllocationLog(self.path, make_warehouse_dicts(),
+                            durability="sync")
+        network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+        place_orders(network, 6, 10)
+        segment_path = get_sequence_files(self.path, "segment-")[-1][1]
+        with open(segment_path, "r+b") as segment_file:
+            segment_file.write(b"!")
+        with self.assertRaises(ValueError):
+            AllocationLog(self.path)
+
+    def test_concurrent_orders_recovered(self):
+        log = AllocationLog(self.path, make_warehouse_dicts(),
+                            durability="sync", checkpoint_records=50)
+        network = WarehouseNetwork(log.get_warehouse_dicts(),
+                                   thread_safe=True, log=log)
+        threads = [threading.Thread(target=place_orders,
+                                    args=(network, seed, 100))
+                   for seed in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        _, recovered = self.recover()
+        self.assertEqual(recovered.get_warehouse_dicts(),
+                         network.get_warehouse_dicts())
+
+    def test_process_crash_replay(self):
+        for count in (7, 60):
+            with self.subTest(count=count):
+                path = os.path.join(self.path, str(count))
+                result = subprocess.run(
+                    [sys.executable, "-c", CRASH_SCRIPT, path, str(count)],
+                    cwd=os.path.dirname(os.path.dirname(
+                        os.path.abspath(__file__))))
+                self.assertEqual(result.returncode, 1)
+                log = AllocationLog(path)
+                self.assertEqual(
+                    WarehouseNetwork(
+                        log.get_warehouse_dicts()).get_warehouse_dicts(),
+                    self.get_expected_stock(3, count))
+                log.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
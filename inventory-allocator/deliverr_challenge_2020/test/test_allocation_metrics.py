@@ -0,0 +1,172 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from src.allocation_metrics import (InMemorySink, format_prometheus,
+                                    write_prometheus)
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+
+
+class TestAllocationMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.warehouses = [
+            {"name": "owd", "inventory": {"apple": 5, "pear": 1}},
+            {"name": "dm", "inventory": {"apple": 5, "kiwi": 2}},
+            {"name": "bobs", "inventory": {"apple": 10}},
+        ]
+        self.sink = InMemorySink()
+        self.allocator = InventoryAllocator(
+            WarehouseNetwork(self.warehouses), metrics=self.sink)
+
+    def test_line_outcomes_counted(self):
+        self.allocator.allocate_inventory({"apple": 8, "pear": 1})
+        self.allocator.allocate_inventory({"apple": 9, "kiwi": 3})
+        self.assertEqual(self.sink.get_counters(), {
+            "orders": 2, "lines_single_warehouse": 2, "lines_split": 1,
+            "lines_rejected": 1,
+        })
+
+    def test_warehouses_probed(self):
+        # bobs ships all the apples after probing owd and dm
+        self.allocator.allocate_inventory({"apple": 8})
+        # Every warehouse is probed before splitting
+        self.allocator.allocate_inventory({"apple": 6})
+        # Rejected from the network's totals without probing
+        self.allocator.allocate_inventory({"mango": 1})
+        # owd ships and is emptied, leaving the index
+        self.allocator.allocate_inventory({"pear": 1})
+        histogram = self.sink.get_histogram("warehouses_probed")
+        self.assertEqual((histogram["count"], histogram["sum"]), (4, 7))
+        self.assertEqual(histogram["buckets"][:4],
+                         [(0, 1), (1, 2), (2, 2), (5, 4)])
+
+    def test_phase_timings_recorded(self):
+        self.allocator.allocate_batch([{"apple": 8}, {"apple": 9},
+                                       {"pear": 1}])
+        self.assertEqual(self.sink.get_histogram("order_seconds")["count"],
+                         3)
+        self.assertEqual(self.sink.get_histogram("probe_seconds")["count"],
+                         3)
+        self.assertEqual(self.sink.get_histogram("split_seconds")["count"],
+                         1)
+        InventoryAllocator(metrics=self.sink).allocate_inventory(
+            {"apple": 1}, self.warehouses)
+        self.assertEqual(
+            self.sink.get_histogram("network_build_seconds")["count"], 1)
+
+    def test_batch_candidates_shared(self):
+        network = WarehouseNetwork(self.warehouses)
+        allocator = InventoryAllocator(network, metrics=self.sink)
+        with mock.patch.object(network, "get_warehouses",
+                               wraps=network.get_warehouses) as lookup:
+            allocator.allocate_batch([{"apple": 2}, {"apple": 3},
+                                      {"apple": 4}])
+        # Each item is looked up once per batch, as without a sink
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_rejected_orders_counted(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses),
+                                       all_or_nothing=True, metrics=self.sink)
+        self.assertEqual(allocator.allocate_inventory({"apple": 1,
+                                                       "kiwi": 3}), [])
+        self.assertEqual(self.sink.get_counters(),
+                         {"orders": 1, "orders_rejected": 1})
+
+    def test_shipments_unchanged(self):
+        rng = random.Random(5)
+        items = ["sku-%d" % item_id for item_id in range(20)]
+        warehouses = [
+            {"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(0, 6)
+                           for item in rng.sample(items, 8)}}
+            for warehouse_id in range(15)
+        ]
+        orders = [{item: rng.randint(1, 8) for item in rng.sample(items, 3)}
+                  for _ in range(200)]
+        expected_result = InventoryAllocator(
+            WarehouseNetwork(warehouses)).allocate_batch(orders)
+        allocation = InventoryAllocator(
+            WarehouseNetwork(warehouses),
+            metrics=InMemorySink()).allocate_batch(orders)
+        self.assertEqual(allocation, expected_result)
+
+    def test_nearest_first_measured(self):
+        warehouses = [dict(inp_warehouse, location=[0, longitude])
+                      for inp_warehouse, longitude
+                      in zip(self.warehouses, [3, 2, 1])]
+        allocator = InventoryAllocator(WarehouseNetwork(warehouses),
+                                       metrics=self.sink)
+        # bobs is nearest and ships all the apples
+        self.assertEqual(allocator.allocate_inventory({"apple": 8},
+                                                      destination=[0, 0]),
+                         [{"bobs": {"apple": 8}}])
+        # The search stops once bobs and dm hold enough to split
+        allocator.allocate_inventory({"apple": 6}, destination=[0, 0])
+        allocator.allocate_inventory({"mango": 1}, destination=[0, 0])
+        self.assertEqual(self.sink.get_counters(), {
+            "orders": 3, "lines_single_warehouse": 1, "lines_split": 1,
+            "lines_rejected": 1,
+        })
+        histogram = self.sink.get_histogram("warehouses_probed")
+        self.assertEqual((histogram["count"], histogram["sum"]), (3, 3))
+        self.assertEqual(self.sink.get_histogram("probe_seconds")["count"],
+                         2)
+        self.assertEqual(self.sink.get_histogram("split_seconds")["count"],
+                         1)
+
+    def test_nearest_first_shipments_unchanged(self):
+        rng = random.Random(6)
+        items = ["sku-%d" % item_id for item_id in range(10)]
+        # Enough warehouses that popular items are searched for outwards
+        warehouses = [
+            {"name": "wh-%d" % warehouse_id,
+             "location": [rng.uniform(-60, 60), rng.uniform(-180, 180)],
+             "inventory": {item: rng.randint(0, 6)
+                           for item in rng.sample(items, 8)}}
+            for warehouse_id in range(40)
+        ]
+        orders = [{item: rng.randint(1, 12) for item in rng.sample(items, 3)}
+                  for _ in range(200)]
+        destinations = [[rng.uniform(-60, 60), rng.uniform(-180, 180)]
+                        for _ in orders]
+        expected_result = InventoryAllocator(
+            WarehouseNetwork(warehouses)).allocate_batch(
+                orders, destinations=destinations)
+        allocation = InventoryAllocator(
+            WarehouseNetwork(warehouses), metrics=self.sink).allocate_batch(
+                orders, destinations=destinations)
+        self.assertEqual(allocation, expected_result)
+        self.assertEqual(
+            self.sink.get_histogram("warehouses_probed")["count"],
+            sum(1 for order in orders for quantity in order.values()
+                if quantity))
+
+    def test_prometheus_text(self):
+        self.allocator.allocate_inventory({"apple": 8})
+        text = format_prometheus(self.sink)
+        self.assertIn("# TYPE inventory_allocator_orders_total counter\n"
+                      "inventory_allocator_orders_total 1\n", text)
+        self.assertIn("# TYPE inventory_allocator_warehouses_probed "
+                      "histogram\n", text)
+        self.assertIn('inventory_allocator_warehouses_probed_bucket'
+                      '{le="2"} 0\n', text)
+        self.assertIn('inventory_allocator_warehouses_probed_bucket'
+                      '{le="+Inf"} 1\n', text)
+        self.assertIn("inventory_allocator_warehouses_probed_sum 3\n", text)
+
+    def test_write_prometheus(self):
+        self.allocator.allocate_inventory({"apple": 8})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "allocator.prom")
+            write_prometheus(self.sink, path)
+            with open(path) as metrics_file:
+                self.assertEqual(metrics_file.read(),
+                                 format_prometheus(self.sink))
+            self.assertEqual(os.listdir(directory), ["allocator.prom"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+from unittest import mock
+from src.allocation_service import AllocationService
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+
+
+class FailingAllocator(InventoryAllocator):
+    """InventoryAllocator failing to allocate any order with a mango"""
+
+    def allocate_batch(self, orders, warehouse_dicts=None):
+        if any("mango" in order for order in orders):
+            raise RuntimeError("mangoes can't be allocated")
+        return super().allocate_batch(orders, warehouse_dicts)
+
+
+class TestAllocationService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.warehouses = [
+            {"name": "owd", "inventory": {"apple": 5, "pear": 2}},
+            {"name": "dm", "inventory": {"apple": 5, "kiwi": 3}},
+        ]
+        self.orders = [{"apple": 3}, {"apple": 3, "kiwi": 1}, {"pear": 3},
+                       {"apple": 3}, {"kiwi": 2, "pear": 2}, {"apple": 2}]
+
+    async def test_matches_sequential_allocation(self):
+        expected_result = InventoryAllocator(
+            WarehouseNetwork(self.warehouses)).allocate_batch(self.orders)
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses))
+        loop = asyncio.get_running_loop()
+
+        with mock.patch.object(loop, "run_in_executor",
+                               wraps=loop.run_in_executor) as run:
+            async with AllocationService(allocator,
+                                         max_batch_size=4) as service:
+                allocation = await asyncio.gather(
+                    *[service.allocate(order) for order in self.orders])
+        self.assertEqual(allocation, expected_result)
+        # One job on the worker thread for each batch
+        self.assertEqual([len(call.args[2]) for call in run.call_args_list],
+                         [4, 2])
+
+    async def test_batch_closes_after_delay(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses))
+        loop = asyncio.get_running_loop()
+
+        with mock.patch.object(loop, "run_in_executor",
+                               wraps=loop.run_in_executor) as run:
+            async with AllocationService(allocator, max_batch_size=100,
+                                         max_batch_delay_ms=1) as service:
+                first = await service.allocate({"apple": 1})
+                second = await service.allocate({"apple": 1})
+        self.assertEqual(first, [{"owd": {"apple": 1}}])
+        self.assertEqual(second, [{"owd": {"apple": 1}}])
+        self.assertEqual([len(call.args[2]) for call in run.call_args_list],
+                         [1, 1])
+
+    async def test_stop_allocates_queued_orders(self):
+        service = AllocationService(
+            InventoryAllocator(WarehouseNetwork(self.warehouses)),
+            max_batch_delay_ms=1000)
+        await service.start()
+        pending = asyncio.ensure_future(service.allocate({"kiwi": 1}))
+        await asyncio.sleep(0)
+        await service.stop()
+        self.assertEqual(await pending, [{"dm": {"kiwi": 1}}])
+
+    async def test_bad_order_fails_alone(self):
+        network = WarehouseNetwork(self.warehouses)
+        async with AllocationService(InventoryAllocator(network),
+                                     max_batch_delay_ms=50) as service:
+            results = await asyncio.gather(
+                service.allocate({"apple": 5}),
+                service.allocate({"pear": "x"}),
+                service.allocate({"kiwi": -1}), service.allocate(["kiwi"]),
+                service.allocate({"kiwi": 2}), return_exceptions=True)
+        self.assertEqual(results[0], [{"owd": {"apple": 5}}])
+        self.assertIsInstance(results[1], TypeError)
+        self.assertIsInstance(results[2], ValueError)
+        self.assertIsInstance(results[3], TypeError)
+        self.assertEqual(results[4], [{"dm": {"kiwi": 2}}])
+        self.assertEqual(network.get_total_quantity("apple"), 5)
+
+    async def test_allocation_error_fails_alone(self):
+        network = WarehouseNetwork(self.warehouses)
+        async with AllocationService(FailingAllocator(network),
+                                     max_batch_delay_ms=50) as service:
+            results = await asyncio.gather(
+                service.allocate({"apple": 5}),
+                service.allocate({"mango": 1, "kiwi": 1}),
+                service.allocate({"apple": 5}), return_exceptions=True)
+        self.assertEqual(results[0], [{"owd": {"apple": 5}}])
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(results[2], [{"dm": {"apple": 5}}])
+        self.assertEqual(network.get_total_quantity("apple"), 0)
+        self.assertEqual(network.get_total_quantity("kiwi"), 3)
+
+    async def test_errors_reach_every_caller(self):
+        async with AllocationService(InventoryAllocator()) as service:
+            results = await asyncio.gather(service.allocate({"apple": 1}),
+                                           service.allocate({"pear": 1}),
+                                           return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError)
+                            for result in results))
+
+    async def test_not_running(self):
+        service = AllocationService(InventoryAllocator())
+        with self.assertRaises(RuntimeError):
+            await service.allocate({"apple": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
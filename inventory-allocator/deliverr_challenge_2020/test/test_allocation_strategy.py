@@ -0,0 +1,123 @@
+import random
+import unittest
+from src.allocation_strategy import MinimumCostStrategy, plan_greedily
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+
+
+class TestPlanGreedily(unittest.TestCase):
+
+    def test_matches_inventory_allocator(self):
+        rng = random.Random(5)
+        items = ["sku-%d" % item_id for item_id in range(20)]
+        warehouses = [
+            {"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(0, 8)
+                           for item in rng.sample(items, 8)}}
+            for warehouse_id in range(10)
+        ]
+        network = WarehouseNetwork(warehouses)
+        for _ in range(50):
+            order = {item: rng.randint(0, 20) for item in rng.sample(items, 4)}
+            plan = plan_greedily(network, order)
+            expected_result = InventoryAllocator().allocate_inventory(
+                order, warehouses)
+            self.assertEqual(
+                [{warehouse.get_name(): items}
+                 for warehouse, items in sorted(plan.items(),
+                                                key=lambda entry:
+                                                network.get_rank(entry[0]))],
+                expected_result)
+
+
+class TestMinimumCostStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.warehouses = [
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"pear": 5}},
+            {"name": "bobs", "inventory": {"apple": 5, "pear": 5}},
+        ]
+
+    def test_fewest_warehouses(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses),
+                                       MinimumCostStrategy())
+        self.assertEqual(allocator.allocate_inventory({"apple": 2,
+                                                       "pear": 2}),
+                         [{"bobs": {"apple": 2, "pear": 2}}])
+
+    def test_greedy_within_chosen_warehouses(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses),
+                                       MinimumCostStrategy())
+        self.assertEqual(allocator.allocate_inventory({"apple": 8,
+                                                       "pear": 2}),
+                         [{"owd": {"apple": 5}},
+                          {"bobs": {"apple": 3, "pear": 2}}])
+
+    def test_weighted_costs(self):
+        strategy = MinimumCostStrategy({"bobs": 5.0})
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses),
+                                       strategy)
+        self.assertEqual(allocator.allocate_inventory({"apple": 2,
+                                                       "pear": 2}),
+                         [{"owd": {"apple": 2}}, {"dm": {"pear": 2}}])
+        self.assertEqual(allocator.allocate_inventory({"pear": 1}),
+                         [{"dm": {"pear": 1}}])
+
+    def test_expensive_single_warehouse_replaced(self):
+        strategy = MinimumCostStrategy({"owd": 10.0})
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses),
+                                       strategy)
+        self.assertEqual(allocator.allocate_inventory({"apple": 2}),
+                         [{"bobs": {"apple": 2}}])
+
+    def test_unfillable_item_skipped(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses),
+                                       MinimumCostStrategy())
+        self.assertEqual(allocator.allocate_inventory({"apple": 2,
+                                                       "pear": 2,
+                                                       "kiwi": 1,
+                                                       "fig": 0}),
+                         [{"bobs": {"apple": 2, "pear": 2}}])
+        self.assertEqual(allocator.allocate_inventory({"kiwi": 1}), [])
+
+    def test_no_time_falls_back_to_greedy(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouses),
+                                       MinimumCostStrategy(time_budget_ms=0))
+        self.assertEqual(allocator.allocate_inventory({"apple": 2,
+                                                       "pear": 2}),
+                         [{"owd": {"apple": 2}}, {"dm": {"pear": 2}}])
+
+    def test_never_more_warehouses_than_greedy(self):
+        rng = random.Random(11)
+        items = ["sku-%d" % item_id for item_id in range(15)]
+        warehouses = [
+            {"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(1, 6)
+                           for item in rng.sample(items, 6)}}
+            for warehouse_id in range(12)
+        ]
+        strategy = MinimumCostStrategy(time_budget_ms=1000)
+
+        def shipped_quantities(shipment):
+            totals = {}
+            for warehouse_shipment in shipment:
+                for items in warehouse_shipment.values():
+                    for item, quantity in items.items():
+                        totals[item] = totals.get(item, 0) + quantity
+            return totals
+
+        for _ in range(30):
+            order = {item: rng.randint(1, 8) for item in rng.sample(items, 4)}
+            greedy_shipment = InventoryAllocator(
+                WarehouseNetwork(warehouses)).allocate_inventory(order)
+            optimal_shipment = InventoryAllocator(
+                WarehouseNetwork(warehouses), strategy).allocate_inventory(
+                    order)
+            self.assertLessEqual(len(optimal_shipment), len(greedy_shipment))
+            self.assertEqual(shipped_quantities(optimal_shipment),
+                             shipped_quantities(greedy_shipment))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import unittest
+from src.columnar_inventory import ColumnarInventory, numpy
+from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestColumnarInventory(unittest.TestCase):
+
+    def test_single_warehouse(self):
+        inventory = ColumnarInventory([
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"apple": 10}},
+        ])
+        self.assertEqual(inventory.allocate_inventory({"apple": 8}),
+                         [{"dm": {"apple": 8}}])
+        self.assertEqual(inventory.get_quantity("dm", "apple"), 2)
+
+    def test_split_across_warehouses(self):
+        inventory = ColumnarInventory([
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"apple": 0, "pear": 1}},
+            {"name": "bobs", "inventory": {"apple": 5}},
+        ])
+        self.assertEqual(inventory.allocate_inventory({"apple": 7}),
+                         [{"owd": {"apple": 5}}, {"bobs": {"apple": 2}}])
+        self.assertEqual(inventory.get_quantity("owd", "apple"), 0)
+        self.assertEqual(inventory.get_quantity("bobs", "apple"), 3)
+
+    def test_not_enough_inventory(self):
+        inventory = ColumnarInventory([
+            {"name": "owd", "inventory": {"apple": 1}},
+            {"name": "dm", "inventory": {"apple": 1}},
+        ])
+        self.assertEqual(inventory.allocate_inventory({"apple": 3,
+                                                       "kiwi": 1}), [])
+        self.assertEqual(inventory.get_quantity("owd", "apple"), 1)
+
+    def test_empty_network(self):
+        inventory = ColumnarInventory([])
+        self.assertEqual(inventory.allocate_inventory({"apple": 1}), [])
+        self.assertEqual(inventory.get_quantity("owd", "apple"), 0)
+
+    def test_quantity_too_large(self):
+        with self.assertRaises(ValueError):
+            ColumnarInventory([{"name": "owd",
+                                "inventory": {"apple": 2 ** 31}}])
+        inventory = ColumnarInventory([{"name": "owd",
+                                        "inventory": {"apple": 2 ** 31 - 1}}])
+        self.assertEqual(inventory.get_quantity("owd", "apple"), 2 ** 31 - 1)
+
+    def test_matches_inventory_allocator(self):
+        rng = random.Random(7)
+        items = ["sku-%d" % item_id for item_id in range(30)]
+        warehouses = [
+            {"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(0, 8)
+                           for item in rng.sample(items, 10)}}
+            for warehouse_id in range(20)
+        ]
+        orders = [{item: rng.randint(0, 25) for item in rng.sample(items, 4)}
+                  for _ in range(300)]
+        expected_result = InventoryAllocator(
+            WarehouseNetwork(warehouses)).allocate_batch(orders)
+
+        allocation = ColumnarInventory(warehouses).allocate_batch(orders)
+        self.assertEqual(allocation, expected_result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,10 @@
+import random
+import sys
+import threading
 import unittest
+from src.allocation_strategy import MinimumCostStrategy
 from src.inventory_allocator import InventoryAllocator
+from src.warehouse_network import WarehouseNetwork
 
 
 class TestInventoryAllocator(unittest.TestCase):
@@ -289,6 +294,303 @@ class TestInventoryAllocator(unittest.TestCase):
         allocation = InventoryAllocator().allocate_inventory(order, warehouses)
         self.assertEqual(allocation, [])
 
+    ############## Test cases allocating against a persistent network ###########
+    def test_orders_deplete_shared_network(self):
+        network = WarehouseNetwork([
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"apple": 5}},
+        ])
+        allocator = InventoryAllocator(network)
+
+        self.assertEqual(allocator.allocate_inventory({"apple": 4}),
+                         [{"owd": {"apple": 4}}])
+        self.assertEqual(allocator.allocate_inventory({"apple": 4}),
+                         [{"dm": {"apple": 4}}])
+        self.assertEqual(allocator.allocate_inventory({"apple": 2}),
+                         [{"owd": {"apple": 1}}, {"dm": {"apple": 1}}])
+        self.assertEqual(allocator.allocate_inventory({"apple": 1}), [])
+
+    def test_stock_delta_between_orders(self):
+        network = WarehouseNetwork([
+            {"name": "owd", "inventory": {"apple": 1}},
+            {"name": "dm", "inventory": {}},
+        ])
+        allocator = InventoryAllocator(network)
+
+        self.assertEqual(allocator.allocate_inventory({"apple": 1}),
+                         [{"owd": {"apple": 1}}])
+        network.adjust_stock("dm", "apple", 3)
+        self.assertEqual(allocator.allocate_inventory({"apple": 2}),
+                         [{"dm": {"apple": 2}}])
+
+    def test_reused_allocator_does_not_accumulate_warehouses(self):
+        allocator = InventoryAllocator()
+        order = {"apple": 2}
+
+        allocator.allocate_inventory(
+            order, [{"name": "owd", "inventory": {"apple": 1}}])
+        allocation = allocator.allocate_inventory(
+            order, [{"name": "dm", "inventory": {"apple": 1}}])
+        self.assertEqual(allocation, [])
+
+    def test_caller_inventory_not_modified(self):
+        warehouses = [{"name": "owd", "inventory": {"apple": 5, "pear": 1}},
+                      {"name": "dm", "inventory": {"apple": 5}}]
+        allocator = InventoryAllocator(WarehouseNetwork(warehouses))
+
+        allocator.allocate_inventory({"apple": 7, "pear": 1})
+        allocator.allocate_inventory({"apple": 7}, warehouses)
+        self.assertEqual(warehouses,
+                         [{"name": "owd", "inventory": {"apple": 5, "pear": 1}},
+                          {"name": "dm", "inventory": {"apple": 5}}])
+
+    def test_no_warehouses_or_network(self):
+        with self.assertRaises(ValueError):
+            InventoryAllocator().allocate_inventory({"apple": 1})
+
+    ############## Test cases allocating a batch of orders ######################
+    def test_batch_matches_sequential_allocation(self):
+        warehouses = [
+            {"name": "owd", "inventory": {"apple": 5, "pear": 2}},
+            {"name": "dm", "inventory": {"apple": 3, "kiwi": 4}},
+            {"name": "bobs", "inventory": {"pear": 6, "kiwi": 1}},
+        ]
+        orders = [{"apple": 4}, {"apple": 2, "pear": 3}, {"kiwi": 5},
+                  {"apple": 3, "pear": 1}, {}, {"pear": 9, "apple": 0}]
+        sequential_allocator = InventoryAllocator(
+            WarehouseNetwork(warehouses))
+        expected_result = [sequential_allocator.allocate_inventory(order)
+                           for order in orders]
+
+        allocation = InventoryAllocator(
+            WarehouseNetwork(warehouses)).allocate_batch(orders)
+        self.assertEqual(allocation, expected_result)
+        self.assertEqual(allocation[2], [{"dm": {"kiwi": 4}},
+                                         {"bobs": {"kiwi": 1}}])
+
+    def test_batch_with_warehouse_dicts(self):
+        orders = [{"apple": 1}, {"apple": 1}]
+        warehouses = [{"name": "owd", "inventory": {"apple": 1}}]
+
+        allocation = InventoryAllocator().allocate_batch(orders, warehouses)
+        self.assertEqual(allocation, [[{"owd": {"apple": 1}}], []])
+
+    def test_empty_batch(self):
+        network = WarehouseNetwork([{"name": "owd", "inventory": {}}])
+        self.assertEqual(InventoryAllocator(network).allocate_batch([]), [])
+
+    ############## Test cases shipping orders all or nothing ####################
+    def test_all_or_nothing_rejects_without_touching_stock(self):
+        network = WarehouseNetwork([
+            {"name": "owd", "inventory": {"apple": 5, "pear": 1}},
+            {"name": "dm", "inventory": {"apple": 5}},
+        ])
+        allocator = InventoryAllocator(network, all_or_nothing=True)
+
+        self.assertEqual(allocator.allocate_inventory({"apple": 7,
+                                                       "pear": 2}), [])
+        self.assertEqual(network.get_quantity("owd", "apple"), 5)
+        self.assertEqual(network.get_total_quantity("apple"), 10)
+        self.assertEqual(allocator.allocate_inventory({"apple": 7,
+                                                       "pear": 1,
+                                                       "kiwi": 0}),
+                         [{"owd": {"apple": 5, "pear": 1}},
+                          {"dm": {"apple": 2}}])
+        self.assertEqual(allocator.allocate_inventory({"apple": 4}), [])
+        self.assertEqual(network.get_total_quantity("apple"), 3)
+
+    def test_partial_orders_shipped_by_default(self):
+        network = WarehouseNetwork([
+            {"name": "owd", "inventory": {"apple": 5}},
+        ])
+        self.assertEqual(InventoryAllocator(network).allocate_inventory(
+            {"apple": 2, "pear": 1}), [{"owd": {"apple": 2}}])
+
+    def test_totals_match_stock_after_orders(self):
+        rng = random.Random(11)
+        items = ["sku-%d" % item_id for item_id in range(20)]
+        network = WarehouseNetwork([
+            {"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(0, 5)
+                           for item in rng.sample(items, 8)}}
+            for warehouse_id in range(15)
+        ])
+        allocator = InventoryAllocator(network, all_or_nothing=True)
+        for _ in range(300):
+            allocator.allocate_inventory(
+                {item: rng.randint(1, 6) for item in rng.sample(items, 3)})
+            network.adjust_stock("wh-%d" % rng.randrange(15),
+                                 rng.choice(items), rng.randint(0, 2))
+        for item in items:
+            self.assertEqual(
+                network.get_total_quantity(item),
+                sum(warehouse.get_quantity(item)
+                    for warehouse in network.get_warehouse_list()))
+
+    ############## Test cases preferring warehouses near a destination ########
+    # Warehouses along the equator, one degree of longitude apart
+    LOCATED_WAREHOUSES = [
+        {"name": "west", "location": [0, -2],
+         "inventory": {"apple": 5, "pear": 1}},
+        {"name": "middle", "location": [0, 0], "inventory": {"apple": 2}},
+        {"name": "east", "location": [0, 2],
+         "inventory": {"apple": 5, "pear": 1}},
+        {"name": "unlocated", "inventory": {"apple": 9, "pear": 9}},
+    ]
+
+    def test_nearest_single_warehouse_preferred(self):
+        allocator = InventoryAllocator(
+            WarehouseNetwork(self.LOCATED_WAREHOUSES))
+        self.assertEqual(allocator.allocate_inventory(
+            {"apple": 4}, destination=[0, 1.5]), [{"east": {"apple": 4}}])
+        self.assertEqual(allocator.allocate_inventory(
+            {"apple": 4}, destination=[0, -1.5]), [{"west": {"apple": 4}}])
+        # Without a destination warehouses are ranked by priority
+        self.assertEqual(allocator.allocate_inventory({"apple": 1}),
+                         [{"west": {"apple": 1}}])
+
+    def test_split_nearest_first(self):
+        allocator = InventoryAllocator(
+            WarehouseNetwork(self.LOCATED_WAREHOUSES))
+        self.assertEqual(
+            allocator.allocate_inventory({"apple": 12, "pear": 2},
+                                         destination=[1, 0.5]),
+            [{"middle": {"apple": 2}}, {"east": {"apple": 5}},
+             {"west": {"apple": 5}}, {"unlocated": {"pear": 2}}])
+
+    def test_unlocated_warehouses_last(self):
+        allocator = InventoryAllocator(
+            WarehouseNetwork(self.LOCATED_WAREHOUSES))
+        self.assertEqual(
+            allocator.allocate_inventory({"pear": 5}, destination=[0, 0]),
+            [{"unlocated": {"pear": 5}}])
+        self.assertEqual(
+            allocator.allocate_inventory({"apple": 20}, destination=[0, 0]),
+            [{"middle": {"apple": 2}}, {"west": {"apple": 5}},
+             {"east": {"apple": 5}}, {"unlocated": {"apple": 8}}])
+
+    def test_batch_destinations(self):
+        allocator = InventoryAllocator(
+            WarehouseNetwork(self.LOCATED_WAREHOUSES))
+        self.assertEqual(
+            allocator.allocate_batch([{"apple": 1}] * 3,
+                                     destinations=[[0, 2], None, [0, 0]]),
+            [[{"east": {"apple": 1}}], [{"west": {"apple": 1}}],
+             [{"middle": {"apple": 1}}]])
+
+    def test_batch_destinations_match_orders(self):
+        network = WarehouseNetwork(self.LOCATED_WAREHOUSES)
+        allocator = InventoryAllocator(network)
+        total = network.get_total_quantity("apple")
+        for destinations in ([[0, 2]], [[0, 2], None, [0, 0], None]):
+            with self.assertRaises(ValueError):
+                allocator.allocate_batch([{"apple": 1}] * 3,
+                                         destinations=destinations)
+        self.assertEqual(network.get_total_quantity("apple"), total)
+
+    def test_destination_needs_greedy_allocation(self):
+        allocator = InventoryAllocator(
+            WarehouseNetwork(self.LOCATED_WAREHOUSES),
+            strategy=MinimumCostStrategy())
+        with self.assertRaises(ValueError):
+            allocator.allocate_inventory({"apple": 1}, destination=[0, 0])
+
+    def test_nearest_first_matches_sorting_every_warehouse(self):
+        rng = random.Random(5)
+        items = ["sku-%d" % item_id for item_id in range(6)]
+        warehouse_dicts = [
+            {"name": "wh-%d" % warehouse_id,
+             "location": [rng.uniform(-60, 60), rng.uniform(-180, 180)],
+             "inventory": {item: rng.randint(1, 4)
+                           # Stocked by few or by most warehouses, so both
+                           # sorting and searching outwards are used
+                           for item in items if rng.random()
+                           < (0.05 if item < "sku-3" else 0.8)}}
+            for warehouse_id in range(200)
+        ]
+        network = WarehouseNetwork(warehouse_dicts)
+        expected_stock = {(warehouse["name"], item): quantity
+                          for warehouse in warehouse_dicts
+                          for item, quantity in warehouse["inventory"].items()}
+        allocator = InventoryAllocator(network)
+        for _ in range(300):
+            destination = [rng.uniform(-60, 60), rng.uniform(-180, 180)]
+            order = {item: rng.randint(1, 8) for item in rng.sample(items, 3)}
+            ranking = network.get_nearest_warehouses(destination)
+            by_distance = sorted(warehouse_dicts, key=lambda warehouse:
+                                 ranking.get_sort_key(
+                                     network.get_warehouse(warehouse["name"])))
+            # Nearest warehouse that can ship all of each item, otherwise
+            # nearest first across warehouses if there is enough
+            expected = {}
+            for item, quantity in order.items():
+                stock = [(warehouse["name"],
+                          expected_stock.get((warehouse["name"], item), 0))
+                         for warehouse in by_distance]
+                if sum(in_stock for _, in_stock in stock) < quantity:
+                    continue
+                single = [name for name, in_stock in stock
+                          if in_stock >= quantity]
+                takes = ([(single[0], quantity)] if single else [])
+                quantity_left = quantity
+                for name, in_stock in ([] if single else stock):
+                    if in_stock and quantity_left > 0:
+                        takes.append((name, min(in_stock, quantity_left)))
+                        quantity_left -= takes[-1][1]
+                for name, taken in takes:
+                    expected.setdefault(name, {})[item] = taken
+                    expected_stock[(name, item)] -= taken
+            expected_shipment = [
+                {warehouse["name"]: expected[warehouse["name"]]}
+                for warehouse in by_distance if warehouse["name"] in expected]
+            self.assertEqual(
+                allocator.allocate_inventory(order, destination=destination),
+                expected_shipment)
+
+    ############## Test cases allocating from many threads ######################
+    def test_concurrent_orders_never_oversell(self):
+        items = ["sku-%d" % item_id for item_id in range(8)]
+        warehouses = [{"name": "wh-%d" % warehouse_id,
+                       "inventory": {item: 2000 for item in items}}
+                      for warehouse_id in range(4)]
+        network = WarehouseNetwork(warehouses, thread_safe=True)
+        shipped = [0] * 8
+        received = [0] * 8
+
+        def place_orders(thread_id):
+            rng = random.Random(thread_id)
+            allocator = InventoryAllocator(network)
+            for _ in range(1000):
+                order = {item: rng.randint(1, 6)
+                         for item in rng.sample(items, 3)}
+                for warehouse_shipment in allocator.allocate_inventory(order):
+                    for items_shipped in warehouse_shipment.values():
+                        shipped[thread_id] += sum(items_shipped.values())
+                if rng.random() < 0.1:
+                    network.adjust_stock(rng.choice(warehouses)["name"],
+                                         rng.choice(items), 2)
+                    received[thread_id] += 2
+
+        # Switch threads as often as possible to provoke races
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            threads = [threading.Thread(target=place_orders,
+                                        args=(thread_id,))
+                       for thread_id in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        # Every unit received is either shipped exactly once or still in stock
+        remaining = sum(network.get_quantity(warehouse["name"], item)
+                        for warehouse in warehouses for item in items)
+        self.assertEqual(sum(shipped) + remaining,
+                         4 * 8 * 2000 + sum(received))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,157 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from src import inventory_snapshot
+from src.inventory_allocator import InventoryAllocator
+from src.inventory_snapshot import MappedInventory, write_snapshot
+from src.warehouse_network import WarehouseNetwork
+
+
+class TestInventorySnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "inventory.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_snapshot(self, warehouse_dicts):
+        write_snapshot(self.path, warehouse_dicts)
+        inventory = MappedInventory(self.path)
+        self.addCleanup(inventory.close)
+        return inventory
+
+    def test_single_warehouse(self):
+        inventory = self.open_snapshot([
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"apple": 10}},
+        ])
+        self.assertEqual(inventory.allocate_inventory({"apple": 8}),
+                         [{"dm": {"apple": 8}}])
+        self.assertEqual(inventory.get_quantity("dm", "apple"), 2)
+
+    def test_split_across_warehouses(self):
+        inventory = self.open_snapshot([
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"apple": 0, "pear": 1}},
+            {"name": "bobs", "inventory": {"apple": 5}},
+        ])
+        self.assertEqual(inventory.allocate_inventory({"apple": 7}),
+                         [{"owd": {"apple": 5}}, {"bobs": {"apple": 2}}])
+        self.assertEqual(inventory.get_quantity("owd", "apple"), 0)
+        self.assertEqual(inventory.get_quantity("bobs", "apple"), 3)
+
+    def test_not_enough_inventory(self):
+        inventory = self.open_snapshot([
+            {"name": "owd", "inventory": {"apple": 1}},
+            {"name": "dm", "inventory": {"apple": 1}},
+        ])
+        self.assertEqual(inventory.allocate_inventory({"apple": 3,
+                                                       "kiwi": 1}), [])
+        self.assertEqual(inventory.get_quantity("owd", "apple"), 1)
+        self.assertEqual(inventory.get_quantity("nowhere", "apple"), 0)
+
+    def test_empty_network(self):
+        inventory = self.open_snapshot([])
+        self.assertEqual(inventory.allocate_inventory({"apple": 1}), [])
+        self.assertEqual(inventory.get_warehouse_names(), [])
+
+    def test_unicode_names(self):
+        inventory = self.open_snapshot([
+            {"name": "entrepôt", "inventory": {"pomme": 2, "poire": 1}},
+        ])
+        self.assertEqual(inventory.allocate_inventory({"poire": 1}),
+                         [{"entrepôt": {"poire": 1}}])
+
+    def test_snapshot_file_not_rewritten(self):
+        inventory = self.open_snapshot([
+            {"name": "owd", "inventory": {"apple": 5}},
+        ])
+        with open(self.path, "rb") as snapshot_file:
+            before = snapshot_file.read()
+        inventory.allocate_inventory({"apple": 2})
+        with open(self.path, "rb") as snapshot_file:
+            self.assertEqual(snapshot_file.read(), before)
+        self.assertEqual(inventory.get_delta_count(), 1)
+
+    def test_compact_folds_deltas(self):
+        inventory = self.open_snapshot([
+            {"name": "owd", "inventory": {"apple": 5, "pear": 1}},
+            {"name": "dm", "inventory": {"apple": 5}},
+        ])
+        inventory.allocate_inventory({"apple": 6, "pear": 1})
+        size = os.path.getsize(self.path)
+        inventory.compact()
+        self.assertEqual(inventory.get_delta_count(), 0)
+        self.assertLess(os.path.getsize(self.path), size)
+        self.assertEqual(inventory.get_warehouse_names(), ["owd", "dm"])
+        self.assertEqual(inventory.get_quantity("dm", "apple"), 4)
+        self.assertEqual(inventory.get_quantity("owd", "pear"), 0)
+
+        with MappedInventory(self.path) as reopened:
+            self.assertEqual(reopened.allocate_inventory({"apple": 4}),
+                             [{"dm": {"apple": 4}}])
+
+    def test_compact_syncs_directory(self):
+        inventory = self.open_snapshot([
+            {"name": "owd", "inventory": {"apple": 5}},
+        ])
+        with mock.patch.object(inventory_snapshot, "sync_directory") as sync:
+            inventory.compact()
+        sync.assert_called_once_with(self.directory.name)
+        inventory.close()
+
+    def test_failed_compact_keeps_snapshot_open(self):
+        inventory = self.open_snapshot([
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"apple": 5}},
+        ])
+        inventory.allocate_inventory({"apple": 6})
+        with mock.patch.object(inventory_snapshot.os, "replace",
+                               side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                inventory.compact()
+        self.assertEqual(os.listdir(self.directory.name),
+                         ["inventory.snapshot"])
+        self.assertEqual(inventory.get_delta_count(), 2)
+        self.assertEqual(inventory.allocate_inventory({"apple": 4}),
+                         [{"dm": {"apple": 4}}])
+        inventory.close()
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"[]")
+        with self.assertRaises(ValueError):
+            MappedInventory(self.path)
+
+    def test_closed(self):
+        inventory = self.open_snapshot([])
+        inventory.close()
+        with self.assertRaises(ValueError):
+            inventory.allocate_inventory({"apple": 1})
+
+    def test_matches_inventory_allocator(self):
+        rng = random.Random(4)
+        items = ["sku-%d" % item_id for item_id in range(30)]
+        warehouse_dicts = [
+            {"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(0, 6)
+                           for item in rng.sample(items, 10)}}
+            for warehouse_id in range(20)
+        ]
+        orders = [{item: rng.randint(1, 8) for item in rng.sample(items, 4)}
+                  for _ in range(200)]
+        allocator = InventoryAllocator(WarehouseNetwork(warehouse_dicts))
+        inventory = self.open_snapshot(warehouse_dicts)
+        self.assertEqual(inventory.allocate_batch(orders[:100]),
+                         allocator.allocate_batch(orders[:100]))
+        inventory.compact()
+        self.assertEqual(inventory.allocate_batch(orders[100:]),
+                         allocator.allocate_batch(orders[100:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
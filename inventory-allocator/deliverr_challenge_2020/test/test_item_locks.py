@@ -0,0 +1,69 @@
+import threading
+import unittest
+from src.item_locks import ItemLockTable
+
+
+class TestItemLockTable(unittest.TestCase):
+
+    def test_disjoint_items_do_not_block(self):
+        locks = ItemLockTable()
+        acquired = threading.Event()
+
+        def hold_pear():
+            with locks.hold(["pear"]):
+                acquired.set()
+
+        with locks.hold(["apple", "kiwi"]):
+            thread = threading.Thread(target=hold_pear)
+            thread.start()
+            self.assertTrue(acquired.wait(timeout=5))
+        thread.join()
+
+    def test_shared_item_blocks(self):
+        locks = ItemLockTable()
+        acquired = threading.Event()
+
+        def hold_apple():
+            with locks.hold(["apple"]):
+                acquired.set()
+
+        with locks.hold(["kiwi", "apple", "apple"]):
+            thread = threading.Thread(target=hold_apple)
+            thread.start()
+            self.assertFalse(acquired.wait(timeout=0.1))
+        self.assertTrue(acquired.wait(timeout=5))
+        thread.join()
+
+    def test_locks_released_on_error(self):
+        locks = ItemLockTable()
+        with self.assertRaises(KeyError):
+            with locks.hold(["apple"]):
+                raise KeyError("apple")
+        with locks.hold(["apple"]):
+            pass
+
+    def test_hold_all_blocks_new_items(self):
+        locks = ItemLockTable()
+        with locks.hold(["apple"]):
+            pass
+        acquired = []
+
+        def hold_item(item):
+            with locks.hold([item]):
+                acquired.append(item)
+
+        with locks.hold_all():
+            threads = [threading.Thread(target=hold_item, args=(item,))
+                       for item in ("apple", "kiwi")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=0.1)
+            self.assertEqual(acquired, [])
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(acquired), ["apple", "kiwi"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.inventory_allocator import InventoryAllocator
+from src.pipeline import load_network, main, read_order_batches, run_pipeline
+from src.warehouse_network import WarehouseNetwork
+
+
+class FlushRecorder(io.BytesIO):
+
+    def __init__(self):
+        super().__init__()
+        self.flushed_lines = []
+
+    def flush(self):
+        super().flush()
+        self.flushed_lines.append(self.getvalue().count(b"\n"))
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.warehouse_dicts = [
+            {"name": "owd", "inventory": {"apple": 5, "orange": 10}},
+            {"name": "dm", "inventory": {"banana": 5, "orange": 10}},
+        ]
+        self.orders = [{"apple": 3}, {"apple": 3, "banana": 2},
+                       {"orange": 15}, {"kiwi": 1}]
+        self.order_lines = "".join(json.dumps(order) + "\n"
+                                   for order in self.orders).encode("utf-8")
+
+    def get_expected_shipments(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouse_dicts))
+        return allocator.allocate_batch(self.orders)
+
+    def run_pipeline(self, order_lines, batch_size=2):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouse_dicts))
+        output_stream = io.BytesIO()
+        num_orders = run_pipeline(allocator, io.BytesIO(order_lines),
+                                  output_stream, batch_size)
+        shipments = [json.loads(line)
+                     for line in output_stream.getvalue().splitlines()]
+        return num_orders, shipments
+
+    def test_shipment_line_per_order(self):
+        num_orders, shipments = self.run_pipeline(self.order_lines)
+        self.assertEqual(num_orders, len(self.orders))
+        self.assertEqual(shipments, self.get_expected_shipments())
+
+    def test_batch_size_does_not_change_shipments(self):
+        for batch_size in (1, 3, 100):
+            _, shipments = self.run_pipeline(self.order_lines, batch_size)
+            self.assertEqual(shipments, self.get_expected_shipments())
+
+    def test_each_batch_flushed(self):
+        allocator = InventoryAllocator(WarehouseNetwork(self.warehouse_dicts))
+        output_stream = FlushRecorder()
+        run_pipeline(allocator, io.BytesIO(self.order_lines), output_stream,
+                     3)
+        self.assertEqual(output_stream.flushed_lines, [3, 4])
+
+    def test_blank_lines_skipped(self):
+        order_lines = b"\n" + self.order_lines.replace(b"\n", b"\n\n")
+        num_orders, shipments = self.run_pipeline(order_lines)
+        self.assertEqual(num_orders, len(self.orders))
+        self.assertEqual(shipments, self.get_expected_shipments())
+
+    def test_empty_input(self):
+        self.assertEqual(self.run_pipeline(b""), (0, []))
+
+    def test_invalid_json_reports_line(self):
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            list(read_order_batches(io.BytesIO(b'{"apple": 1}\n{apple\n'),
+                                    10))
+
+    def test_non_object_order_rejected(self):
+        with self.assertRaisesRegex(ValueError, "line 1"):
+            list(read_order_batches(io.BytesIO(b'[1, 2]\n'), 10))
+
+    def test_batches_hold_at_most_batch_size(self):
+        batches = list(read_order_batches(io.BytesIO(self.order_lines), 3))
+        self.assertEqual([len(batch) for batch in batches], [3, 1])
+
+    def test_main_with_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            warehouse_path = os.path.join(directory, "warehouses.json")
+            order_path = os.path.join(directory, "orders.jsonl")
+            output_path = os.path.join(directory, "shipments.jsonl")
+            with open(warehouse_path, "w") as warehouse_file:
+                json.dump(self.warehouse_dicts, warehouse_file)
+            with open(order_path, "wb") as order_file:
+                order_file.write(self.order_lines)
+
+            self.assertEqual(
+                load_network(warehouse_path).get_quantity("dm", "orange"), 10)
+            main([warehouse_path, order_path, "-o", output_path,
+                  "--batch-size", "3"])
+            with open(output_path) as output_file:
+                shipments = [json.loads(line) for line in output_file]
+        self.assertEqual(shipments, self.get_expected_shipments())
+
+    def test_stdin_allocated_order_by_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            warehouse_path = os.path.join(directory, "warehouses.json")
+            with open(warehouse_path, "w") as warehouse_file:
+                json.dump(self.warehouse_dicts, warehouse_file)
+            stdin = io.TextIOWrapper(io.BytesIO(self.order_lines))
+            stdout = io.TextIOWrapper(FlushRecorder())
+            with mock.patch("sys.stdin", stdin), \
+                    mock.patch("sys.stdout", stdout):
+                main([warehouse_path])
+        self.assertEqual(stdout.buffer.flushed_lines, [1, 2, 3, 4])
+        shipments = [json.loads(line)
+                     for line in stdout.buffer.getvalue().splitlines()]
+        self.assertEqual(shipments, self.get_expected_shipments())
+
+
+if __name__ == "__main__":
+    unittest.main()
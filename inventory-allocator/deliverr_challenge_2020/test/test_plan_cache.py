@@ -0,0 +1,116 @@
+import random
+import unittest
+from src.allocation_strategy import MinimumCostStrategy
+from src.inventory_allocator import InventoryAllocator
+from src.plan_cache import PlanCache
+from src.warehouse_network import WarehouseNetwork
+
+
+class TestPlanCache(unittest.TestCase):
+
+    def setUp(self):
+        self.network = WarehouseNetwork([
+            {"name": "owd", "inventory": {"apple": 1, "pear": 3}},
+            {"name": "dm", "inventory": {"apple": 10, "pear": 3}},
+        ])
+        self.cache = PlanCache()
+        self.allocator = InventoryAllocator(self.network,
+                                            plan_cache=self.cache)
+
+    def test_repeated_order_hits(self):
+        for _ in range(3):
+            self.assertEqual(
+                self.allocator.allocate_inventory({"apple": 2, "pear": 1}),
+                [{"owd": {"pear": 1}}, {"dm": {"apple": 2}}])
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["misses"], stats["hits"]), (1, 2))
+        self.assertEqual(stats["entries"], 1)
+
+    def test_item_order_and_zeros_ignored(self):
+        self.allocator.allocate_inventory({"apple": 2, "pear": 1})
+        self.assertEqual(
+            self.allocator.allocate_inventory({"pear": 1, "kiwi": 0,
+                                               "apple": 2}),
+            [{"owd": {"pear": 1}}, {"dm": {"apple": 2}}])
+        self.assertEqual(self.cache.get_stats()["hits"], 1)
+
+    def test_restock_invalidates(self):
+        self.allocator.allocate_inventory({"apple": 2})
+        self.network.adjust_stock("owd", "apple", 5)
+        self.assertEqual(self.allocator.allocate_inventory({"apple": 2}),
+                         [{"owd": {"apple": 2}}])
+        self.assertEqual(self.cache.get_stats()["invalidations"], 1)
+
+    def test_depleted_warehouse_invalidates(self):
+        self.allocator.allocate_inventory({"pear": 3})
+        self.assertEqual(self.allocator.allocate_inventory({"pear": 3}),
+                         [{"dm": {"pear": 3}}])
+        self.assertEqual(self.allocator.allocate_inventory({"pear": 3}), [])
+        self.assertEqual(self.cache.get_stats()["invalidations"], 2)
+
+    def test_split_plan_not_reused(self):
+        self.assertEqual(self.allocator.allocate_inventory({"pear": 4}),
+                         [{"owd": {"pear": 3}}, {"dm": {"pear": 1}}])
+        self.assertEqual(self.allocator.allocate_inventory({"pear": 1}),
+                         [{"dm": {"pear": 1}}])
+        self.assertEqual(self.allocator.allocate_inventory({"pear": 4}), [])
+
+    def test_other_network_misses(self):
+        self.allocator.allocate_inventory({"apple": 1})
+        other = InventoryAllocator(
+            WarehouseNetwork([{"name": "bobs", "inventory": {"apple": 1}}]),
+            plan_cache=self.cache)
+        self.assertEqual(other.allocate_inventory({"apple": 1}),
+                         [{"bobs": {"apple": 1}}])
+        self.assertEqual(self.cache.get_stats()["misses"], 2)
+
+    def test_needs_allocator_network(self):
+        warehouses = [{"name": "bobs", "inventory": {"apple": 1}}]
+        with self.assertRaises(ValueError):
+            self.allocator.allocate_inventory({"apple": 1}, warehouses)
+        with self.assertRaises(ValueError):
+            self.allocator.allocate_batch([{"apple": 1}], warehouses)
+        self.assertEqual(self.cache.get_stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        cache = PlanCache(max_bytes=600)
+        allocator = InventoryAllocator(self.network, plan_cache=cache)
+        for quantity in range(1, 6):
+            allocator.allocate_inventory({"apple": quantity})
+        stats = cache.get_stats()
+        self.assertGreater(stats["evictions"], 0)
+        self.assertLessEqual(stats["bytes"], 600)
+        self.assertEqual(stats["entries"], 5 - stats["evictions"])
+
+    def test_strategy_cannot_be_cached(self):
+        with self.assertRaises(ValueError):
+            InventoryAllocator(self.network, MinimumCostStrategy(),
+                               PlanCache())
+
+    def test_matches_uncached_allocation(self):
+        rng = random.Random(9)
+        items = ["sku-%d" % item_id for item_id in range(12)]
+        warehouses = [{"name": "wh-%d" % warehouse_id,
+                       "inventory": {item: rng.randint(0, 30)
+                                     for item in rng.sample(items, 6)}}
+                      for warehouse_id in range(8)]
+        carts = [{item: rng.randint(1, 6) for item in rng.sample(items, 3)}
+                 for _ in range(10)]
+        uncached_network = WarehouseNetwork(warehouses)
+        cached_network = WarehouseNetwork(warehouses)
+        uncached = InventoryAllocator(uncached_network)
+        cached = InventoryAllocator(cached_network, plan_cache=PlanCache())
+
+        for _ in range(500):
+            if rng.random() < 0.05:
+                restock = (rng.choice(warehouses)["name"], rng.choice(items),
+                           rng.randint(1, 10))
+                uncached_network.adjust_stock(*restock)
+                cached_network.adjust_stock(*restock)
+            cart = rng.choice(carts)
+            self.assertEqual(cached.allocate_inventory(cart),
+                             uncached.allocate_inventory(cart))
+
+
+if __name__ == "__main__":
+    unittest.main()
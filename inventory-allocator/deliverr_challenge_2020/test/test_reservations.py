@@ -0,0 +1,165 @@
+import tempfile
+import time
+import unittest
+from src.allocation_log import AllocationLog
+from src.inventory_allocator import InventoryAllocator
+from src.reservations import ReservationManager
+from src.warehouse_network import WarehouseNetwork
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingClock(FakeClock):
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 0
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("clock failed")
+        return self.now
+
+
+class TestReservationManager(unittest.TestCase):
+
+    def setUp(self):
+        self.network = WarehouseNetwork([
+            {"name": "owd", "inventory": {"apple": 5, "pear": 2}},
+            {"name": "dm", "inventory": {"apple": 5}},
+        ])
+        self.clock = FakeClock()
+        self.reservations = ReservationManager(self.network,
+                                               default_ttl_s=60,
+                                               clock=self.clock)
+
+    def test_reserve_holds_stock(self):
+        hold_id, shipment = self.reservations.reserve({"apple": 7})
+        self.assertEqual(shipment, [{"owd": {"apple": 5}},
+                                    {"dm": {"apple": 2}}])
+        self.assertEqual(self.reservations.get_held_quantity("apple"), 7)
+        self.assertEqual(self.reservations.get_available_to_promise("apple"),
+                         3)
+        # Allocation probes only see stock that is not held
+        self.assertEqual(
+            InventoryAllocator(self.network).allocate_inventory(
+                {"apple": 4}), [])
+
+    def test_commit_keeps_stock_out(self):
+        hold_id, shipment = self.reservations.reserve({"apple": 7})
+        self.assertEqual(self.reservations.commit(hold_id), shipment)
+        self.assertEqual(self.reservations.get_held_quantity("apple"), 0)
+        self.assertEqual(self.reservations.get_hold_count(), 0)
+        self.clock.now = 1000
+        self.assertEqual(self.reservations.expire(), 0)
+        self.assertEqual(self.reservations.get_available_to_promise("apple"),
+                         3)
+
+    def test_release_returns_stock(self):
+        hold_id, _ = self.reservations.reserve({"apple": 7, "pear": 1})
+        self.reservations.release(hold_id)
+        self.assertEqual(self.network.get_quantity("owd", "apple"), 5)
+        self.assertEqual(self.network.get_quantity("dm", "apple"), 5)
+        self.assertEqual(self.network.get_quantity("owd", "pear"), 2)
+        self.assertEqual(self.reservations.get_held_quantity("pear"), 0)
+
+    def test_holds_expire_after_ttl(self):
+        short_id, _ = self.reservations.reserve({"apple": 2}, ttl_s=10)
+        long_id, _ = self.reservations.reserve({"apple": 3})
+        self.clock.now = 9.9
+        self.assertEqual(self.reservations.get_hold_count(), 2)
+        self.clock.now = 10
+        self.assertEqual(self.reservations.get_available_to_promise("apple"),
+                         7)
+        self.assertEqual(self.reservations.get_hold_count(), 1)
+        with self.assertRaises(ValueError):
+            self.reservations.commit(short_id)
+        self.clock.now = 60
+        self.assertEqual(self.reservations.get_available_to_promise("apple"),
+                         10)
+        with self.assertRaises(ValueError):
+            self.reservations.release(long_id)
+
+    def test_expired_stock_can_be_reserved_again(self):
+        self.reservations.reserve({"apple": 10}, ttl_s=5)
+        self.assertIsNone(self.reservations.reserve({"apple": 1}))
+        self.assertEqual(self.reservations.get_hold_count(), 1)
+        self.clock.now = 5
+        self.assertEqual(self.reservations.reserve({"apple": 1})[1],
+                         [{"owd": {"apple": 1}}])
+
+    def test_hold_used_once(self):
+        hold_id, _ = self.reservations.reserve({"apple": 1})
+        self.reservations.commit(hold_id)
+        with self.assertRaises(ValueError):
+            self.reservations.commit(hold_id)
+        with self.assertRaises(ValueError):
+            self.reservations.release(hold_id)
+        with self.assertRaises(ValueError):
+            self.reservations.release(12345)
+
+    def test_holds_expire_in_background(self):
+        with ReservationManager(self.network, default_ttl_s=60,
+                                clock=self.clock,
+                                expiry_interval_s=0.01) as reservations:
+            reservations.reserve({"apple": 7})
+            self.clock.now = 60
+            # Released without any call to the manager
+            deadline = time.monotonic() + 5
+            while (self.network.get_total_quantity("apple") < 10
+                   and time.monotonic() < deadline):
+                time.sleep(0.01)
+            self.assertEqual(self.network.get_total_quantity("apple"), 10)
+
+    def test_background_expiry_survives_errors(self):
+        clock = FailingClock()
+        with ReservationManager(self.network, default_ttl_s=60, clock=clock,
+                                expiry_interval_s=0.01) as reservations:
+            reservations.reserve({"apple": 7})
+            with self.assertLogs("src.reservations", "ERROR"):
+                clock.failures = 1
+                clock.now = 60
+                deadline = time.monotonic() + 5
+                while (self.network.get_total_quantity("apple") < 10
+                       and time.monotonic() < deadline):
+                    time.sleep(0.01)
+            self.assertEqual(self.network.get_total_quantity("apple"), 10)
+
+    def test_release_logged_as_one_record(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log = AllocationLog(directory, [
+                {"name": "owd", "inventory": {"apple": 5, "pear": 2}},
+                {"name": "dm", "inventory": {"apple": 5}},
+            ], durability="none")
+            network = WarehouseNetwork(log.get_warehouse_dicts(), log=log)
+            reservations = ReservationManager(network, clock=self.clock)
+            hold_id, _ = reservations.reserve({"apple": 7, "pear": 1})
+            sequence = log.get_next_sequence()
+            reservations.release(hold_id)
+            self.assertEqual(log.get_next_sequence(), sequence + 1)
+            log.close()
+            recovered = AllocationLog(directory, durability="none")
+            self.assertEqual(recovered.get_warehouse_dicts(),
+                             network.get_warehouse_dicts())
+            recovered.close()
+
+    def test_all_or_nothing_allocator(self):
+        reservations = ReservationManager(
+            self.network, InventoryAllocator(self.network,
+                                             all_or_nothing=True),
+            clock=self.clock)
+        self.assertIsNone(reservations.reserve({"apple": 1, "pear": 3}))
+        self.assertEqual(reservations.get_hold_count(), 0)
+        self.assertEqual(reservations.get_available_to_promise("apple"), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
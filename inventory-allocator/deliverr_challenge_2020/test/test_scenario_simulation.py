@@ -0,0 +1,146 @@
+import os
+import random
+import tempfile
+import unittest
+from src.json_codec import dumps
+from src.scenario_simulation import (ScenarioSimulator, get_scenario_names,
+                                     get_scenario_warehouse_dicts, numpy,
+                                     replay_scenario, simulate)
+
+ITEMS = ["sku-%d" % item_id for item_id in range(15)]
+
+
+def make_warehouse_dicts(rng):
+    return [{"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(1, 20)
+                           for item in rng.sample(ITEMS, 8)}}
+            for warehouse_id in range(10)]
+
+
+def make_orders(rng, count):
+    return [{item: rng.randint(1, 8) for item in rng.sample(ITEMS, 3)}
+            for _ in range(count)]
+
+
+SCENARIOS = [
+    {"name": "base"},
+    {"name": "closures", "remove_warehouses": ["wh-0", "wh-3"]},
+    {"name": "priority", "priority": ["wh-9", "wh-5"]},
+    {"name": "new site", "priority": ["new"],
+     "add_warehouses": [{"name": "new",
+                         "inventory": {"sku-1": 50, "sku-2": 40}}]},
+    {"name": "restocks", "restocks": [[50, "wh-1", "sku-3", 30],
+                                      [100, "wh-2", "sku-14", 10],
+                                      [100, "wh-2", "sku-14", 5]]},
+    {"name": "everything", "remove_warehouses": ["wh-1"],
+     "priority": ["wh-4", "extra"],
+     "add_warehouses": [{"name": "extra", "inventory": {"sku-5": 9}}],
+     "restocks": [[0, "extra", "sku-6", 12], [200, "wh-4", "sku-0", 7]]},
+]
+
+
+class TestScenarios(unittest.TestCase):
+
+    def test_get_scenario_names(self):
+        names = ["a", "b", "c", "d"]
+        self.assertEqual(get_scenario_names(names, {}), names)
+        self.assertEqual(
+            get_scenario_names(names, {"remove_warehouses": ["b"],
+                                       "priority": ["e", "c"],
+                                       "add_warehouses": [
+                                           {"name": "e", "inventory": {}}]}),
+            ["e", "c", "a", "d"])
+        with self.assertRaises(ValueError):
+            get_scenario_names(names, {"remove_warehouses": ["z"]})
+        with self.assertRaises(ValueError):
+            get_scenario_names(names, {"priority": ["b"],
+                                       "remove_warehouses": ["b"]})
+        with self.assertRaises(ValueError):
+            get_scenario_names(names, {"add_warehouses": [
+                {"name": "a", "inventory": {}}]})
+
+    def test_scenario_warehouse_dicts_copied(self):
+        warehouse_dicts = [{"name": "owd", "inventory": {"apple": 5}}]
+        scenario_dicts = get_scenario_warehouse_dicts(warehouse_dicts, {})
+        scenario_dicts[0]["inventory"]["apple"] = 1
+        self.assertEqual(warehouse_dicts[0]["inventory"], {"apple": 5})
+
+    def test_replay_scenario(self):
+        warehouse_dicts = [
+            {"name": "owd", "inventory": {"apple": 5, "pear": 2}},
+            {"name": "dm", "inventory": {"apple": 5}},
+        ]
+        orders = [{"apple": 3}, {"apple": 4, "pear": 2}, {"pear": 1},
+                  {"apple": 1, "kiwi": 1}]
+        self.assertEqual(
+            replay_scenario(warehouse_dicts, orders, {"name": "base"}),
+            {"name": "base", "orders": 4, "filled_orders": 2,
+             "shipped_orders": 3, "split_orders": 1, "fill_rate": 0.5,
+             "split_rate": 1 / 3, "warehouses_per_order": 4 / 3})
+        result = replay_scenario(
+            warehouse_dicts, orders,
+            {"restocks": [[2, "dm", "pear", 1], [3, "dm", "kiwi", 2]]})
+        self.assertEqual(result["filled_orders"], 4)
+        with self.assertRaises(ValueError):
+            replay_scenario(warehouse_dicts, orders,
+                            {"restocks": [[0, "dm", "pear", 0]]})
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestScenarioSimulator(unittest.TestCase):
+
+    def test_matches_replay_scenario(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                rng = random.Random(seed)
+                warehouse_dicts = make_warehouse_dicts(rng)
+                orders = make_orders(rng, 300)
+                simulator = ScenarioSimulator(warehouse_dicts, SCENARIOS)
+                # Replaying in parts continues where the last part stopped
+                simulator.replay(orders[:120])
+                simulator.replay(orders[120:])
+                self.assertEqual(
+                    simulator.get_results(),
+                    [replay_scenario(warehouse_dicts, orders, scenario)
+                     for scenario in SCENARIOS])
+
+    def test_unknown_items_and_empty_orders(self):
+        simulator = ScenarioSimulator(
+            [{"name": "owd", "inventory": {"apple": 5}}],
+            [{"name": "base"},
+             {"name": "kiwis", "restocks": [[1, "owd", "kiwi", 1]]}])
+        simulator.replay([{"kiwi": 1}, {"kiwi": 1, "apple": 0}, {}])
+        self.assertEqual([(result["filled_orders"], result["shipped_orders"])
+                          for result in simulator.get_results()],
+                         [(1, 0), (2, 1)])
+
+    def test_invalid_scenarios(self):
+        warehouse_dicts = [{"name": "owd", "inventory": {"apple": 5}}]
+        with self.assertRaises(ValueError):
+            ScenarioSimulator(warehouse_dicts,
+                              [{"restocks": [[0, "dm", "apple", 1]]}])
+        with self.assertRaises(ValueError):
+            ScenarioSimulator(warehouse_dicts,
+                              [{"restocks": [[0, "owd", "apple", -1]]}])
+        with self.assertRaises(ValueError):
+            ScenarioSimulator(warehouse_dicts, [{"priority": ["dm"]}])
+
+    def test_simulate_order_log(self):
+        rng = random.Random(5)
+        warehouse_dicts = make_warehouse_dicts(rng)
+        orders = make_orders(rng, 200)
+        with tempfile.TemporaryDirectory() as directory:
+            order_log = os.path.join(directory, "orders.jsonl")
+            with open(order_log, "wb") as log_file:
+                log_file.write(b"\n".join(map(dumps, orders)) + b"\n")
+            expected = [replay_scenario(warehouse_dicts, orders, scenario)
+                        for scenario in SCENARIOS]
+            self.assertEqual(simulate(warehouse_dicts, order_log, SCENARIOS,
+                                      batch_size=64), expected)
+            # Results are in scenario order whichever process ran them
+            self.assertEqual(simulate(warehouse_dicts, order_log, SCENARIOS,
+                                      processes=4), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import random
+import unittest
+from src.inventory_allocator import InventoryAllocator
+from src.sharded_allocator import ShardedInventoryAllocator, get_shard
+from src.warehouse_network import WarehouseNetwork
+
+
+class TestShardedInventoryAllocator(unittest.TestCase):
+
+    def test_get_shard(self):
+        self.assertEqual(get_shard("apple", 4), get_shard("apple", 4))
+        self.assertIn(get_shard("apple", 4), range(4))
+
+    def test_split_order_reassembled(self):
+        warehouses = [
+            {"name": "owd", "inventory": {"apple": 5, "pear": 2}},
+            {"name": "dm", "inventory": {"apple": 5, "kiwi": 3}},
+        ]
+        with ShardedInventoryAllocator(warehouses, num_shards=3) as allocator:
+            self.assertEqual(
+                allocator.allocate_inventory({"apple": 7, "pear": 2,
+                                              "kiwi": 1, "fig": 1}),
+                [{"owd": {"apple": 5, "pear": 2}},
+                 {"dm": {"apple": 2, "kiwi": 1}}])
+            self.assertEqual(allocator.allocate_inventory({"apple": 4}), [])
+            self.assertEqual(allocator.allocate_batch([]), [])
+
+    def test_matches_inventory_allocator(self):
+        rng = random.Random(3)
+        items = ["sku-%d" % item_id for item_id in range(40)]
+        warehouses = [
+            {"name": "wh-%d" % warehouse_id,
+             "inventory": {item: rng.randint(0, 8)
+                           for item in rng.sample(items, 15)}}
+            for warehouse_id in range(12)
+        ]
+        orders = [{item: rng.randint(0, 20) for item in rng.sample(items, 5)}
+                  for _ in range(400)]
+        expected_result = InventoryAllocator(
+            WarehouseNetwork(warehouses)).allocate_batch(orders)
+
+        with ShardedInventoryAllocator(warehouses, num_shards=4) as allocator:
+            allocation = allocator.allocate_batch(orders[:150])
+            allocation.extend(allocator.allocate_inventory(order)
+                              for order in orders[150:200])
+            allocation.extend(allocator.allocate_batch(orders[200:]))
+        self.assertEqual(allocation, expected_result)
+        # Items within each warehouse are shipped in the same order too
+        self.assertEqual([[list(items) for warehouse_shipment in shipment
+                           for items in warehouse_shipment.values()]
+                          for shipment in allocation],
+                         [[list(items) for warehouse_shipment in shipment
+                           for items in warehouse_shipment.values()]
+                          for shipment in expected_result])
+
+    def test_closed_allocator(self):
+        allocator = ShardedInventoryAllocator([], num_shards=1)
+        allocator.close()
+        with self.assertRaises(ValueError):
+            allocator.allocate_inventory({"apple": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
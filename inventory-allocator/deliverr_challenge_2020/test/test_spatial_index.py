@@ -0,0 +1,71 @@
+import random
+import unittest
+from src.spatial_index import (SpatialIndex, get_squared_distance,
+                               to_point)
+from src.warehouse import Warehouse
+from src.warehouse_network import WarehouseNetwork
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def test_points_on_unit_sphere(self):
+        for location in ([0, 0], [90, 0], [-45, 170], [12.5, -77]):
+            self.assertAlmostEqual(
+                get_squared_distance(to_point(location), (0, 0, 0)), 1)
+        # Closer along the surface is closer in a straight line
+        london = to_point([51.5, -0.1])
+        self.assertLess(get_squared_distance(london, to_point([48.9, 2.4])),
+                        get_squared_distance(london, to_point([40.7, -74])))
+
+    def test_nearest_first_matches_sorting(self):
+        rng = random.Random(3)
+        located = [(Warehouse("wh-%d" % rank, {}), rank,
+                    [rng.uniform(-90, 90), rng.uniform(-180, 180)])
+                   for rank in range(500)]
+        index = SpatialIndex(located)
+        for _ in range(20):
+            point = to_point([rng.uniform(-90, 90), rng.uniform(-180, 180)])
+            expected = sorted(
+                located, key=lambda entry: (get_squared_distance(
+                    point, to_point(entry[2])), entry[1]))
+            self.assertEqual(
+                [warehouse for _, warehouse in index.iter_nearest(point)],
+                [warehouse for warehouse, _, _ in expected])
+
+    def test_ties_broken_by_priority(self):
+        located = [(Warehouse("wh-%d" % rank, {}), rank, [rank % 3, 0])
+                   for rank in range(30)]
+        found = list(SpatialIndex(located).iter_nearest(to_point([0, 0])))
+        self.assertEqual([warehouse.get_name() for _, warehouse in found],
+                         ["wh-%d" % rank for rank in
+                          sorted(range(30), key=lambda rank: (rank % 3,
+                                                              rank))])
+
+    def test_empty_index(self):
+        self.assertEqual(list(SpatialIndex([]).iter_nearest(
+            to_point([0, 0]))), [])
+
+
+class TestNearestWarehouses(unittest.TestCase):
+
+    def test_unlocated_warehouses_last_by_priority(self):
+        network = WarehouseNetwork([
+            {"name": "a", "inventory": {}},
+            {"name": "b", "location": [0, 10], "inventory": {}},
+            {"name": "c", "inventory": {}},
+            {"name": "d", "location": [0, 1], "inventory": {}},
+        ])
+        nearest = network.get_nearest_warehouses([0, 0])
+        self.assertEqual([warehouse.get_name() for warehouse in nearest],
+                         ["d", "b", "a", "c"])
+        # Iterating again reuses the warehouses already found
+        self.assertEqual([warehouse.get_name() for warehouse in nearest],
+                         ["d", "b", "a", "c"])
+        self.assertEqual(
+            [warehouse.get_name() for warehouse in nearest.sort(
+                network.get_warehouse_list())],
+            ["d", "b", "a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -32,6 +32,66 @@ class TestWarehouse(unittest.TestCase):
         self.assertEqual(apple_warehouse.ship_processed_shipments(),
                          {"Farmers": {"apple": 3}})
 
+    def test_items_in_stock(self):
+        apple_warehouse = Warehouse(name="Farmers",
+                                    inventory={"apple": 5, "pear": 0})
+        self.assertEqual(apple_warehouse.get_items_in_stock(), ["apple"])
+
+    def test_remove_stock(self):
+        apple_warehouse = Warehouse(name="Farmers", inventory={"apple": 5})
+        self.assertEqual(apple_warehouse.remove_stock("apple", 3), 3)
+        self.assertEqual(apple_warehouse.remove_stock("apple", 3), 2)
+        self.assertEqual(apple_warehouse.remove_stock("pear", 3), 0)
+        self.assertEqual(apple_warehouse.get_quantity("apple"), 0)
+        self.assertEqual(apple_warehouse.ship_processed_shipments(), {})
+
+    def test_adjust_stock(self):
+        apple_warehouse = Warehouse(name="Farmers", inventory={"apple": 5})
+        apple_warehouse.adjust_stock("apple", -2)
+        apple_warehouse.adjust_stock("pear", 4)
+        self.assertEqual(apple_warehouse.get_quantity("apple"), 3)
+        self.assertEqual(apple_warehouse.get_quantity("pear"), 4)
+
+    def test_adjust_stock_below_zero(self):
+        apple_warehouse = Warehouse(name="Farmers", inventory={"apple": 5})
+        with self.assertRaises(ValueError):
+            apple_warehouse.adjust_stock("apple", -6)
+        self.assertEqual(apple_warehouse.get_quantity("apple"), 5)
+
+    def test_inventory_not_modified(self):
+        inventory = {"apple": 5, "pear": 2}
+        apple_warehouse = Warehouse(name="Farmers", inventory=inventory)
+        apple_warehouse.process_item_shipment("apple", 3)
+        apple_warehouse.adjust_stock("kiwi", 1)
+        self.assertEqual(inventory, {"apple": 5, "pear": 2})
+        self.assertEqual(apple_warehouse.get_quantity("apple"), 2)
+        self.assertEqual(apple_warehouse.get_items_in_stock(),
+                         ["apple", "pear", "kiwi"])
+
+    def test_negative_quantity_not_in_stock(self):
+        apple_warehouse = Warehouse(name="Farmers",
+                                    inventory={"apple": -2, "pear": 1})
+        self.assertEqual(apple_warehouse.get_quantity("apple"), 0)
+        self.assertEqual(apple_warehouse.remove_stock("apple", 1), 0)
+        apple_warehouse.adjust_stock("apple", 3)
+        self.assertEqual(apple_warehouse.get_items_in_stock(),
+                         ["pear", "apple"])
+
+    def test_depleted_item_not_in_stock(self):
+        apple_warehouse = Warehouse(name="Farmers",
+                                    inventory={"apple": 2, "pear": 1})
+        apple_warehouse.process_item_shipment("apple", 2)
+        self.assertEqual(apple_warehouse.get_items_in_stock(), ["pear"])
+        apple_warehouse.adjust_stock("apple", 1)
+        self.assertEqual(apple_warehouse.get_items_in_stock(),
+                         ["apple", "pear"])
+        self.assertEqual(apple_warehouse.ship_processed_shipments(),
+                         {"Farmers": {"apple": 2}})
+
+    def test_no_instance_dict(self):
+        apple_warehouse = Warehouse(name="Farmers", inventory={"apple": 1})
+        self.assertFalse(hasattr(apple_warehouse, "__dict__"))
+
     def ship_nothing(self):
         apple_warehouse = Warehouse(name="Farmers", inventory={"apple": 5})
         apple_warehouse.process_item_shipment("apple", 0)
@@ -0,0 +1,64 @@
+import unittest
+from src.warehouse import Warehouse
+from src.warehouse_index import WarehouseIndex
+
+
+class TestWarehouseIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.owd = Warehouse(name="owd", inventory={"apple": 5, "pear": 0})
+        self.dm = Warehouse(name="dm", inventory={"apple": 2, "kiwi": 1})
+        self.index = WarehouseIndex([self.owd, self.dm])
+
+    def test_warehouses_in_priority_order(self):
+        self.assertEqual(self.index.get_warehouses("apple"),
+                         [self.owd, self.dm])
+        self.assertEqual(self.index.get_warehouses("kiwi"), [self.dm])
+
+    def test_out_of_stock_item_not_indexed(self):
+        self.assertEqual(self.index.get_warehouses("pear"), [])
+        self.assertEqual(self.index.get_warehouses("mango"), [])
+
+    def test_rank(self):
+        self.assertEqual(self.index.get_rank(self.owd), 0)
+        self.assertEqual(self.index.get_rank(self.dm), 1)
+
+    def test_partial_removal_keeps_warehouse(self):
+        self.assertEqual(self.index.remove_stock(self.owd, "apple", 3), 3)
+        self.assertEqual(self.index.get_warehouses("apple"),
+                         [self.owd, self.dm])
+
+    def test_emptied_warehouse_removed(self):
+        self.assertEqual(self.index.remove_stock(self.owd, "apple", 7), 5)
+        self.assertEqual(self.index.get_warehouses("apple"), [self.dm])
+
+    def test_restocked_warehouse_inserted_by_rank(self):
+        self.index.remove_stock(self.owd, "apple", 5)
+        self.index.adjust_stock(self.owd, "apple", 4)
+        self.assertEqual(self.index.get_warehouses("apple"),
+                         [self.owd, self.dm])
+        self.index.adjust_stock(self.dm, "pear", 1)
+        self.index.adjust_stock(self.owd, "pear", 1)
+        self.assertEqual(self.index.get_warehouses("pear"),
+                         [self.owd, self.dm])
+
+    def test_adjusted_to_zero_removed(self):
+        self.index.adjust_stock(self.dm, "kiwi", -1)
+        self.assertEqual(self.index.get_warehouses("kiwi"), [])
+
+    def test_total_quantity_kept_up_to_date(self):
+        self.assertEqual(self.index.get_total_quantity("apple"), 7)
+        self.assertEqual(self.index.get_total_quantity("pear"), 0)
+        self.index.remove_stock(self.owd, "apple", 6)
+        self.assertEqual(self.index.get_total_quantity("apple"), 2)
+        self.index.adjust_stock(self.dm, "apple", 3)
+        self.index.adjust_stock(self.owd, "pear", 2)
+        self.assertEqual(self.index.get_total_quantity("apple"), 5)
+        self.assertEqual(self.index.get_total_quantity("pear"), 2)
+        with self.assertRaises(ValueError):
+            self.index.adjust_stock(self.dm, "kiwi", -2)
+        self.assertEqual(self.index.get_total_quantity("kiwi"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
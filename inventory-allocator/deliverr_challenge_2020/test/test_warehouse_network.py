@@ -0,0 +1,64 @@
+import unittest
+from src.warehouse_network import WarehouseNetwork
+
+
+class TestWarehouseNetwork(unittest.TestCase):
+
+    def setUp(self):
+        self.network = WarehouseNetwork([
+            {"name": "owd", "inventory": {"apple": 5}},
+            {"name": "dm", "inventory": {"apple": 5, "kiwi": 2}},
+        ])
+
+    def test_warehouses_in_priority_order(self):
+        owd, dm = self.network.get_warehouse_list()
+        self.assertEqual(owd.get_name(), "owd")
+        self.assertEqual(self.network.get_warehouses("apple"), [owd, dm])
+        self.assertEqual(self.network.get_rank(dm), 1)
+
+    def test_get_warehouse(self):
+        self.assertEqual(self.network.get_warehouse("dm").get_name(), "dm")
+
+    def test_unknown_warehouse(self):
+        with self.assertRaises(ValueError):
+            self.network.get_warehouse("zeep")
+        with self.assertRaises(ValueError):
+            self.network.adjust_stock("zeep", "apple", 1)
+
+    def test_remove_stock(self):
+        dm = self.network.get_warehouse("dm")
+        self.assertEqual(self.network.remove_stock(dm, "kiwi", 3), 2)
+        self.assertEqual(self.network.get_warehouses("kiwi"), [])
+        self.assertEqual(self.network.get_quantity("dm", "kiwi"), 0)
+
+    def test_receipt_restocks_item(self):
+        self.network.adjust_stock("owd", "kiwi", 4)
+        self.assertEqual(self.network.get_quantity("owd", "kiwi"), 4)
+        self.assertEqual([warehouse.get_name() for warehouse
+                          in self.network.get_warehouses("kiwi")],
+                         ["owd", "dm"])
+
+
+    def test_restock_version(self):
+        self.assertEqual(self.network.get_restock_version("apple"), 0)
+        self.network.adjust_stock("owd", "apple", -1)
+        self.assertEqual(self.network.get_restock_version("apple"), 0)
+        self.network.adjust_stock("dm", "apple", 2)
+        self.assertEqual(self.network.get_restock_version("apple"), 1)
+        self.assertEqual(self.network.get_restock_version("kiwi"), 0)
+
+    def test_return_shipment(self):
+        self.network.return_shipment([{"owd": {"apple": 2, "kiwi": 1}},
+                                      {"dm": {"kiwi": 3}}])
+        self.assertEqual(self.network.get_quantity("owd", "apple"), 7)
+        self.assertEqual(self.network.get_total_quantity("kiwi"), 6)
+        self.assertGreater(self.network.get_restock_version("kiwi"), 0)
+        # Nothing changes unless every warehouse is known
+        with self.assertRaises(ValueError):
+            self.network.return_shipment([{"owd": {"apple": 1}},
+                                          {"zeep": {"apple": 1}}])
+        self.assertEqual(self.network.get_quantity("owd", "apple"), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()